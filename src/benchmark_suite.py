@@ -0,0 +1,409 @@
+import argparse
+import functools
+import importlib
+import importlib.util
+import json
+import math
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import networkx as nx
+from assign_weights import weigh
+from bottlenecks import find_bottlenecks
+from centrality import CentralityService
+from dataset_generator import (
+    generate_message_records,
+    tier_node_ids,
+    write_message_records,
+)
+from diffusion_simulation import activation_table, simulate, simulate_ensemble
+from directed_graph import build
+from graph_snapshot import open_snapshot
+from node_generator import TIER_COUNTS, generate_nodes, write_nodes
+
+# Benchmark every pipeline stage on the shipped node tables (nodes1/2/3.csv)
+# and on generated tiered networks from 10^3 to 10^6 nodes. Each stage is
+# timed (best of REPEATS runs) and then run once more under tracemalloc for
+# its peak Python/NumPy allocation. Results are written as JSON, optionally
+# plotted as scaling curves, and compared with a stored baseline: a stage
+# more than TOLERANCE slower than its baseline fails the run.
+
+DATA_DIR = Path(__file__).parent / "data"
+DATASETS = ["nodes1", "nodes2", "nodes3"]
+SIZES = [10**3, 10**4, 10**5, 10**6]
+STAGES = [
+    "build",
+    "weigh",
+    "cascade",
+    "ensemble",
+    "degree",
+    "closeness",
+    "betweenness",
+    "eigenvector",
+    "katz",
+    "pagerank",
+    "bottlenecks",
+    "map",
+]
+# Largest graph each stage runs on, exact all-pairs centralities are O(V * E)
+STAGE_MAX_NODES = {"closeness": 10**4, "betweenness": 10**4, "map": 10**5}
+# Optional packages outside requirements.txt, stages are skipped without them
+STAGE_PACKAGES = {"map": "folium"}
+MESSAGES_PER_NODE = 2
+ENSEMBLE_REALIZATIONS = 100
+REPEATS = 3  # Best of, single cold runs are too noisy to compare
+SEED = 42
+ALERT_TIME = datetime(2024, 1, 1)
+
+RESULTS_FILE = DATA_DIR / "benchmarks" / "results.json"
+BASELINE_FILE = DATA_DIR / "benchmarks" / "baseline.json"
+PLOT_FILE = DATA_DIR / "benchmarks" / "scaling.png"
+TOLERANCE = 0.25  # Allowed slowdown against the baseline
+MIN_SECONDS = 0.05  # Timings below this are noise and never regress
+
+
+# Tier counts for an n-node network in the proportions of TIER_COUNTS, with
+# one alert origin and the citizens taking up the rounding
+def synthetic_tier_counts(n_nodes):
+    scale = n_nodes / sum(TIER_COUNTS)
+    counts = [1] + [max(1, round(count * scale)) for count in TIER_COUNTS[1:-1]]
+    return counts + [max(1, n_nodes - sum(counts))]
+
+
+# Write the node table and a seeded message log for one dataset into
+# directory, returns (nodes_path, messages_path)
+def prepare_dataset(name, directory):
+    directory = Path(directory)
+    nodes_path = directory / "nodes.csv"
+    messages_path = directory / "message_records.csv"
+    if name in DATASETS:
+        nodes_df = pd.read_csv(DATA_DIR / f"{name}.csv")
+        nodes_df.to_csv(nodes_path, index=False)
+    else:
+        write_nodes(generate_nodes(synthetic_tier_counts(int(name)), seed=SEED), nodes_path)
+        nodes_df = pd.read_csv(nodes_path, usecols=["node_id", "node_type"])
+    records = generate_message_records(
+        tier_node_ids(nodes_df),
+        n_records=MESSAGES_PER_NODE * len(nodes_df),
+        seed=SEED,
+        alert_time=ALERT_TIME,
+    )
+    write_message_records(records, messages_path)
+    return nodes_path, messages_path
+
+
+# Best wall time of repeats runs, then the tracemalloc peak of one more run
+# in MB when memory is set. Returns (result, seconds, peak_mb).
+def measure(function, repeats=REPEATS, memory=True):
+    best = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result, best, peak_mb
+
+
+# Stage functions keyed by name. Each takes the shared context of one dataset
+# and stores what later stages need in it.
+def _build(context):
+    return build(context["nodes_path"], context["messages_path"], context["graph_path"])
+
+
+def _weigh(context):
+    G = weigh(context["graph_path"], context["weighted_path"])
+    context["G"] = G
+    context["arrays"] = open_snapshot(context["weighted_path"]).arrays
+    return G
+
+
+def _cascade(context):
+    G = context["G"]
+    activation_times, _ = simulate(G, context["start_node"], rng=random.Random(SEED))
+    context["timestamps_df"] = activation_table(G, activation_times)
+    return activation_times
+
+
+def _ensemble(context):
+    return simulate_ensemble(
+        context["arrays"], context["start_node"], ENSEMBLE_REALIZATIONS, seed=SEED
+    )
+
+
+# Centralities as computed by centrality_analysis.py, on a fresh service
+# without a cache so every run recomputes
+def _centrality(name):
+    def stage(context):
+        service = CentralityService(context["G"])
+        if name == "degree":
+            return service.degree()
+        if name == "closeness":
+            return service.closeness(distance="delay")
+        if name == "betweenness":
+            context["betweenness"] = service.betweenness(weight="delay")
+            return context["betweenness"]
+        if name == "eigenvector":
+            return service.eigenvector(weight="weight")
+        if name == "katz":
+            return service.katz(weight="weight")
+        return service.pagerank(weight="weight")
+
+    return stage
+
+
+def _bottlenecks(context):
+    return find_bottlenecks(
+        context["timestamps_df"].set_index("node_id")["delay"],
+        context["betweenness"],
+        exclude=[context["start_node"]],
+    )
+
+
+# Map rendering does not depend on the scores, graphs above the betweenness
+# limit are drawn with every node at zero centrality
+def _map(context):
+    from folium_map import build_map
+
+    nodes_df = pd.read_csv(context["nodes_path"])
+    m = build_map(nodes_df, context.get("betweenness", {}))
+    m.save(context["map_path"])
+    return m
+
+
+STAGE_FUNCTIONS = {
+    "build": _build,
+    "weigh": _weigh,
+    "cascade": _cascade,
+    "ensemble": _ensemble,
+    "degree": _centrality("degree"),
+    "closeness": _centrality("closeness"),
+    "betweenness": _centrality("betweenness"),
+    "eigenvector": _centrality("eigenvector"),
+    "katz": _centrality("katz"),
+    "pagerank": _centrality("pagerank"),
+    "bottlenecks": _bottlenecks,
+    "map": _map,
+}
+# Stages whose output a later stage reads, always run when a dependent is
+REQUIRES = {
+    "weigh": ["build"],
+    "cascade": ["weigh"],
+    "ensemble": ["weigh"],
+    "degree": ["weigh"],
+    "closeness": ["weigh"],
+    "betweenness": ["weigh"],
+    "eigenvector": ["weigh"],
+    "katz": ["weigh"],
+    "pagerank": ["weigh"],
+    "bottlenecks": ["cascade", "betweenness"],
+    "map": ["weigh"],
+}
+
+
+def _installed(package):
+    return importlib.util.find_spec(package) is not None
+
+
+def _with_requirements(stages):
+    needed = set()
+
+    def add(stage):
+        if stage not in needed:
+            needed.add(stage)
+            for requirement in REQUIRES.get(stage, []):
+                add(requirement)
+
+    for stage in stages:
+        add(stage)
+    return [stage for stage in STAGES if stage in needed]
+
+
+# Benchmark the stages on one dataset, one result row per stage. Stages above
+# their STAGE_MAX_NODES limit are recorded as skipped.
+def benchmark_dataset(name, stages=STAGES, repeats=REPEATS, memory=True):
+    rows = []
+    skipped = set()
+    with tempfile.TemporaryDirectory() as directory:
+        nodes_path, messages_path = prepare_dataset(name, directory)
+        nodes_df = pd.read_csv(nodes_path, usecols=["node_id", "node_type"])
+        n_nodes = len(nodes_df)
+        context = {
+            "nodes_path": nodes_path,
+            "messages_path": messages_path,
+            "graph_path": Path(directory) / "communication.graphml",
+            "weighted_path": Path(directory) / "communication_updated.graphml",
+            "map_path": Path(directory) / "interactive_map.html",
+            "start_node": nodes_df.loc[
+                nodes_df["node_type"] == "alert_origin", "node_id"
+            ].iloc[0],
+        }
+        for stage in _with_requirements(stages):
+            row = {"dataset": name, "nodes": n_nodes, "stage": stage}
+            limit = STAGE_MAX_NODES.get(stage)
+            package = STAGE_PACKAGES.get(stage)
+            requirements = REQUIRES.get(stage, [])
+            if limit is not None and n_nodes > limit:
+                row["skipped"] = f"more than {limit} nodes"
+            elif package is not None and not _installed(package):
+                row["skipped"] = f"{package} not installed"
+            elif skipped.intersection(requirements):
+                row["skipped"] = "requirement skipped"
+            else:
+                _, seconds, peak_mb = measure(
+                    functools.partial(STAGE_FUNCTIONS[stage], context), repeats, memory
+                )
+                row.update(seconds=seconds, peak_mb=peak_mb)
+            if "skipped" in row:
+                skipped.add(stage)
+            if "G" in context:
+                row["edges"] = context["G"].number_of_edges()
+            if stage in stages:
+                rows.append(row)
+                print(_format_row(row), flush=True)
+    return rows
+
+
+def _format_row(row):
+    if "skipped" in row:
+        timing = f"skipped ({row['skipped']})"
+    else:
+        peak = "" if row["peak_mb"] is None else f" {row['peak_mb']:>9.1f} MB"
+        timing = f"{row['seconds']:>9.3f} s{peak}"
+    return f"{row['dataset']:>8} {row['nodes']:>8} {row['stage']:>12} {timing}"
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "networkx": nx.__version__,
+    }
+
+
+def write_results(rows, path=RESULTS_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"environment": environment(), "results": rows}, indent=2))
+
+
+# Stages slower than their baseline by more than tolerance (and by at least
+# min_seconds), one row per regression with the slowdown ratio
+def compare(rows, baseline_rows, tolerance=TOLERANCE, min_seconds=MIN_SECONDS):
+    columns = ["dataset", "stage", "baseline", "seconds", "ratio"]
+
+    def timed(rows):
+        return pd.DataFrame(
+            [r for r in rows if "seconds" in r], columns=["dataset", "stage", "seconds"]
+        )
+
+    merged = timed(rows).merge(
+        timed(baseline_rows), on=["dataset", "stage"], suffixes=("", "_baseline")
+    )
+    merged = merged.rename(columns={"seconds_baseline": "baseline"})
+    merged["ratio"] = merged["seconds"] / merged["baseline"].clip(lower=1e-9)
+    slower = (merged["ratio"] > 1 + tolerance) & (
+        merged["seconds"] - merged["baseline"] >= min_seconds
+    )
+    return merged.loc[slower, columns].reset_index(drop=True)
+
+
+# Seconds and peak memory against node count on log-log axes, one line per
+# stage, over every dataset
+def plot_scaling(rows, path=PLOT_FILE):
+    import matplotlib.pyplot as plt
+
+    results_df = pd.DataFrame([r for r in rows if "seconds" in r])
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+    for stage, stage_df in results_df.groupby("stage", sort=False):
+        stage_df = stage_df.sort_values("nodes")
+        axes[0].plot(stage_df["nodes"], stage_df["seconds"], marker="o", label=stage)
+        if stage_df["peak_mb"].notna().any():
+            axes[1].plot(stage_df["nodes"], stage_df["peak_mb"], marker="o", label=stage)
+    for ax, ylabel in zip(axes, ["Seconds", "Peak memory (MB)"]):
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("Nodes")
+        ax.set_ylabel(ylabel)
+        ax.grid(True, which="both", alpha=0.3)
+    axes[0].legend(fontsize="small")
+    fig.suptitle("Pipeline stage scaling")
+    fig.tight_layout()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages")
+    parser.add_argument("--datasets", nargs="*", default=DATASETS, choices=DATASETS)
+    parser.add_argument("--sizes", nargs="*", type=int, default=SIZES)
+    parser.add_argument("--stages", nargs="*", default=STAGES, choices=STAGES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Skip the tracemalloc runs"
+    )
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store these results as the new baseline instead of comparing",
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--plot", nargs="?", const=PLOT_FILE, default=None)
+    args = parser.parse_args(argv)
+
+    if "map" in args.stages and _installed("folium"):
+        # Import folium once, outside the timed runs
+        importlib.import_module("folium_map")
+
+    rows = []
+    for name in args.datasets + [str(size) for size in args.sizes]:
+        rows += benchmark_dataset(name, args.stages, args.repeats, not args.no_memory)
+    write_results(rows, args.output)
+    print(f"Results written to {args.output}")
+    if args.plot and not _installed("matplotlib"):
+        print("Scaling plot skipped, matplotlib not installed")
+    elif args.plot:
+        plot_scaling(rows, args.plot)
+        print(f"Scaling plot written to {args.plot}")
+
+    if args.update_baseline:
+        write_results(rows, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return rows
+    if not Path(args.baseline).exists():
+        print(f"No baseline at {args.baseline}, run with --update-baseline to store one")
+        return rows
+    baseline_rows = json.loads(Path(args.baseline).read_text())["results"]
+    regressions = compare(rows, baseline_rows, args.tolerance)
+    if len(regressions):
+        print("\nRegressions against the baseline:")
+        print(regressions.to_string(index=False))
+        raise SystemExit(
+            f"{len(regressions)} stage(s) more than {args.tolerance:.0%} slower "
+            f"than {args.baseline}"
+        )
+    print(f"No regressions against {args.baseline}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
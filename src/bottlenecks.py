@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# Bottleneck detection shared by identify_bottlenecks.py and the pipeline.
+# A bottleneck is a node in the top of both the delay distribution and the
+# betweenness distribution. Zero delays (the alert origin) and zero
+# centralities are left out when the thresholds are set.
+
+DELAY_PERCENTILE = 60
+CENTRALITY_PERCENTILE = 60
+
+
+# Nodes whose delay and betweenness are both at or above the given
+# percentiles, ranked by betweenness and then delay, highest first.
+# delays and centrality map node id to value (dict or Series).
+def find_bottlenecks(
+    delays,
+    centrality,
+    delay_percentile=DELAY_PERCENTILE,
+    centrality_percentile=CENTRALITY_PERCENTILE,
+    exclude=(),
+):
+    delays = pd.Series(delays, dtype=float).dropna()
+    centrality = pd.Series(centrality, dtype=float)
+    columns = ["delay", "betweenness"]
+
+    valid_delays = delays[delays > 0.0]
+    valid_centrality = centrality[centrality > 0.0]
+    if valid_delays.empty or valid_centrality.empty:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name="node_id"))
+    delay_threshold = np.percentile(valid_delays, delay_percentile)
+    centrality_threshold = np.percentile(valid_centrality, centrality_percentile)
+
+    high_delay = delays.index[delays >= delay_threshold]
+    high_centrality = valid_centrality.index[valid_centrality >= centrality_threshold]
+    nodes = high_delay.intersection(high_centrality).difference(pd.Index(list(exclude)))
+
+    bottlenecks_df = pd.DataFrame(
+        {"delay": delays.loc[nodes], "betweenness": centrality.loc[nodes]}
+    )
+    bottlenecks_df.index.name = "node_id"
+    bottlenecks_df = bottlenecks_df.sort_values(
+        ["betweenness", "delay"], ascending=False, kind="stable"
+    )
+    bottlenecks_df.attrs["delay_threshold"] = delay_threshold
+    bottlenecks_df.attrs["centrality_threshold"] = centrality_threshold
+    return bottlenecks_df
@@ -0,0 +1,307 @@
+import heapq
+import math
+import os
+from itertools import count
+import networkx as nx
+from graph_arrays import from_networkx
+from instrumentation import stage
+from metric_cache import graph_fingerprint
+from process_pool import make_pool
+from spectral import SpectralEngine
+
+# Shared centrality service for the analysis scripts, optionally backed by a
+# MetricCache so scores computed by one script are reused by the others.
+# Betweenness is available as exact Brandes, sampled-pivot approximation with
+# an (epsilon, delta) error bound, or exact Brandes with the source nodes split
+# across processes. Exact scores can be updated in place when a few edge
+# delays change, by recomputing only the sources whose shortest paths move.
+# Eigenvector, Katz and PageRank run on a sparse SpectralEngine per weight,
+# which keeps its last scores as warm starts across weight updates.
+
+APPROX_THRESHOLD = 20_000  # "auto" switches to the approximation above this size
+EPSILON = 0.01  # Max absolute error of an approximate normalized score
+DELTA = 0.1  # Probability that any score exceeds the error bound
+# Error bound of "auto". The pivot count grows as log(n) / epsilon^2: EPSILON
+# needs about 65k pivots, more than the nodes of a graph just past the
+# threshold, where 0.05 needs about 2.6k. Fine for ranking bottlenecks,
+# pass mode="exact" or a smaller epsilon for precise scores.
+AUTO_EPSILON = 0.05
+
+_worker_graph = None
+
+
+# Single-source Dijkstra with shortest-path counting followed by dependency
+# accumulation (Brandes 2001). Returns {node: dependency} and {node: distance}.
+def single_source_dependencies(G, source, weight="delay"):
+    S = []
+    P = {}
+    sigma = {source: 1.0}
+    D = {}
+    seen = {source: 0}
+    c = count()
+    Q = [(0, next(c), source, source)]
+    while Q:
+        dist, _, pred, v = heapq.heappop(Q)
+        if v in D:
+            continue  # Already searched this node
+        if v != source:
+            sigma[v] += sigma[pred]  # Count paths
+        S.append(v)
+        D[v] = dist
+        for w, edge_data in G.succ[v].items():
+            vw_dist = dist + edge_data.get(weight, 1)
+            if w not in D and (w not in seen or vw_dist < seen[w]):
+                seen[w] = vw_dist
+                heapq.heappush(Q, (vw_dist, next(c), v, w))
+                sigma[w] = 0.0
+                P[w] = [v]
+            elif vw_dist == seen[w]:  # Handle equal paths
+                sigma[w] += sigma[v]
+                P[w].append(v)
+
+    delta = dict.fromkeys(S, 0.0)
+    while S:
+        w = S.pop()
+        coeff = (1 + delta[w]) / sigma[w]
+        for v in P.get(w, ()):
+            delta[v] += sigma[v] * coeff
+    delta[source] = 0.0
+    return delta, D
+
+
+# Same rescaling as nx.betweenness_centrality for directed graphs
+def _scale(n, normalized=True):
+    if normalized and n > 2:
+        return 1 / ((n - 1) * (n - 2))
+    return 1.0
+
+
+def _init_worker(G):
+    global _worker_graph
+    _worker_graph = G
+
+
+def _dependency_sums(task):
+    sources, weight = task
+    totals = {}
+    for s in sources:
+        delta, _ = single_source_dependencies(_worker_graph, s, weight)
+        for v, d in delta.items():
+            totals[v] = totals.get(v, 0.0) + d
+    return totals
+
+
+# Unnormalized exact betweenness with source nodes split across processes
+def parallel_betweenness(G, weight="delay", processes=None):
+    if processes is None:
+        processes = os.cpu_count()
+    nodes = list(G)
+    chunk = max(1, math.ceil(len(nodes) / (processes * 4)))
+    tasks = [(nodes[i : i + chunk], weight) for i in range(0, len(nodes), chunk)]
+
+    raw = dict.fromkeys(G, 0.0)
+    with make_pool(_init_worker, G, processes) as pool:
+        for totals in pool.imap_unordered(_dependency_sums, tasks):
+            for v, d in totals.items():
+                raw[v] += d
+    return raw
+
+
+# Pivot count for which every sampled normalized score is within epsilon of
+# the exact one with probability 1 - delta (Hoeffding plus a union bound)
+def approx_sample_size(n, epsilon=EPSILON, delta=DELTA):
+    return math.ceil(math.log(2 * n / delta) / (2 * epsilon**2))
+
+
+class CentralityService:
+    def __init__(self, G, cache=None):
+        self.G = G
+        self.cache = cache
+        self._scores = {}
+        self._raw_betweenness = {}
+        self._spectral = {}
+        self._stale_spectral = set()
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = graph_fingerprint(self.G)
+        return self._fingerprint
+
+    # Memoize a metric in memory and, when a MetricCache is set, on disk.
+    # Only actual computations show up as instrumented stages.
+    def _cached(self, name, params, compute):
+        key = (name, tuple(sorted(params.items())))
+        if key not in self._scores:
+
+            def timed_compute():
+                with stage("centrality", metric=name):
+                    return compute()
+
+            if self.cache is None:
+                self._scores[key] = timed_compute()
+            else:
+                self._scores[key] = self.cache.get_or_compute(
+                    self.fingerprint, name, params, timed_compute
+                )
+        return self._scores[key]
+
+    def degree(self):
+        return self._cached("degree", {}, lambda: nx.degree_centrality(self.G))
+
+    def closeness(self, distance="delay"):
+        return self._cached(
+            "closeness",
+            {"distance": distance},
+            lambda: nx.closeness_centrality(self.G, distance=distance),
+        )
+
+    # Sparse spectral engine for an edge weight, rebuilt from the graph after
+    # update_edge_weights while keeping the warm starts
+    def spectral(self, weight="weight"):
+        engine = self._spectral.get(weight)
+        if engine is None:
+            engine = SpectralEngine(from_networkx(self.G, edge_attrs=(weight,)), weight)
+            self._spectral[weight] = engine
+        elif weight in self._stale_spectral:
+            engine.update(from_networkx(self.G, edge_attrs=(weight,)))
+        self._stale_spectral.discard(weight)
+        return engine
+
+    def eigenvector(self, weight="weight", max_iter=500, solver="auto"):
+        def compute():
+            engine = self.spectral(weight)
+            return engine.as_dict(engine.eigenvector(solver, max_iter=max_iter))
+
+        return self._cached(
+            "eigenvector",
+            {"weight": weight, "max_iter": max_iter, "solver": solver},
+            compute,
+        )
+
+    def katz(self, weight="weight", alpha=0.1, beta=1.0):
+        def compute():
+            engine = self.spectral(weight)
+            return engine.as_dict(engine.katz(alpha, beta))
+
+        return self._cached(
+            "katz", {"weight": weight, "alpha": alpha, "beta": beta}, compute
+        )
+
+    def pagerank(self, weight="weight", alpha=0.85):
+        def compute():
+            engine = self.spectral(weight)
+            return engine.as_dict(engine.pagerank(alpha))
+
+        return self._cached("pagerank", {"weight": weight, "alpha": alpha}, compute)
+
+    # Betweenness centrality in one of the modes "exact", "approx",
+    # "parallel" or "auto". "auto" samples above APPROX_THRESHOLD nodes with
+    # AUTO_EPSILON, when that takes fewer pivots than there are nodes, and is
+    # exact otherwise. epsilon defaults to EPSILON for "approx".
+    def betweenness(
+        self,
+        mode="auto",
+        weight="delay",
+        epsilon=None,
+        delta=DELTA,
+        processes=None,
+        seed=42,
+    ):
+        n = self.G.number_of_nodes()
+        if epsilon is None:
+            epsilon = AUTO_EPSILON if mode == "auto" else EPSILON
+        if mode == "auto":
+            sampled = n > APPROX_THRESHOLD and approx_sample_size(n, epsilon, delta) < n
+            mode = "approx" if sampled else "exact"
+
+        if mode in ("exact", "parallel"):
+            # Both exact modes give the same numbers and share one result
+            if weight not in self._raw_betweenness:
+
+                def compute():
+                    if mode == "parallel":
+                        return parallel_betweenness(self.G, weight, processes)
+                    return nx.betweenness_centrality(
+                        self.G, weight=weight, normalized=False
+                    )
+
+                raw = self._cached("betweenness_raw", {"weight": weight}, compute)
+                # Copy, incremental updates change the scores in place
+                self._raw_betweenness[weight] = dict(raw)
+            key = ("betweenness", weight)
+            if key not in self._scores:
+                self._scores[key] = self._normalize(self._raw_betweenness[weight])
+            return self._scores[key]
+
+        if mode == "approx":
+            k = approx_sample_size(n, epsilon, delta)
+            if k >= n:
+                return self.betweenness("exact", weight)
+            return self._cached(
+                "betweenness_approx",
+                {"weight": weight, "epsilon": epsilon, "delta": delta, "seed": seed},
+                lambda: nx.betweenness_centrality(
+                    self.G, k=k, weight=weight, normalized=True, seed=seed
+                ),
+            )
+
+        raise ValueError(f"Unknown betweenness mode: {mode}")
+
+    def _normalize(self, raw):
+        scale = _scale(self.G.number_of_nodes())
+        return {v: b * scale for v, b in raw.items()}
+
+    # Set new edge weights, changes maps (source, target) to the new value.
+    # Exact betweenness is updated incrementally: a source s needs recomputing
+    # only if a changed edge (u, v) is on a shortest path from s, or would be
+    # with its new weight. Distances to u and v from every s come from two
+    # Dijkstra runs on the reversed graph per edge, the affected sources are
+    # then recomputed before and after the change. Returns the number of
+    # recomputed sources. Other cached scores are dropped.
+    def update_edge_weights(self, changes, weight="delay"):
+        G = self.G
+        raw = self._raw_betweenness.get(weight)
+        affected = set()
+        if raw is not None:
+            reverse = G.reverse(copy=False)
+            for (u, v), new in changes.items():
+                old = G.edges[u, v].get(weight, 1)
+                to_u = nx.single_source_dijkstra_path_length(reverse, u, weight=weight)
+                to_v = nx.single_source_dijkstra_path_length(reverse, v, weight=weight)
+                for s, du in to_u.items():
+                    dv = to_v.get(s, math.inf)
+                    # Tolerant test, recomputing an unaffected source is harmless
+                    if math.isclose(du + old, dv) or du + new <= dv + 1e-9 * dv:
+                        affected.add(s)
+
+        # Past half of the sources a full recomputation is cheaper
+        full = raw is not None and 2 * len(affected) >= G.number_of_nodes()
+        if raw is not None and not full:
+            for s in affected:
+                delta, _ = single_source_dependencies(G, s, weight)
+                for node, d in delta.items():
+                    raw[node] -= d
+
+        for (u, v), new in changes.items():
+            G.edges[u, v][weight] = new
+
+        # Every other metric may depend on the changed weights
+        self._scores = {}
+        self._stale_spectral.update(self._spectral)
+        self._fingerprint = None
+        if raw is None:
+            return 0
+        if full:
+            self._raw_betweenness.pop(weight)
+            self.betweenness("exact", weight)
+            return G.number_of_nodes()
+        for s in affected:
+            delta, _ = single_source_dependencies(G, s, weight)
+            for node, d in delta.items():
+                raw[node] += d
+        if self.cache is not None:
+            key = self.cache.key(self.fingerprint, "betweenness_raw", {"weight": weight})
+            self.cache.put(key, raw)
+        return len(affected)
@@ -1,108 +1,148 @@
 import pandas as pd
 import networkx as nx
-import matplotlib.pyplot as plt
 from pathlib import Path
+from graph_snapshot import load_graph
+from centrality import CentralityService
+from layout import LayoutService
+from metric_cache import MetricCache
 
 # Get graph file from data
 GRAPH_FILE = Path(__file__).parent / "data" / "communication_updated.graphml"
 
-# Load graph
-print(f"Loading Graph from {GRAPH_FILE}")
-G = nx.read_graphml(GRAPH_FILE)
-print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+# Identify constantly high-ranked nodes
+# Set up parameters for analysis
+TOP_N_RANK = 15  # How many top nodes per centrality to consider
+MIN_CENTRALITY_COUNT = 3  # Node must be in top 15 for at least in 3 centralities
 
-# Calculate centrality scores
-centrality_scores = {}
 
-# Degree centrality
-centrality_scores["degree"] = nx.degree_centrality(G)
+# Degree, closeness, betweenness and eigenvector centrality of every node
+# with node types and a rank column per centrality. Results are cached on
+# disk for the other scripts when a cache is given.
+def centrality_table(G, cache=None):
+    centrality_service = CentralityService(G, cache=cache)
+    centrality_scores = {}
 
-# Closeness centrality, use delay as distance
-centrality_scores["closeness"] = nx.closeness_centrality(G, distance="delay")
+    # Degree centrality
+    centrality_scores["degree"] = centrality_service.degree()
 
-# Betweenness centrality, use delay as weight
-centrality_scores["betweenness"] = nx.betweenness_centrality(
-    G, weight="delay", normalized=True
-)
+    # Closeness centrality, use delay as distance
+    centrality_scores["closeness"] = centrality_service.closeness(distance="delay")
 
-# Eigenvector centrality, use "weight" calculated in task 5 as weight
-centrality_scores["eigenvector"] = nx.eigenvector_centrality(
-    G, weight="weight", max_iter=500
-)
+    # Betweenness centrality, use delay as weight
+    centrality_scores["betweenness"] = centrality_service.betweenness(weight="delay")
 
-# Combine results into DataFrame
+    # Eigenvector centrality, use "weight" calculated in task 5 as weight
+    centrality_scores["eigenvector"] = centrality_service.eigenvector(
+        weight="weight", max_iter=500
+    )
 
-# Create DataFrame with degree centrality
-centrality_df = pd.DataFrame.from_dict(
-    centrality_scores["degree"], orient="index", columns=["degree"]
-)
+    # Combine results into DataFrame
 
-# Add other centralities with for loop
-for name, scores_dict in centrality_scores.items():
-    if name != "degree":
-        centrality_df[name] = pd.Series(scores_dict)
+    # Create DataFrame with degree centrality
+    centrality_df = pd.DataFrame.from_dict(
+        centrality_scores["degree"], orient="index", columns=["degree"]
+    )
 
-# Add node type from graph attributes
-node_type_map = nx.get_node_attributes(G, "node_type")
-centrality_df["node_type"] = centrality_df.index.map(node_type_map)
+    # Add other centralities with for loop
+    for name, scores_dict in centrality_scores.items():
+        if name != "degree":
+            centrality_df[name] = pd.Series(scores_dict)
 
-# Rank nodes
-rank_cols = []
-for col in centrality_scores.keys():
-    if col in centrality_df.columns:
-        rank_col = f"{col}_rank"
-        centrality_df[rank_col] = centrality_df[col].rank(ascending=False, method="min")
-        rank_cols.append(rank_col)
+    # Add node type from graph attributes
+    node_type_map = nx.get_node_attributes(G, "node_type")
+    centrality_df["node_type"] = centrality_df.index.map(node_type_map)
+
+    # Rank nodes
+    for col in centrality_scores.keys():
+        if col in centrality_df.columns:
+            centrality_df[f"{col}_rank"] = centrality_df[col].rank(
+                ascending=False, method="min"
+            )
+    return centrality_df
+
+
+def rank_columns(centrality_df):
+    return [col for col in centrality_df.columns if col.endswith("_rank")]
 
-# Identify constantly high-ranked nodes
-# Set up parameters for analysis
-TOP_N_RANK = 15  # How many top nodes per centrality to consider
-MIN_CENTRALITY_COUNT = 3  # Node must be in top 15 for at least in 3 centralities
 
-is_top_n = centrality_df[rank_cols] <= TOP_N_RANK
-centrality_df["top_n_count"] = is_top_n.sum(axis=1)
+# Nodes in the top top_n of at least min_count centralities
+def critical_nodes(centrality_df, top_n=TOP_N_RANK, min_count=MIN_CENTRALITY_COUNT):
+    rank_cols = rank_columns(centrality_df)
+    is_top_n = centrality_df[rank_cols] <= top_n
+    centrality_df = centrality_df.assign(top_n_count=is_top_n.sum(axis=1))
 
-critical_nodes_df = centrality_df[
-    centrality_df["top_n_count"] >= MIN_CENTRALITY_COUNT
-].sort_values("top_n_count", ascending=False)
-critical_nodes_list = critical_nodes_df.index.tolist()
+    return centrality_df[centrality_df["top_n_count"] >= min_count].sort_values(
+        "top_n_count", ascending=False
+    )
 
-print(
-    f"\n{len(critical_nodes_list)} critical nodes found (Top {TOP_N_RANK} in >= {MIN_CENTRALITY_COUNT} measures):"
-)
-print(critical_nodes_df[["node_type", "top_n_count"] + rank_cols])
 
 # Visualize results
-plt.figure(figsize=(15, 12))
-pos = nx.spring_layout(G, seed=42)
-
-# Change size and color for critical nodes
-node_sizes = []
-node_colors = []
-for node in G.nodes():
-    if node in critical_nodes_list:
-        node_sizes.append(150)
-        node_colors.append("red")
-    else:
-        node_sizes.append(50)
-        node_colors.append("lightgrey")
-
-nx.draw_networkx_edges(G, pos=pos, alpha=0.1, edge_color="gray", width=0.5)
-nx.draw_networkx_nodes(
-    G, pos=pos, node_color=node_colors, node_size=node_sizes, alpha=0.9
-)
-
-# Get node types for each node
-node_type_map = nx.get_node_attributes(G, 'node_type')
-
-# Add labels for critical nodes
-labels = {}
-for node in critical_nodes_list:
-    labels[node] = node_type_map.get(node)
-
-nx.draw_networkx_labels(G, pos=pos, labels=labels, font_size=8, font_weight="bold")
-
-# Add title
-plt.title("Critical nodes based on Top {TOP_N_RANK} centrality rankings")
-plt.axis("off")
-plt.show()
\ No newline at end of file
+def plot_critical_nodes(G, critical_nodes_list, cache=None, layout="auto"):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(15, 12))
+    if cache is None:
+        cache = MetricCache()
+    pos = LayoutService(G, cache).positions(layout)
+
+    # Change size and color for critical nodes
+    node_sizes = []
+    node_colors = []
+    for node in G.nodes():
+        if node in critical_nodes_list:
+            node_sizes.append(150)
+            node_colors.append("red")
+        else:
+            node_sizes.append(50)
+            node_colors.append("lightgrey")
+
+    nx.draw_networkx_edges(G, pos=pos, alpha=0.1, edge_color="gray", width=0.5)
+    nx.draw_networkx_nodes(
+        G, pos=pos, node_color=node_colors, node_size=node_sizes, alpha=0.9
+    )
+
+    # Get node types for each node
+    node_type_map = nx.get_node_attributes(G, 'node_type')
+
+    # Add labels for critical nodes
+    labels = {}
+    for node in critical_nodes_list:
+        labels[node] = node_type_map.get(node)
+
+    nx.draw_networkx_labels(G, pos=pos, labels=labels, font_size=8, font_weight="bold")
+
+    # Add title
+    plt.title(f"Critical nodes based on Top {TOP_N_RANK} centrality rankings")
+    plt.axis("off")
+    plt.show()
+
+
+def main(graph_path=GRAPH_FILE, plot=True, layout="auto"):
+    # Load graph
+    print(f"Loading Graph from {graph_path}")
+    G = load_graph(graph_path)
+    print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+
+    # Calculate centrality scores, results are cached on disk for the other scripts
+    metric_cache = MetricCache()
+    centrality_df = centrality_table(G, cache=metric_cache)
+
+    critical_nodes_df = critical_nodes(centrality_df)
+    critical_nodes_list = critical_nodes_df.index.tolist()
+
+    print(
+        f"\n{len(critical_nodes_list)} critical nodes found (Top {TOP_N_RANK} in >= {MIN_CENTRALITY_COUNT} measures):"
+    )
+    print(
+        critical_nodes_df[["node_type", "top_n_count"] + rank_columns(centrality_df)]
+    )
+
+    if plot:
+        plot_critical_nodes(
+            G, critical_nodes_list, cache=metric_cache, layout=layout
+        )
+    return centrality_df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Command line entry point for the pipeline stages:
+#   python cli.py build | weigh | simulate | queues | replay | paths | seeds |
+#                 centrality | bottlenecks | map
+# Every stage module is imported only when its command runs, and plots are
+# only drawn (and matplotlib only imported) with --plot, so headless runs
+# start fast. --metrics and --profile (before the command) switch on the
+# instrumentation of instrumentation.py for the run.
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def _build(args):
+    if args.incremental:
+        from message_ingest import build_incremental
+
+        G, rows = build_incremental(
+            args.nodes, args.messages, args.graph, args.checkpoint
+        )
+        print(f"Ingested {rows} new message records")
+    else:
+        from directed_graph import build
+
+        if len(args.messages) > 1:
+            raise SystemExit("Several message logs need --incremental")
+        G = build(args.nodes, args.messages[0], args.graph)
+    print(
+        f"Graph exported to {args.graph}: "
+        f"{G.number_of_nodes()} nodes, {G.number_of_edges()} edges"
+    )
+
+
+def _weigh(args):
+    from assign_weights import weigh
+
+    weigh(args.graph, args.output, args.formula)
+    print(f"Weighted graph exported to {args.output}")
+
+
+def _simulate(args):
+    from diffusion_simulation import main
+
+    main(
+        args.graph,
+        args.start_node,
+        args.realizations,
+        args.events,
+        args.plot,
+        args.layout,
+    )
+
+
+def _queues(args):
+    from queue_simulation import main
+
+    main(
+        args.graph,
+        args.start_node,
+        args.alerts,
+        args.interval,
+        args.capacity_period,
+        args.queue_periods,
+        args.output,
+    )
+
+
+def _replay(args):
+    from message_replay import main
+
+    main(args.messages, args.nodes, args.timestamps)
+
+
+def _paths(args):
+    from path_solver import main
+
+    main(args.graph, args.mode, args.output)
+
+
+def _seeds(args):
+    from influence import main
+
+    main(
+        args.graph,
+        args.k,
+        args.method,
+        args.deadline,
+        args.fixed,
+        args.epsilon,
+        args.processes,
+        args.output,
+    )
+
+
+def _centrality(args):
+    from centrality_analysis import main
+
+    main(args.graph, args.plot, args.layout)
+
+
+def _bottlenecks(args):
+    from identify_bottlenecks import main
+
+    main(args.graph, args.timestamps, args.plot, args.layout)
+
+
+def _map(args):
+    from folium_map import main
+
+    main(args.nodes, args.graph, args.output, args.tiles)
+
+
+def _add_plot_arguments(command):
+    command.add_argument("--plot", action="store_true")
+    command.add_argument(
+        "--layout",
+        choices=("auto", "spring", "geographic", "force"),
+        default="auto",
+        help="node positions for the graph plots",
+    )
+
+
+def parser():
+    graph_file = DATA_DIR / "communication_updated.graphml"
+    root = argparse.ArgumentParser(description="Disaster warning network pipeline")
+    root.add_argument(
+        "--metrics", type=Path, help="write stage metrics of the run to this file"
+    )
+    root.add_argument(
+        "--metrics-format", choices=("jsonl", "prometheus"), default="jsonl"
+    )
+    root.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="peak memory per stage with tracemalloc instead of the process RSS",
+    )
+    root.add_argument(
+        "--profile", type=Path, help="write sampled profiler stacks to this file"
+    )
+    commands = root.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build the graph from nodes and messages")
+    build.add_argument("--nodes", type=Path, default=DATA_DIR / "nodes.csv")
+    build.add_argument(
+        "--messages",
+        type=Path,
+        nargs="+",
+        default=[DATA_DIR / "message_records.csv"],
+        help="message logs, more than one only with --incremental",
+    )
+    build.add_argument("--graph", type=Path, default=DATA_DIR / "communication.graphml")
+    build.add_argument(
+        "--incremental",
+        action="store_true",
+        help="stream the logs through a checkpoint, reading only new messages",
+    )
+    build.add_argument(
+        "--checkpoint", type=Path, default=DATA_DIR / "message_ingest.checkpoint"
+    )
+    build.set_defaults(run=_build)
+
+    weigh = commands.add_parser("weigh", help="assign edge weights")
+    weigh.add_argument("--graph", type=Path, default=DATA_DIR / "communication.graphml")
+    weigh.add_argument("--output", type=Path, default=graph_file)
+    weigh.add_argument("--formula", default="delay_over_reliability")
+    weigh.set_defaults(run=_weigh)
+
+    simulate = commands.add_parser("simulate", help="run IC cascades")
+    simulate.add_argument("--graph", type=Path, default=graph_file)
+    simulate.add_argument("--start-node", default="Node_001")
+    simulate.add_argument("--realizations", type=int, default=1000)
+    simulate.add_argument(
+        "--no-events",
+        dest="events",
+        action="store_false",
+        help="skip the flood event targeted cascades",
+    )
+    _add_plot_arguments(simulate)
+    simulate.set_defaults(run=_simulate)
+
+    queues = commands.add_parser(
+        "queues", help="simulate relay queues under capacity and priority"
+    )
+    queues.add_argument("--graph", type=Path, default=graph_file)
+    queues.add_argument("--start-node", default="Node_001")
+    queues.add_argument("--alerts", type=int, default=1, help="number of alerts")
+    queues.add_argument(
+        "--interval", type=float, default=60.0, help="seconds between alerts"
+    )
+    queues.add_argument(
+        "--capacity-period",
+        type=float,
+        default=60.0,
+        help="seconds in which a node sends its capacity of messages",
+    )
+    queues.add_argument(
+        "--queue-periods",
+        type=float,
+        default=10,
+        help="queue bound in capacity periods of work",
+    )
+    queues.add_argument("--output", type=Path, default=DATA_DIR / "queue_timeline.csv")
+    queues.set_defaults(run=_queues)
+
+    replay = commands.add_parser(
+        "replay", help="observed latency and throughput from the message logs"
+    )
+    replay.add_argument("--messages", type=Path, default=DATA_DIR / "message_records.csv")
+    replay.add_argument("--nodes", type=Path, default=DATA_DIR / "nodes.csv")
+    replay.add_argument(
+        "--timestamps",
+        type=Path,
+        default=DATA_DIR / "timestamps_delay.csv",
+        help="simulated activation times to compare with",
+    )
+    replay.set_defaults(run=_replay)
+
+    paths = commands.add_parser(
+        "paths", help="deterministic path latencies from the control centers"
+    )
+    paths.add_argument("--graph", type=Path, default=graph_file)
+    paths.add_argument(
+        "--mode", choices=("delay", "weight", "reliability"), default="delay"
+    )
+    paths.add_argument("--output", type=Path, default=DATA_DIR / "path_latency.csv")
+    paths.set_defaults(run=_paths)
+
+    seeds = commands.add_parser(
+        "seeds", help="select extra alert seeds that maximize expected reach"
+    )
+    seeds.add_argument("--graph", type=Path, default=graph_file)
+    seeds.add_argument("-k", type=int, default=5, help="number of seeds to add")
+    seeds.add_argument("--method", choices=("ris", "celf", "celf++"), default="ris")
+    seeds.add_argument(
+        "--deadline", type=float, help="only count activations within these seconds"
+    )
+    seeds.add_argument(
+        "--fixed", nargs="+", default=["Node_001"], help="seeds that are always used"
+    )
+    seeds.add_argument(
+        "--epsilon", type=float, default=0.1, help="RIS approximation error"
+    )
+    seeds.add_argument(
+        "--processes", type=int, default=1, help="RIS sampling processes, 0 for all"
+    )
+    seeds.add_argument("--output", type=Path, default=DATA_DIR / "seed_selection.csv")
+    seeds.set_defaults(run=_seeds)
+
+    centrality = commands.add_parser("centrality", help="rank critical nodes")
+    centrality.add_argument("--graph", type=Path, default=graph_file)
+    _add_plot_arguments(centrality)
+    centrality.set_defaults(run=_centrality)
+
+    bottlenecks = commands.add_parser("bottlenecks", help="find bottleneck nodes")
+    bottlenecks.add_argument("--graph", type=Path, default=graph_file)
+    bottlenecks.add_argument(
+        "--timestamps", type=Path, default=DATA_DIR / "timestamps_delay.csv"
+    )
+    _add_plot_arguments(bottlenecks)
+    bottlenecks.set_defaults(run=_bottlenecks)
+
+    map_ = commands.add_parser("map", help="export the interactive map")
+    map_.add_argument("--nodes", type=Path, default=DATA_DIR / "nodes.csv")
+    map_.add_argument("--graph", type=Path, default=graph_file)
+    map_.add_argument("--output", type=Path, default=DATA_DIR / "interactive_map.html")
+    map_.add_argument(
+        "--tiles", type=Path, help="also write a GeoJSON tile pyramid to this directory"
+    )
+    map_.set_defaults(run=_map)
+    return root
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    if args.metrics is None and args.profile is None:
+        args.run(args)
+        return
+
+    from instrumentation import disable, enable, stage
+
+    enable(args.metrics, args.metrics_format, args.trace_memory, args.profile)
+    try:
+        with stage("command", command=args.command):
+            args.run(args)
+    finally:
+        disable()
+    if args.metrics is not None:
+        print(f"Metrics written to {args.metrics}")
+    if args.profile is not None:
+        print(f"Profile written to {args.profile}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,152 @@
+import math
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from node_generator import node_ids
+
+# Seeded, vectorized generator for synthetic alert diffusion datasets.
+# Produces the same two parts as the original diffusion_dataset.py loop:
+# 1. a tree where every node of a tier gets a message from a random node of
+#    the tier above it, and
+# 2. random alert_origin -> ... -> citizen paths until n_records is reached.
+# Each part is generated as arrays and yielded in chunks, so the CSV can be
+# streamed out without holding every record in memory.
+
+PROPAGATION_PATH = [
+    "alert_origin",
+    "control_center",
+    "media_outlet",
+    "community_leader",
+    "citizen",
+]
+
+MESSAGE_TYPES = np.array(["SMS", "App Notification"])
+DELAY_MIN, DELAY_MAX = 10, 180  # Seconds
+RELIABILITY_MIN, RELIABILITY_MAX = 0, 1
+CHUNK_RECORDS = 1_000_000
+
+
+# Node ids of each PROPAGATION_PATH tier from a nodes.csv table
+def tier_node_ids(nodes_df):
+    return [
+        nodes_df.loc[nodes_df["node_type"] == node_type, "node_id"].to_numpy()
+        for node_type in PROPAGATION_PATH
+    ]
+
+
+# Node ids of each tier for given tier sizes, numbered Node_001, Node_002, ...
+# across the tiers in PROPAGATION_PATH order like create_nodes.py does
+def tier_node_ids_from_counts(tier_counts):
+    tiers = []
+    first = 1
+    for count in tier_counts:
+        tiers.append(node_ids(first, count))
+        first += count
+    return tiers
+
+
+def _records(rng, sources, targets, sent, transmission_delay):
+    n = len(sources)
+    received = sent + transmission_delay * 1_000_000
+    return pd.DataFrame(
+        {
+            "source_node_id": sources,
+            "destination_node_id": targets,
+            "message_type": MESSAGE_TYPES[rng.integers(0, len(MESSAGE_TYPES), n)],
+            "timestamp_sent": np.datetime_as_string(sent, unit="us"),
+            "timestamp_received": np.datetime_as_string(received, unit="us"),
+            "delay_in_seconds": transmission_delay,
+            "reliability_score": np.round(
+                rng.uniform(RELIABILITY_MIN, RELIABILITY_MAX, n), 2
+            ),
+        }
+    )
+
+
+def _processing_delay(rng, n):
+    return rng.integers(DELAY_MIN, DELAY_MAX // 3, n, endpoint=True)
+
+
+def _transmission_delay(rng, n):
+    return rng.integers(DELAY_MIN, DELAY_MAX, n, endpoint=True)
+
+
+# Part 1, one message to every node below the alert_origin tier. A sender's
+# send time is indexed on its first message: later messages from the same
+# node are sent a processing delay after that first send.
+def tree_records(rng, tiers, alert_time):
+    for i in range(len(tiers) - 1):
+        sources_pool, targets = tiers[i], tiers[i + 1]
+        if len(targets) == 0 or len(sources_pool) == 0:
+            continue
+        sources = sources_pool[rng.integers(0, len(sources_pool), len(targets))]
+        processing_delay = _processing_delay(rng, len(targets))
+
+        _, first_index, inverse = np.unique(
+            sources, return_index=True, return_inverse=True
+        )
+        first_sent = processing_delay[first_index]
+        is_first = np.zeros(len(targets), dtype=bool)
+        is_first[first_index] = True
+        offset = np.where(
+            is_first, processing_delay, first_sent[inverse] + processing_delay
+        )
+        sent = alert_time + offset * 1_000_000
+        transmission_delay = _transmission_delay(rng, len(targets))
+        yield _records(rng, sources, targets, sent, transmission_delay)
+
+
+# Part 2, n_paths random paths through all tiers, chunk_paths at a time.
+# Records of one path are consecutive, hop by hop.
+def path_records(rng, tiers, n_paths, alert_time, chunk_paths):
+    hops = len(tiers) - 1
+    for first in range(0, n_paths, chunk_paths):
+        n = min(chunk_paths, n_paths - first)
+        path_nodes = np.stack(
+            [tier[rng.integers(0, len(tier), n)] for tier in tiers], axis=1
+        )
+        transmission_delay = _transmission_delay(rng, (n, hops))
+        processing_delay = _processing_delay(rng, (n, hops))
+        # Hop k is sent after all earlier transmissions and processing delays
+        step = transmission_delay + processing_delay
+        sent_offset = np.cumsum(step, axis=1) - step
+        sent = alert_time + sent_offset * 1_000_000
+        yield _records(
+            rng,
+            path_nodes[:, :-1].ravel(),
+            path_nodes[:, 1:].ravel(),
+            sent.ravel(),
+            transmission_delay.ravel(),
+        )
+
+
+# Yield message record chunks for at least n_records records.
+# tiers lists the node ids of each PROPAGATION_PATH tier.
+def generate_message_records(
+    tiers, n_records=300, seed=42, alert_time=None, chunk_records=CHUNK_RECORDS
+):
+    rng = np.random.default_rng(seed)
+    if alert_time is None:
+        alert_time = datetime.now()
+    alert_time = np.datetime64(alert_time, "us")
+
+    produced = 0
+    for chunk in tree_records(rng, tiers, alert_time):
+        produced += len(chunk)
+        yield chunk
+
+    if n_records > produced and all(len(tier) for tier in tiers):
+        hops = len(tiers) - 1
+        n_paths = math.ceil((n_records - produced) / hops)
+        chunk_paths = max(1, chunk_records // hops)
+        yield from path_records(rng, tiers, n_paths, alert_time, chunk_paths)
+
+
+# Stream record chunks into a CSV file, returns the number of records
+def write_message_records(chunks, output_path):
+    written = 0
+    for chunk in chunks:
+        first = written == 0
+        chunk.to_csv(output_path, mode="w" if first else "a", header=first, index=False)
+        written += len(chunk)
+    return written
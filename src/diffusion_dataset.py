@@ -1,92 +1,43 @@
 import pandas as pd
-import random
 from pathlib import Path
-from datetime import datetime, timedelta
-
-node_list = Path(__file__).parent / "data" / "nodes.csv"
-nodes_df = pd.read_csv(node_list)
-
-PROPAGATION_PATH = [
-    "alert_origin",
-    "control_center",
-    "media_outlet",
-    "community_leader",
-    "citizen",
-]
-
-MESSAGE_TYPES = ["SMS", "App Notification"]
-DELAY_MIN, DELAY_MAX = 10, 180  # Seconds
-RELIABILITY_MIN, RELIABILITY_MAX = 0, 1
-
-message_records = []
-alert_time = datetime.now()
-
-
-# From message records, get the sent timestamp of a node
-def get_timestamp_sent(node_id):
-    for message in message_records:
-        if message["source_node_id"] == node_id:
-            return datetime.fromisoformat(message["timestamp_sent"])
-    return alert_time
-
-
-# Randomly generate connections between all nodes
-for i in range(len(PROPAGATION_PATH) - 1):
-    source_nodes = nodes_df[nodes_df["node_type"] == PROPAGATION_PATH[i]]
-    target_nodes = nodes_df[nodes_df["node_type"] == PROPAGATION_PATH[i + 1]]
-    time_sent = alert_time
-    for _, target in target_nodes.iterrows():
-        random_node = source_nodes.sample(1).iloc[0]
-        processing_delay = random.randint(DELAY_MIN, DELAY_MAX // 3)
-        time_sent = get_timestamp_sent(random_node["node_id"]) + timedelta(
-            seconds=processing_delay
-        )
-        transmission_delay = random.randint(DELAY_MIN, DELAY_MAX)
-        time_received = time_sent + timedelta(seconds=transmission_delay)
-        message_records.append(
-            {
-                "source_node_id": random_node["node_id"],
-                "destination_node_id": target["node_id"],
-                "message_type": random.choice(MESSAGE_TYPES),
-                "timestamp_sent": time_sent.isoformat(),
-                "timestamp_received": time_received.isoformat(),
-                "delay_in_seconds": transmission_delay,
-                "reliability_score": round(
-                    random.uniform(RELIABILITY_MIN, RELIABILITY_MAX), 2
-                ),
-            }
-        )
-
-# Randomly generate at least 300 message records
-while len(message_records) < 300:
-    path_nodes = []
-    for node_type in PROPAGATION_PATH:
-        type_nodes = nodes_df[nodes_df["node_type"] == node_type]
-        random_node = type_nodes.sample(1).iloc[0]
-        path_nodes.append(random_node)
-    time_sent = alert_time
-    for i in range(len(path_nodes) - 1):
-        transmission_delay = random.randint(DELAY_MIN, DELAY_MAX)
-        time_received = time_sent + timedelta(seconds=transmission_delay)
-        message_records.append(
-            {
-                "source_node_id": path_nodes[i]["node_id"],
-                "destination_node_id": path_nodes[i + 1]["node_id"],
-                "message_type": random.choice(MESSAGE_TYPES),
-                "timestamp_sent": time_sent.isoformat(),
-                "timestamp_received": time_received.isoformat(),
-                "delay_in_seconds": transmission_delay,
-                "reliability_score": round(
-                    random.uniform(RELIABILITY_MIN, RELIABILITY_MAX), 2
-                ),
-            }
-        )
-        # Delay to not send the received message immediately
-        processing_delay = random.randint(DELAY_MIN, DELAY_MAX // 3)
-        time_sent = time_received + timedelta(seconds=processing_delay)
-
-messages_df = pd.DataFrame(message_records)
-output_path = Path(__file__).parent / "data" / "message_records.csv"
-messages_df.to_csv(output_path, index=False)
-
-print(f"Synthetic alert diffusion dataset exported to {output_path}")
+from dataset_generator import (
+    generate_message_records,
+    tier_node_ids,
+    tier_node_ids_from_counts,
+    write_message_records,
+)
+
+# Number of message records to generate at least, and the seed for all random choices
+N_RECORDS = 300
+SEED = 42
+
+# Node counts per PROPAGATION_PATH tier for stress datasets, e.g. [1, 100, 1000, 10000, 100000].
+# None takes the nodes from nodes.csv instead.
+TIER_COUNTS = None
+
+NODES_FILE = Path(__file__).parent / "data" / "nodes.csv"
+MESSAGES_FILE = Path(__file__).parent / "data" / "message_records.csv"
+
+
+def main(
+    n_records=N_RECORDS,
+    seed=SEED,
+    tier_counts=TIER_COUNTS,
+    nodes_path=NODES_FILE,
+    output_path=MESSAGES_FILE,
+):
+    if tier_counts is None:
+        tiers = tier_node_ids(pd.read_csv(nodes_path))
+    else:
+        tiers = tier_node_ids_from_counts(tier_counts)
+
+    # Generate the records in chunks and stream them into the CSV
+    written = write_message_records(
+        generate_message_records(tiers, n_records=n_records, seed=seed), output_path
+    )
+
+    print(f"Synthetic alert diffusion dataset exported to {output_path} ({written} records)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,173 +1,273 @@
 import networkx as nx
 from pathlib import Path
-import random
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+from cascade import simulate_cascade
+from ensemble import run_ensemble
+from graph_arrays import from_networkx
+from graph_snapshot import load_graph
+from instrumentation import stage
+from layout import LayoutService
+from metric_cache import MetricCache
+from spatial_index import from_arrays, load_events
 
 # TASK 6
 # The propagation model selected for this task is Independent Cascade (IC)
 
 # Get graph file from data
 GRAPH_FILE = Path(__file__).parent / "data" / "communication_updated.graphml"
+TIMESTAMPS_FILE = Path(__file__).parent / "data" / "timestamps_delay.csv"
+ACTIVATION_FILE = Path(__file__).parent / "data" / "activation_probability.csv"
+
+START_NODE = "Node_001"
+# Ensemble of IC realizations, a single run says little about expected reach and delay
+N_REALIZATIONS = 1000
+# Event-targeted cascades measure reach among the nodes this close to an event
+EVENT_RADIUS_KM = 300
+
+
+# Run one IC realization, returns activation_times and the engine statistics
+def simulate(G, start_node=START_NODE, rng=None):
+    simulation_stats = {}
+    with stage("cascade", start_node=start_node) as timer:
+        activation_times = simulate_cascade(
+            G, start_node, rng=rng, stats=simulation_stats
+        )
+        events = simulation_stats["processed_events"] + simulation_stats["stale_events"]
+        timer.record(
+            events=events,
+            stale_ratio=simulation_stats["stale_events"] / events if events else 0.0,
+            queue_high_water=simulation_stats["queue_high_water"],
+            activated=len(activation_times),
+        )
+    return activation_times, simulation_stats
+
+
+# TASK 7
+# timestamps_delay table of one realization: node_id, activation_time,
+# node_type and delay
+def activation_table(G, activation_times):
+    timestamps_df = pd.DataFrame(
+        {
+            "node_id": list(activation_times.keys()),
+            "activation_time": list(activation_times.values()),
+        }
+    )
+
+    # Add node type information from the graph
+    node_type_map = nx.get_node_attributes(G, "node_type")
+    timestamps_df["node_type"] = (
+        timestamps_df["node_id"].map(node_type_map).fillna("Unknown")
+    )
+
+    # Calculate delay (GDACS alert origin is 0.0 => no subtraction needed)
+    timestamps_df["delay"] = timestamps_df["activation_time"]
+    return timestamps_df
+
+
+# Group nodes by type, calculate average, minimum and maximum delays and rename columns
+def delay_stats(timestamps_df):
+    delay_stats_df = (
+        timestamps_df.groupby("node_type")["delay"]
+        .agg(["mean", "min", "max", "count"])
+        .reset_index()
+    )
+    return delay_stats_df.rename(
+        columns={
+            "mean": "Average delay (s)",
+            "min": "Minimum delay (s)",
+            "max": "Maximum delay (s)",
+            "count": "Nodes activated",
+        }
+    )
+
+
+# Ensemble summary per node with node types, and the reach of every
+# realization
+def simulate_ensemble(
+    arrays, start_node=START_NODE, n_realizations=N_REALIZATIONS, seed=42
+):
+    with stage("ensemble", start_node=start_node) as timer:
+        ensemble_df, reach = run_ensemble(
+            arrays, start_node, n_realizations, rng=np.random.default_rng(seed)
+        )
+        timer.record(
+            realizations=n_realizations,
+            mean_reach=float(reach.mean()),
+        )
+    if "node_type" in arrays.node_attrs:
+        ensemble_df["node_type"] = arrays.node_attrs["node_type"]
+    return ensemble_df, reach
+
+
+# Event-targeted cascades: seed each flood event at its nearest control center
+# and measure reach among the nodes within radius_km of the event
+def event_reach(
+    arrays, events_df, n_realizations=N_REALIZATIONS, radius_km=EVENT_RADIUS_KM, seed=42
+):
+    node_index = from_arrays(arrays)
+    event_records = []
+    for event in events_df.itertuples():
+        affected, _ = node_index.within_radius(event.latitude, event.longitude, radius_km)
+        (event_seed,), (seed_distance,) = node_index.nearest(
+            event.latitude, event.longitude, k=1, node_type="control_center"
+        )
+        event_df, _ = run_ensemble(
+            arrays, event_seed, n_realizations, rng=np.random.default_rng(seed)
+        )
+        event_records.append(
+            {
+                "eventid": event.eventid,
+                "name": event.name,
+                "seed_node": event_seed,
+                "seed_distance_km": round(seed_distance, 1),
+                "affected_nodes": len(affected),
+                "expected_affected_reach": event_df.loc[
+                    affected, "activation_probability"
+                ].mean()
+                if len(affected)
+                else np.nan,
+            }
+        )
+    return pd.DataFrame(event_records)
 
-# Load graph
-print(f"Loading Graph from {GRAPH_FILE}")
-G = nx.read_graphml(GRAPH_FILE)
-print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
-
-# Save alert_origin node to variable, set up activation_times to track nodes and times and event_queue to keep track of events remaining
-start_node = "Node_001"
-activation_times = {start_node: 0.0}
-event_queue = []
-
-# Initialize event list with attempts from the start node
-for neighbor in G.successors(start_node):
-    edge_data = G.get_edge_data(start_node, neighbor)
-    delay = float(edge_data.get("delay"))
-
-    # Add event to queue
-    event_queue.append((0.0 + delay, neighbor, start_node))
-
-processed_events = 0
-# Loop while events in queue
-while event_queue:
-    processed_events += 1
-    # Sort event queue by time in each iteration
-    event_queue.sort()
-    # Get and remove the earliest event from queue
-    activation_attempt_time, target_node, source_node = event_queue.pop(0)
-
-    # Check if activation is a success based on reliability
-    edge_data = G.get_edge_data(source_node, target_node)
-    realiability = float(edge_data.get("reliability"))
-
-    if random.random() <= realiability:
-        # Activation successful
-        activation_times[target_node] = activation_attempt_time
-
-        # Schedule activation attempts for its neighbors
-        for neighbor in G.successors(target_node):
-            # Only schedule unactivated neighbors
-            if neighbor not in activation_times:
-                neighbor_edge_data = G.get_edge_data(target_node, neighbor)
-                delay = float(neighbor_edge_data.get("delay"))
-
-                # Time when neighbor will receive the message
-                neighbor_activation_time = activation_attempt_time + delay
-                # Append new event to event queue
-                event_queue.append((neighbor_activation_time, neighbor, target_node))
-
-print(f"\nSimulation finished. Processed {processed_events} potential events.")
-print(f"{len(activation_times)} out of {G.number_of_nodes()} nodes activated.")
 
 # Visualize results
+def plot_activation(G, start_node, activation_times, layout="auto"):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 10))
+    # Determine simple node colors
+    node_colors = []
+    color_map = {"start": "green", "activated": "red", "inactive": "lightgrey"}
+    for node in G.nodes():
+        if node == start_node:
+            node_colors.append(color_map["start"])
+        elif node in activation_times:
+            node_colors.append(color_map["activated"])
+        else:
+            node_colors.append(color_map["inactive"])
+
+    # Draw the graph with simple colors and uniform node size, layout is shared with the other scripts
+    pos = LayoutService(G, MetricCache()).positions(layout)
+    nx.draw_networkx_edges(G, pos=pos, alpha=0.1, edge_color="gray", width=0.5)
+    nx.draw_networkx_nodes(G, pos=pos, node_color=node_colors, node_size=40, alpha=0.9)
+
+    # Add legend
+    legend_handles = [
+        plt.Line2D(
+            [0], [0], marker="o", color="w", label=t, markersize=8, markerfacecolor=c
+        )
+        for t, c in color_map.items()
+    ]
+    plt.legend(
+        handles=legend_handles,
+        title="Node Types",
+        loc="upper right",
+        bbox_to_anchor=(1.0, 1.0),
+    )
+
+    # Add title
+    plt.title("Network Graph Highlighting Activated Nodes")
+    plt.axis("off")
+    plt.show()
+
 
-plt.figure(figsize=(12, 10))
-# Determine simple node colors
-node_colors = []
-color_map = {"start": "green", "activated": "red", "inactive": "lightgrey"}
-for node in G.nodes():
-    if node == start_node:
-        node_colors.append(color_map["start"])
-    elif node in activation_times:
-        node_colors.append(color_map["activated"])
-    else:
-        node_colors.append(color_map["inactive"])
-
-# Draw the graph with simple colors and uniform node size
-nx.draw_networkx_edges(
-    G, pos=nx.spring_layout(G, seed=42), alpha=0.1, edge_color="gray", width=0.5
-)
-nx.draw_networkx_nodes(
-    G, pos=nx.spring_layout(G, seed=42), node_color=node_colors, node_size=40, alpha=0.9
-)
-
-# Add legend
-legend_handles = [
-    plt.Line2D(
-        [0], [0], marker="o", color="w", label=t, markersize=8, markerfacecolor=c
+def plot_delay_stats(delay_stats_df):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    # Create indexes for bar plot
+    plot_data = delay_stats_df.set_index("node_type")[
+        ["Average delay (s)", "Minimum delay (s)", "Maximum delay (s)"]
+    ]
+
+    # Create bar plot and add labels
+    plot_data.plot(kind="bar", ax=ax)
+    ax.set_xlabel("Stakeholder type", color="red")
+    ax.set_ylabel("Delay (s)", color="red")
+    ax.tick_params(axis="x", rotation=0)
+
+    # Add title
+    plt.title("Bar Plot Comparing Alert Delays")
+    plt.show()
+
+
+def main(
+    graph_path=GRAPH_FILE,
+    start_node=START_NODE,
+    n_realizations=N_REALIZATIONS,
+    events=True,
+    plot=True,
+    layout="auto",
+):
+    # Load graph
+    print(f"Loading Graph from {graph_path}")
+    G = load_graph(graph_path)
+    print(f"Graph loaded: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+
+    # Run the cascade from the alert_origin node, activation_times tracks activated nodes and times
+    activation_times, simulation_stats = simulate(G, start_node)
+
+    print(
+        f"\nSimulation finished. Processed {simulation_stats['processed_events']} potential events."
     )
-    for t, c in color_map.items()
-]
-legend1 = plt.legend(
-    handles=legend_handles,
-    title="Node Types",
-    loc="upper right",
-    bbox_to_anchor=(1.0, 1.0),
-)
+    print(f"{len(activation_times)} out of {G.number_of_nodes()} nodes activated.")
 
-# Add title
-plt.title("Network Graph Highlighting Activated Nodes")
-plt.axis("off")
-plt.show()
+    if plot:
+        plot_activation(G, start_node, activation_times, layout)
 
-# Analyze results
+    # Analyze results
 
-# Extract times for analysis
-times_list = list(activation_times.values())
-max_time = np.max(times_list)
-avg_time = np.mean(times_list)
-reach_fraction = len(activation_times) / G.number_of_nodes()
+    # Extract times for analysis
+    times_list = list(activation_times.values())
+    max_time = np.max(times_list)
+    avg_time = np.mean(times_list)
+    reach_fraction = len(activation_times) / G.number_of_nodes()
 
-print(f"Alert Reach: {reach_fraction:.2%}")
-print(f"Max Activation Time (Simulation Duration): {max_time:.2f} seconds")
-print(f"Average Activation Time (among activated): {avg_time:.2f} seconds")
+    print(f"Alert Reach: {reach_fraction:.2%}")
+    print(f"Max Activation Time (Simulation Duration): {max_time:.2f} seconds")
+    print(f"Average Activation Time (among activated): {avg_time:.2f} seconds")
 
+    timestamps_df = activation_table(G, activation_times)
+    delay_stats_df = delay_stats(timestamps_df)
 
-# TASK 7
-# Create pandas dataframe from activation_times
-timestamp_records = []
-for node, time in activation_times.items():
-    timestamp_records.append({"node_id": node, "activation_time": time})
+    print("\nPropagation delay for each group:")
+    print(delay_stats_df)
 
-timestamps_df = pd.DataFrame(timestamp_records)
+    if plot:
+        plot_delay_stats(delay_stats_df)
 
-# Add node type information from the graph
-node_type_map = nx.get_node_attributes(G, "node_type")
-timestamps_df["node_type"] = (
-    timestamps_df["node_id"].map(node_type_map).fillna("Unknown")
-)
+    # Save results
+    timestamps_df.to_csv(TIMESTAMPS_FILE, index=False)
 
-# Calculate delay (GDACS alert origin is 0.0 => no subtraction needed)
-timestamps_df["delay"] = timestamps_df["activation_time"]
+    arrays = from_networkx(G, node_attrs=("node_type", "latitude", "longitude"))
+    ensemble_df, reach = simulate_ensemble(arrays, start_node, n_realizations)
+    reach_fractions = reach / G.number_of_nodes()
 
-# Group nodes by type, calculate average, minimum and maximum delays and rename columns
-delay_stats_df = (
-    timestamps_df.groupby("node_type")["delay"]
-    .agg(["mean", "min", "max", "count"])
-    .reset_index()
-)
-delay_stats_df = delay_stats_df.rename(
-    columns={
-        "mean": "Average delay (s)",
-        "min": "Minimum delay (s)",
-        "max": "Maximum delay (s)",
-        "count": "Nodes activated",
-    }
-)
-
-print("\nPropagation delay for each group:")
-print(delay_stats_df)
+    print(f"\nEnsemble of {n_realizations} realizations:")
+    print(
+        f"Alert Reach: mean {reach_fractions.mean():.2%}, "
+        f"5th-95th percentile {np.percentile(reach_fractions, 5):.2%} - "
+        f"{np.percentile(reach_fractions, 95):.2%}"
+    )
 
-# Visualize results
-fig, ax = plt.subplots(figsize=(10, 6))
-
-# Create indexes for bar plot
-plot_data = delay_stats_df.set_index("node_type")[
-    ["Average delay (s)", "Minimum delay (s)", "Maximum delay (s)"]
-]
-
-# Create bar plot and add labels
-plot_data.plot(kind="bar", ax=ax)
-ax.set_xlabel("Stakeholder type", color="red")
-ax.set_ylabel("Delay (s)", color="red")
-ax.tick_params(axis="x", rotation=0)
-
-# Add title
-plt.title("Bar Plot Comparing Alert Delays")
-plt.show()
-
-# Save results
-output_path = Path(__file__).parent / "data" / "timestamps_delay.csv"
-timestamps_df.to_csv(output_path, index=False)
+    print("\nActivation probability and median delay for each group:")
+    print(
+        ensemble_df.groupby("node_type")[
+            ["activation_probability", "activation_time_q50"]
+        ].mean()
+    )
+
+    ensemble_df.to_csv(ACTIVATION_FILE)
+
+    if events:
+        print(f"\nFlood events, reach within {EVENT_RADIUS_KM} km of the event:")
+        events_df = event_reach(arrays, load_events(), n_realizations)
+        print(events_df.to_string(index=False))
+    return timestamps_df, ensemble_df
+
+
+if __name__ == "__main__":
+    main()
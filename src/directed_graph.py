@@ -1,43 +1,39 @@
 import pandas as pd
 import networkx as nx
 from pathlib import Path
+from graph_builder import aggregate_messages, build_graph
+from graph_snapshot import snapshot_path, write_snapshot
 
-nodes_path = Path(__file__).parent / "data" / "nodes.csv"
-messages_path = Path(__file__).parent / "data" / "message_records.csv"
-nodes_df = pd.read_csv(nodes_path)
-messages_df = pd.read_csv(messages_path)
-
-# Construct a directed graph
-G = nx.DiGraph()
-
-# Add nodes to the graph
-for _, row in nodes_df.iterrows():
-    node = row["node_id"]
-    G.add_node(node)
-    G.nodes[node]["node_type"] = row["node_type"]
-    G.nodes[node]["latitude"] = row["latitude"]
-    G.nodes[node]["longitude"] = row["longitude"]
-    G.nodes[node]["role_priority"] = row["role_priority"]
-    G.nodes[node]["capacity"] = row["capacity"]
-    G.nodes[node]["influence_score"] = row["influence_score"]
-
-# Assing relevant edge attributes from grouped messages
-messages_group = messages_df.groupby(["source_node_id", "destination_node_id"])
-for message in messages_group:
-    src = message[0][0]
-    tgt = message[0][1]
-    avg_delay = round(float(message[1]["delay_in_seconds"].mean()), 2)
-    avg_reliability = round(float(message[1]["reliability_score"].mean()), 2)
-    message_count = int(message[1]["message_type"].count())
-    G.add_edge(
-        src, tgt, delay=avg_delay, reliability=avg_reliability, messages=message_count
-    )
-
-# Graph direction and connection validation
-print(f"Graph is directed: {nx.is_directed(G)}")
-print(f"Graph is connected: {nx.is_weakly_connected(G)}")
-
-# Export the graph
-graph_path = Path(__file__).parent / "data" / "communication.graphml"
-nx.write_graphml(G, graph_path)
-print(f"Graph exported to {graph_path}")
+NODES_FILE = Path(__file__).parent / "data" / "nodes.csv"
+MESSAGES_FILE = Path(__file__).parent / "data" / "message_records.csv"
+GRAPH_FILE = Path(__file__).parent / "data" / "communication.graphml"
+
+
+# Build the communication graph from the node and message tables and export
+# it as GraphML plus a binary snapshot
+def build(nodes_path=NODES_FILE, messages_path=MESSAGES_FILE, graph_path=GRAPH_FILE):
+    nodes_df = pd.read_csv(nodes_path)
+    messages_df = pd.read_csv(messages_path)
+
+    # Aggregate messages into one row per edge and construct the directed graph
+    edges_df = aggregate_messages(messages_df)
+    G = build_graph(nodes_df, edges_df)
+
+    # Export the graph
+    nx.write_graphml(G, graph_path)
+    # Binary snapshot for fast loading, GraphML stays as the export format
+    write_snapshot(G, snapshot_path(graph_path))
+    return G
+
+
+def main():
+    G = build()
+
+    # Graph direction and connection validation
+    print(f"Graph is directed: {nx.is_directed(G)}")
+    print(f"Graph is connected: {nx.is_weakly_connected(G)}")
+    print(f"Graph exported to {GRAPH_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,8 @@
-import json
-from gdacs.api import GDACSAPIReader
-from datetime import datetime, timedelta, timezone
 import pandas as pd
-from pathlib import Path
+from gdacs_poller import EVENTS_FILE, HISTORY_DAYS, default_client, filter_events
 
-client = GDACSAPIReader()
-# Define the date range: past two years
-end_date = datetime.now(timezone.utc)
-start_date = end_date - timedelta(days=730)
-# Fetch latest flood events
-events = client.latest_events(event_type="FL")
-# Access the 'features' list within the GeoJSON response
-events_features = events.features
-
-print(f"Number of events {len(events_features)}")
-
-# Make pandas DataFrame from the countries csv
-countries_df = pd.read_csv(
-    f"{Path(__file__).parent}/data/Countries-Europe.csv", usecols=["name"]
-)
-
-# Filter events to only include those in Europe
-filtered_events = [
-    event
-    for event in events_features
-    if event["properties"]["country"] in countries_df["name"].values
-]
-
-print(f"Number of events in Europe {len(filtered_events)}")
-
-# Filter events to 2 last years
-filtered_events = [
-    event
-    for event in filtered_events
-    if start_date
-    <= datetime.fromisoformat(filtered_events[0]["properties"]["fromdate"]).replace(
-        tzinfo=timezone.utc
-    )
-    <= end_date
-]
-
-print(f"Number of events in Europe in the last 2 years {len(filtered_events)}")
-
-print(f"Filtered events: {json.dumps(filtered_events, indent=2)}")
+# One-shot download of the European flood events of the past two years.
+# gdacs_poller.py keeps the same file up to date incrementally.
 
 
 # Export to CSV
@@ -53,7 +13,24 @@ def export_to_csv(events, filename):
     df.to_csv(filename, index=False)
 
 
-export_to_csv(
-    filtered_events,
-    f"{Path(__file__).parent}/data/flood_events.csv",
-)
+def main(client=None, output_path=EVENTS_FILE):
+    if client is None:
+        client = default_client()
+    # Fetch latest flood events
+    events = client.latest_events(event_type="FL")
+    # Access the 'features' list within the GeoJSON response
+    events_features = events.features
+
+    print(f"Number of events {len(events_features)}")
+
+    # Filter events to those in Europe that started in the last 2 years
+    filtered_events = filter_events(events_features, HISTORY_DAYS)
+
+    print(f"Number of events in Europe in the last 2 years {len(filtered_events)}")
+
+    export_to_csv(filtered_events, output_path)
+    return filtered_events
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,14 @@
+import json
 import pandas as pd
-import networkx as nx
 import numpy as np
-import folium
 from pathlib import Path
+from graph_snapshot import load_graph
+from centrality import CentralityService
+from metric_cache import MetricCache
 
-# Load node dataset into pandas dataframe
-nodes_path = Path(__file__).parent / "data" / "nodes.csv"
-nodes_df = pd.read_csv(nodes_path)
-
-# Load graph
-graph_path = Path(__file__).parent / "data" / "communication_updated.graphml"
-G = nx.read_graphml(graph_path)
-
-# Ensure that latitude and longitude fields are correctly formatted
-nodes_df["latitude"] = nodes_df["latitude"].astype(float)
-nodes_df["longitude"] = nodes_df["longitude"].astype(float)
-
-# Centrality values
-betweenness_centrality = nx.betweenness_centrality(G, weight="delay")
-centrality_values = np.array([c for c in betweenness_centrality.values()])
-
-# Normalize centrality values
-min_centrality, max_centrality = min(centrality_values), max(centrality_values)
-centralities_normalized = np.array(
-    [
-        round((c - min_centrality) / (max_centrality - min_centrality), 2)
-        for c in centrality_values
-    ]
-)
-
-# Create a folium map located at the average latitude and longitude of the nodes
-m = folium.Map(location=[nodes_df["latitude"].mean(), nodes_df["longitude"].mean()])
+NODES_FILE = Path(__file__).parent / "data" / "nodes.csv"
+GRAPH_FILE = Path(__file__).parent / "data" / "communication_updated.graphml"
+MAP_FILE = Path(__file__).parent / "data" / "interactive_map.html"
 
 # Customized colors based on node type
 customized_colors = {
@@ -41,21 +19,162 @@ customized_colors = {
     "citizen": "gray",
 }
 
-# Add circle markers for each node sized by centrality value and colored by node type
-for i, row in nodes_df.iterrows():
-    node_id = row["node_id"]
-    node_type = row["node_type"]
-    centrality = centralities_normalized[i]
-    folium.CircleMarker(
-        location=(row["latitude"], row["longitude"]),
-        radius=5 + (centrality * 20),
-        color=customized_colors.get(node_type),
-        fill=True,
-        fill_color=customized_colors.get(node_type),
-        fill_opacity=0.7,
-        popup=f"ID:{node_id} Type:{node_type} Centrality:{centrality}",
-    ).add_to(m)
-
-output_path = Path(__file__).parent / "data" / "interactive_map.html"
-m.save(output_path)
-print(f"Map exported to {output_path}")
+# Node types with more nodes than this are clustered in the browser until
+# CLUSTER_UNTIL_ZOOM, smaller ones are always drawn as individual markers
+CLUSTER_MIN_NODES = 500
+CLUSTER_UNTIL_ZOOM = 10
+COORDINATE_DECIMALS = 5  # About a meter, keeps the embedded data compact
+
+# Optional GeoJSON tile pyramid, z/x/y.geojson in Web Mercator tiling. Each
+# tile keeps its TILE_FEATURES most central nodes, so low zoom levels only
+# carry the nodes that matter at that scale.
+TILE_ZOOMS = range(0, 9)
+TILE_FEATURES = 1000
+
+# Marker drawn for each data row [lat, lon, node_id, centrality], the color
+# is filled in per node type layer
+MARKER_CALLBACK = """
+function callback(row) {
+    return L.circleMarker([row[0], row[1]], {
+        radius: 5 + row[3] * 20,
+        color: "%s",
+        fill: true,
+        fillColor: "%s",
+        fillOpacity: 0.7
+    }).bindPopup("ID:" + row[2] + " Type:%s Centrality:" + row[3]);
+}
+"""
+
+
+# One row per node with its coordinates and betweenness centrality normalized
+# to 0..1. Centrality is joined by node_id, nodes missing from the graph get 0.
+def node_layer(nodes_df, betweenness_centrality):
+    centrality = (
+        pd.Series(betweenness_centrality, dtype=float)
+        .reindex(nodes_df["node_id"])
+        .fillna(0.0)
+        .to_numpy()
+    )
+    normalized = np.zeros_like(centrality)
+    if len(centrality) and centrality.max() > centrality.min():
+        spread = centrality.max() - centrality.min()
+        normalized = (centrality - centrality.min()) / spread
+    coordinates = nodes_df[["latitude", "longitude"]].to_numpy(dtype=float)
+    coordinates = coordinates.round(COORDINATE_DECIMALS)
+    return pd.DataFrame(
+        {
+            "node_id": nodes_df["node_id"].to_numpy(),
+            "node_type": nodes_df["node_type"].to_numpy(),
+            "latitude": coordinates[:, 0],
+            "longitude": coordinates[:, 1],
+            "centrality": np.round(normalized, 2),
+        }
+    )
+
+
+# Folium map with a circle marker per node, sized by the normalized
+# betweenness centrality and colored by node type. Each node type is one
+# toggleable layer whose markers are built in the browser from a compact
+# data array, and large layers are clustered until zoomed in.
+def build_map(nodes_df, betweenness_centrality):
+    import folium
+    from folium.plugins import FastMarkerCluster
+
+    layer_df = node_layer(nodes_df, betweenness_centrality)
+
+    # Create a folium map located at the average latitude and longitude of the nodes
+    m = folium.Map(
+        location=[layer_df["latitude"].mean(), layer_df["longitude"].mean()],
+        prefer_canvas=True,
+    )
+
+    for node_type, type_df in layer_df.groupby("node_type", sort=False):
+        color = customized_colors.get(node_type, "black")
+        clustered = len(type_df) > CLUSTER_MIN_NODES
+        FastMarkerCluster(
+            type_df[["latitude", "longitude", "node_id", "centrality"]].values.tolist(),
+            callback=MARKER_CALLBACK % (color, color, node_type),
+            name=f"{node_type} ({len(type_df)})",
+            disableClusteringAtZoom=CLUSTER_UNTIL_ZOOM if clustered else 0,
+            chunkedLoading=True,
+        ).add_to(m)
+    folium.LayerControl(collapsed=False).add_to(m)
+    return m
+
+
+# Web Mercator tile coordinates of every node at a zoom level
+def tile_coordinates(latitude, longitude, zoom):
+    n = 2**zoom
+    lat = np.radians(np.clip(latitude, -85.0511, 85.0511))
+    x = ((longitude + 180.0) / 360.0 * n).astype(np.int64)
+    y = ((1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n).astype(np.int64)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+
+def _feature_collection(tile_df):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {
+                    "node_id": node_id,
+                    "node_type": node_type,
+                    "centrality": centrality,
+                },
+            }
+            for node_id, node_type, lat, lon, centrality in tile_df.itertuples(
+                index=False
+            )
+        ],
+    }
+
+
+# Pre-render the node layer into a z/x/y.geojson tile pyramid for serving
+# next to the map. Returns the number of tiles written.
+def write_tiles(layer_df, directory, zooms=TILE_ZOOMS, max_features=TILE_FEATURES):
+    directory = Path(directory)
+    # Most central first, so head() keeps the most important nodes per tile
+    layer_df = layer_df.sort_values("centrality", ascending=False, kind="stable")
+    written = 0
+    for zoom in zooms:
+        x, y = tile_coordinates(
+            layer_df["latitude"].to_numpy(), layer_df["longitude"].to_numpy(), zoom
+        )
+        for (tile_x, tile_y), tile_df in layer_df.groupby([x, y], sort=False):
+            path = directory / str(zoom) / str(tile_x) / f"{tile_y}.geojson"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(
+                json.dumps(
+                    _feature_collection(tile_df.head(max_features)),
+                    separators=(",", ":"),
+                )
+            )
+            written += 1
+    return written
+
+
+def main(
+    nodes_path=NODES_FILE, graph_path=GRAPH_FILE, output_path=MAP_FILE, tiles_dir=None
+):
+    # Load node dataset into pandas dataframe
+    nodes_df = pd.read_csv(nodes_path)
+
+    # Load graph
+    G = load_graph(graph_path)
+
+    betweenness_centrality = CentralityService(G, cache=MetricCache()).betweenness(
+        weight="delay"
+    )
+    m = build_map(nodes_df, betweenness_centrality)
+    m.save(output_path)
+    print(f"Map exported to {output_path}")
+
+    if tiles_dir is not None:
+        n_tiles = write_tiles(node_layer(nodes_df, betweenness_centrality), tiles_dir)
+        print(f"{n_tiles} tiles exported to {tiles_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import ast
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+import pandas as pd
+
+# Incremental GDACS polling into a deduplicated local event store.
+# Every poll fetches the latest flood events, keeps the European events of the
+# last HISTORY_DAYS days and appends only events whose (eventid, episodeid)
+# is new or whose datemodified changed since the last poll. The store is the
+# flood_events.csv format written by download_data.py, rows are only ever
+# appended and readers keep the last row per event.
+
+DATA_DIR = Path(__file__).parent / "data"
+EVENTS_FILE = DATA_DIR / "flood_events.csv"
+COUNTRIES_FILE = DATA_DIR / "Countries-Europe.csv"
+EVENT_COLUMNS = ["type", "bbox", "geometry", "properties"]
+EVENT_TYPE = "FL"
+HISTORY_DAYS = 730
+POLL_INTERVAL = 600  # Seconds
+
+
+@lru_cache(maxsize=None)
+def european_countries(path=COUNTRIES_FILE):
+    return frozenset(pd.read_csv(path, usecols=["name"])["name"])
+
+
+def is_european(event, countries=None):
+    if countries is None:
+        countries = european_countries()
+    return event["properties"]["country"] in countries
+
+
+def in_date_range(event, start_date, end_date):
+    from_date = datetime.fromisoformat(event["properties"]["fromdate"]).replace(
+        tzinfo=timezone.utc
+    )
+    return start_date <= from_date <= end_date
+
+
+def event_key(event):
+    properties = event["properties"]
+    return properties["eventid"], properties["episodeid"]
+
+
+# European events that started within the last history_days days
+def filter_events(features, history_days=HISTORY_DAYS, now=None):
+    end_date = now or datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=history_days)
+    countries = european_countries()
+    return [
+        event
+        for event in features
+        if is_european(event, countries) and in_date_range(event, start_date, end_date)
+    ]
+
+
+class EventStore:
+    def __init__(self, path=EVENTS_FILE):
+        self.path = Path(path)
+        # Last seen datemodified per (eventid, episodeid)
+        self.versions = {}
+        if self.path.exists():
+            stored = pd.read_csv(self.path, usecols=["properties"])["properties"]
+            for properties in stored.map(ast.literal_eval):
+                key = (properties["eventid"], properties["episodeid"])
+                self.versions[key] = properties.get("datemodified")
+
+    def __len__(self):
+        return len(self.versions)
+
+    def is_new(self, event):
+        key = event_key(event)
+        return key not in self.versions or (
+            self.versions[key] != event["properties"].get("datemodified")
+        )
+
+    # Append the new or changed events, returns the appended events
+    def append(self, events):
+        fresh = {}
+        for event in events:
+            if self.is_new(event):
+                fresh[event_key(event)] = event
+        if not fresh:
+            return []
+        events_df = pd.DataFrame(list(fresh.values())).reindex(columns=EVENT_COLUMNS)
+        header = not self.path.exists()
+        events_df.to_csv(
+            self.path, mode="w" if header else "a", header=header, index=False
+        )
+        for key, event in fresh.items():
+            self.versions[key] = event["properties"].get("datemodified")
+        return list(fresh.values())
+
+    # Stored rows, one per event with its latest version
+    def events(self):
+        events_df = pd.read_csv(self.path)
+        keys = events_df["properties"].map(
+            lambda p: event_key({"properties": ast.literal_eval(p)})
+        )
+        return events_df[~keys.duplicated(keep="last")].reset_index(drop=True)
+
+    # Rewrite the store without superseded versions
+    def compact(self):
+        events_df = self.events()
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        events_df.to_csv(tmp_path, index=False)
+        tmp_path.replace(self.path)
+        return len(events_df)
+
+
+def default_client():
+    from gdacs.api import GDACSAPIReader
+
+    return GDACSAPIReader()
+
+
+# Stand-in for GDACSAPIReader that serves features from a GeoJSON file,
+# re-read on every call so tests can change it between polls
+class LocalClient:
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def latest_events(self, event_type=None, **kwargs):
+        with open(self.path) as f:
+            data = json.load(f)
+        features = data["features"] if isinstance(data, dict) else data
+        if event_type is not None:
+            features = [
+                f
+                for f in features
+                if f["properties"].get("eventtype", event_type) == event_type
+            ]
+        return SimpleNamespace(features=features)
+
+
+# One poll, returns the new or changed events that were stored
+def poll_once(client, store, event_type=EVENT_TYPE, history_days=HISTORY_DAYS):
+    features = client.latest_events(event_type=event_type).features
+    return store.append(filter_events(features, history_days))
+
+
+# Poll every interval seconds, max_polls=None polls until interrupted.
+# A failed poll is reported and retried on the next interval.
+def run(client, store, interval=POLL_INTERVAL, max_polls=None):
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        started = time.monotonic()
+        try:
+            fresh = poll_once(client, store)
+            print(
+                f"{datetime.now(timezone.utc):%Y-%m-%d %H:%M:%S} "
+                f"{len(fresh)} new or changed events, {len(store)} stored"
+            )
+        except Exception as e:
+            print(f"Poll failed: {e!r}")
+        polls += 1
+        if max_polls is not None and polls >= max_polls:
+            break
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll GDACS for European flood events")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="poll once and exit")
+    parser.add_argument("--local", help="GeoJSON file to poll instead of GDACS")
+    parser.add_argument("--store", default=EVENTS_FILE)
+    args = parser.parse_args()
+
+    client = LocalClient(args.local) if args.local else default_client()
+    run(client, EventStore(args.store), args.interval, 1 if args.once else None)
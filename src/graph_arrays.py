@@ -0,0 +1,84 @@
+import numpy as np
+
+# Compressed-sparse-row (CSR) view of a communication graph.
+# Successors of node i are indices[indptr[i]:indptr[i + 1]] and the matching
+# slices of the edge attribute arrays hold delay, reliability and so on.
+
+EDGE_ATTRIBUTES = ("delay", "reliability")
+
+
+class GraphArrays:
+    def __init__(self, node_ids, indptr, indices, edge_attrs, node_attrs=None):
+        self.node_ids = np.asarray(node_ids)
+        self.indptr = np.asarray(indptr)
+        self.indices = np.asarray(indices)
+        self.edge_attrs = dict(edge_attrs)
+        self.node_attrs = dict(node_attrs or {})
+        self._index = None
+        self._edge_sources = None
+
+    @property
+    def number_of_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def number_of_edges(self):
+        return len(self.indices)
+
+    # Map from node id to its row in the arrays, built on first use
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.node_ids.tolist())}
+        return self._index
+
+    # Source row of every edge, the COO counterpart of indptr
+    @property
+    def edge_sources(self):
+        if self._edge_sources is None:
+            self._edge_sources = np.repeat(
+                np.arange(self.number_of_nodes, dtype=self.indices.dtype),
+                np.diff(self.indptr),
+            )
+        return self._edge_sources
+
+    def edge(self, name):
+        return self.edge_attrs[name]
+
+    # scipy.sparse matrix with the given edge attribute as values
+    def to_scipy(self, weight="delay"):
+        from scipy.sparse import csr_matrix
+
+        n = self.number_of_nodes
+        data = self.edge_attrs[weight] if weight is not None else np.ones(len(self.indices))
+        return csr_matrix((data, self.indices, self.indptr), shape=(n, n))
+
+
+# Convert a NetworkX DiGraph once into CSR arrays
+def from_networkx(G, edge_attrs=EDGE_ATTRIBUTES, node_attrs=()):
+    node_ids = list(G.nodes())
+    index = {node: i for i, node in enumerate(node_ids)}
+
+    indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    indices = []
+    values = {name: [] for name in edge_attrs}
+    for i, node in enumerate(node_ids):
+        successors = G.succ[node]
+        indptr[i + 1] = indptr[i] + len(successors)
+        for neighbor, edge_data in successors.items():
+            indices.append(index[neighbor])
+            for name in edge_attrs:
+                values[name].append(edge_data.get(name, np.nan))
+
+    columns = {}
+    for name in node_attrs:
+        attr = [G.nodes[node].get(name) for node in node_ids]
+        columns[name] = np.asarray(attr)
+
+    return GraphArrays(
+        np.asarray(node_ids),
+        indptr,
+        np.asarray(indices, dtype=np.int32),
+        {name: np.asarray(v, dtype=np.float64) for name, v in values.items()},
+        columns,
+    )
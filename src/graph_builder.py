@@ -0,0 +1,99 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+from graph_arrays import GraphArrays
+from weights import round2
+
+# Bulk construction of the communication graph from nodes.csv and
+# message_records.csv. Messages are reduced to one row per edge with a single
+# grouped aggregation, nodes and edges are then added in one call each, or
+# turned straight into CSR arrays without building a NetworkX graph.
+
+NODE_ATTRIBUTES = [
+    "node_type",
+    "latitude",
+    "longitude",
+    "role_priority",
+    "capacity",
+    "influence_score",
+]
+EDGE_KEYS = ["source_node_id", "destination_node_id"]
+
+
+# One row per (source, destination) pair with the average delay and
+# reliability and the number of messages, rounded like the graph attributes
+def aggregate_messages(messages_df):
+    edges_df = (
+        messages_df.groupby(EDGE_KEYS, sort=True)
+        .agg(
+            delay=("delay_in_seconds", "mean"),
+            reliability=("reliability_score", "mean"),
+            messages=("message_type", "count"),
+        )
+        .reset_index()
+    )
+    edges_df["delay"] = round2(edges_df["delay"].to_numpy(dtype=float))
+    edges_df["reliability"] = round2(edges_df["reliability"].to_numpy(dtype=float))
+    edges_df["messages"] = edges_df["messages"].astype(np.int64)
+    return edges_df
+
+
+def _records(df, columns):
+    # tolist() turns NumPy scalars into plain Python values for GraphML
+    values = [df[column].tolist() for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+# Directed graph with node attributes from nodes_df and edge attributes
+# (delay, reliability, messages) from an aggregated edges_df
+def build_graph(nodes_df, edges_df):
+    G = nx.DiGraph()
+    node_attrs = [c for c in NODE_ATTRIBUTES if c in nodes_df.columns]
+    G.add_nodes_from(
+        zip(nodes_df["node_id"].tolist(), _records(nodes_df, node_attrs))
+    )
+    edge_attrs = [c for c in edges_df.columns if c not in EDGE_KEYS]
+    G.add_edges_from(
+        zip(
+            edges_df[EDGE_KEYS[0]].tolist(),
+            edges_df[EDGE_KEYS[1]].tolist(),
+            _records(edges_df, edge_attrs),
+        )
+    )
+    return G
+
+
+# Same graph as build_graph, but as GraphArrays in the node order of nodes_df.
+# Ids that only appear in edges_df are appended without attributes, in the
+# order NetworkX would add them.
+def build_arrays(nodes_df, edges_df):
+    node_ids = pd.Index(nodes_df["node_id"])
+    endpoint_ids = pd.unique(edges_df[EDGE_KEYS].to_numpy().ravel())
+    extra_ids = endpoint_ids[node_ids.get_indexer(endpoint_ids) < 0]
+    node_ids = node_ids.append(pd.Index(extra_ids))
+
+    src = node_ids.get_indexer(edges_df[EDGE_KEYS[0]])
+    dst = node_ids.get_indexer(edges_df[EDGE_KEYS[1]])
+    # Stable sort keeps each node's successors in edges_df order
+    order = np.argsort(src, kind="stable")
+    counts = np.bincount(src, minlength=len(node_ids))
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    edge_attrs = {
+        c: edges_df[c].to_numpy()[order] for c in edges_df.columns if c not in EDGE_KEYS
+    }
+    node_attrs = {}
+    for c in NODE_ATTRIBUTES:
+        if c in nodes_df.columns:
+            column = nodes_df[c].to_numpy()
+            if len(extra_ids):
+                missing = np.full(len(extra_ids), None if column.dtype == object else np.nan)
+                column = np.concatenate([column, missing])
+            node_attrs[c] = column
+    return GraphArrays(
+        node_ids.to_numpy(dtype=str),
+        indptr,
+        dst[order].astype(np.int32),
+        edge_attrs,
+        node_attrs,
+    )
@@ -0,0 +1,256 @@
+import json
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+from graph_arrays import GraphArrays, from_networkx
+
+# Binary graph snapshot, a fast-loading companion of the GraphML files.
+# A snapshot is a directory of .npy arrays plus meta.json:
+#   node_ids.npy                 fixed-width node id table
+#   node_<attr>.npy              one typed column per node attribute, strings
+#                                are stored as integer codes into meta.json
+#   indptr.npy, indices.npy      CSR edge structure
+#   edge_<attr>.npy              one column per edge attribute
+# Arrays are memory-mapped on load, so opening a snapshot costs next to
+# nothing and a NetworkX graph is only built when to_networkx() is called.
+
+SNAPSHOT_VERSION = 1
+
+
+# Snapshot directory stored next to a GraphML file
+def snapshot_path(graphml_path):
+    return Path(graphml_path).with_suffix(".snapshot")
+
+
+def _column(values):
+    values = list(values)
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, str) for v in present):
+        categories = sorted(set(present))
+        lookup = {c: i for i, c in enumerate(categories)}
+        codes = np.array([lookup.get(v, -1) for v in values], dtype=np.int32)
+        return codes, {"kind": "category", "categories": categories}
+    if present and all(isinstance(v, (bool, np.bool_)) for v in present):
+        if len(present) == len(values):
+            return np.array(values, dtype=bool), {"kind": "bool"}
+        # Booleans with gaps as category codes, -1 decodes to missing
+        lookup = {False: 0, True: 1}
+        codes = np.array([lookup.get(v, -1) for v in values], dtype=np.int32)
+        return codes, {"kind": "category", "categories": [False, True]}
+    if len(present) == len(values) and all(
+        isinstance(v, (int, np.integer)) for v in present
+    ):
+        return np.array(values, dtype=np.int64), {"kind": "int"}
+    column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return column, {"kind": "float"}
+
+
+# Column of a NumPy array, string and object arrays become category codes
+def _array_column(values):
+    values = np.asarray(values)
+    if values.dtype.kind == "b":
+        return values, {"kind": "bool"}
+    if values.dtype.kind in "iu":
+        return values.astype(np.int64), {"kind": "int"}
+    if values.dtype.kind == "f":
+        return values.astype(np.float64), {"kind": "float"}
+    return _column(values.tolist())
+
+
+def _write(path, node_ids, indptr, indices, node_columns, edge_columns, directed):
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "directed": directed,
+        "number_of_nodes": len(indptr) - 1,
+        "number_of_edges": len(indices),
+        "node_attrs": {},
+        "edge_attrs": {},
+    }
+    np.save(tmp_path / "node_ids.npy", np.asarray(node_ids, dtype=str))
+    np.save(tmp_path / "indptr.npy", np.asarray(indptr, dtype=np.int64))
+    np.save(tmp_path / "indices.npy", np.asarray(indices, dtype=np.int32))
+    for prefix, columns, specs in (
+        ("node", node_columns, meta["node_attrs"]),
+        ("edge", edge_columns, meta["edge_attrs"]),
+    ):
+        for name, (column, spec) in columns.items():
+            np.save(tmp_path / f"{prefix}_{name}.npy", column)
+            specs[name] = spec
+    with open(tmp_path / "meta.json", "w") as f:
+        json.dump(meta, f)
+
+    # Swap the finished directory in, readers never see a half written snapshot
+    old_path = path.with_name(f".{path.name}.{os.getpid()}.old")
+    if path.exists():
+        path.rename(old_path)
+    tmp_path.rename(path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+# Write G as a snapshot directory, replacing any previous snapshot atomically
+def write_snapshot(G, path):
+    node_attrs = sorted({name for _, data in G.nodes(data=True) for name in data})
+    edge_attrs = sorted({name for _, _, data in G.edges(data=True) for name in data})
+    arrays = from_networkx(G, edge_attrs=(), node_attrs=())
+    nodes = list(G.nodes())
+    node_columns = {
+        name: _column(G.nodes[node].get(name) for node in nodes) for name in node_attrs
+    }
+    edge_columns = {
+        name: _column(G.succ[u][v].get(name) for u in nodes for v in G.succ[u])
+        for name in edge_attrs
+    }
+    return _write(
+        path,
+        [str(node) for node in nodes],
+        arrays.indptr,
+        arrays.indices,
+        node_columns,
+        edge_columns,
+        G.is_directed(),
+    )
+
+
+# Write GraphArrays as a snapshot directory without building a NetworkX graph
+def write_array_snapshot(arrays, path, directed=True):
+    return _write(
+        path,
+        arrays.node_ids,
+        arrays.indptr,
+        arrays.indices,
+        {name: _array_column(col) for name, col in arrays.node_attrs.items()},
+        {name: _array_column(col) for name, col in arrays.edge_attrs.items()},
+        directed,
+    )
+
+
+class GraphSnapshot:
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / "meta.json") as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.meta['version']}")
+        self.node_ids = self._load("node_ids")
+        self.indptr = self._load("indptr")
+        self.indices = self._load("indices")
+        self._arrays = None
+        self._graph = None
+
+    def _load(self, name):
+        return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+    @property
+    def number_of_nodes(self):
+        return self.meta["number_of_nodes"]
+
+    @property
+    def number_of_edges(self):
+        return self.meta["number_of_edges"]
+
+    # Memory-mapped column, category codes are decoded to their values
+    def _attribute_column(self, prefix, name):
+        spec = self.meta[f"{prefix}_attrs"][name]
+        column = self._load(f"{prefix}_{name}")
+        if spec["kind"] == "category":
+            categories = np.array(spec["categories"] + [None], dtype=object)
+            return categories[column]
+        return column
+
+    def edge_column(self, name):
+        return self._attribute_column("edge", name)
+
+    def node_column(self, name):
+        return self._attribute_column("node", name)
+
+    # GraphArrays view over the mapped columns, no copies of the edge data
+    @property
+    def arrays(self):
+        if self._arrays is None:
+            self._arrays = GraphArrays(
+                self.node_ids,
+                self.indptr,
+                self.indices,
+                {name: self.edge_column(name) for name in self.meta["edge_attrs"]},
+                {name: self.node_column(name) for name in self.meta["node_attrs"]},
+            )
+        return self._arrays
+
+    # Build (once) the equivalent NetworkX graph
+    def to_networkx(self):
+        if self._graph is not None:
+            return self._graph
+        import networkx as nx
+
+        G = nx.DiGraph() if self.meta["directed"] else nx.Graph()
+        node_ids = self.node_ids.tolist()
+        node_columns = {
+            name: self.node_column(name).tolist() for name in self.meta["node_attrs"]
+        }
+        G.add_nodes_from(
+            (
+                node,
+                {
+                    name: column[i]
+                    for name, column in node_columns.items()
+                    if not _is_missing(column[i])
+                },
+            )
+            for i, node in enumerate(node_ids)
+        )
+
+        edge_columns = {
+            name: self.edge_column(name).tolist() for name in self.meta["edge_attrs"]
+        }
+        sources = np.repeat(
+            np.arange(self.number_of_nodes), np.diff(self.indptr)
+        ).tolist()
+        targets = self.indices.tolist()
+        G.add_edges_from(
+            (
+                node_ids[u],
+                node_ids[v],
+                {
+                    name: column[e]
+                    for name, column in edge_columns.items()
+                    if not _is_missing(column[e])
+                },
+            )
+            for e, (u, v) in enumerate(zip(sources, targets))
+        )
+        self._graph = G
+        return G
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+# Open the snapshot of a GraphML file when it is at least as new as the file
+def open_snapshot(graphml_path):
+    path = snapshot_path(graphml_path)
+    graphml_path = Path(graphml_path)
+    if not (path / "meta.json").exists():
+        return None
+    if graphml_path.exists() and graphml_path.stat().st_mtime > (
+        path / "meta.json"
+    ).stat().st_mtime:
+        return None  # GraphML was rewritten after the snapshot
+    return GraphSnapshot(path)
+
+
+# Load a graph from its snapshot when available, otherwise parse the GraphML
+def load_graph(graphml_path):
+    snapshot = open_snapshot(graphml_path)
+    if snapshot is not None:
+        return snapshot.to_networkx()
+    import networkx as nx
+
+    return nx.read_graphml(graphml_path)
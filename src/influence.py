@@ -0,0 +1,517 @@
+import heapq
+import math
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ensemble import block_activation_times, batch_size_for, live_block_graph
+from graph_arrays import from_networkx
+from graph_snapshot import load_graph, open_snapshot
+from instrumentation import stage
+from process_pool import make_pool
+
+# Influence maximization for the Independent Cascade (IC) model: which k
+# nodes to seed with the alert, on top of the fixed seeds (the alert origin),
+# to maximize the expected number of nodes reached, optionally within a
+# deadline in seconds. As in ensemble.py a realization is a live-edge graph
+# (edge live with probability reliability) and a node activates at its
+# shortest delay from the seeds over live edges.
+#   ris      reverse reachable (RR) set sampling with the IMM sample bounds:
+#            an RR set holds the nodes that would reach a random target
+#            within the deadline, so reach is n times the fraction of RR sets
+#            a seed set covers and greedy max coverage selects the seeds.
+#            (1 - 1/e - epsilon) approximation with probability 1 - n^-ell.
+#   celf     greedy on Monte Carlo estimates from a fixed sample of live-edge
+#            realizations, with CELF lazy evaluation of marginal gains
+#   celf++   CELF++, also keeps each node's gain given the current best node,
+#            which saves the re-evaluation when that node gets picked
+# RR sets are sampled in vectorized batches across processes. Edge coins and
+# targets come from a counter-based hash of (seed, set id, edge), so the sets
+# do not depend on the batch size or the number of processes.
+
+GRAPH_FILE = Path(__file__).parent / "data" / "communication_updated.graphml"
+SEEDS_FILE = Path(__file__).parent / "data" / "seed_selection.csv"
+METHODS = ("ris", "celf", "celf++")
+FIXED_SEEDS = ("Node_001",)
+EPSILON = 0.1
+ELL = 1.0
+# Cap on the nodes held by all RR sets together. Large reach needs few but
+# big RR sets, a capped sample no longer carries the IMM guarantee.
+MAX_RR_ENTRIES = 50_000_000
+BATCH_ENTRIES = 2_000_000  # RR set nodes per vectorized batch
+BATCH_SETS = 10_000  # Most RR sets per batch
+FIRST_BATCH_SETS = 100  # Batch that measures the set size
+CELF_REALIZATIONS = 200
+CELF_CANDIDATES = 500  # Candidates by influence_score for large graphs
+
+_MASK64 = np.uint64(2**64 - 1)
+_ROOT_SALT = np.uint64(0x9E3779B97F4A7C15)
+
+_worker_sampler = None
+
+
+# SplitMix64 finalizer on uint64 arrays, a well mixed counter-based hash
+def _splitmix64(x):
+    with np.errstate(over="ignore"):
+        x = (x + np.uint64(0x9E3779B97F4A7C15)) & _MASK64
+        x = ((x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)) & _MASK64
+        x = ((x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)) & _MASK64
+        return x ^ (x >> np.uint64(31))
+
+
+def _uniform(x):
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+
+# In-edges of every node: (indptr, source nodes, CSR edge positions)
+def in_edges(arrays):
+    n = arrays.number_of_nodes
+    order = np.argsort(arrays.indices, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(arrays.indices, minlength=n), out=indptr[1:])
+    return indptr, arrays.edge_sources[order], order
+
+
+class RRSampler:
+    def __init__(self, arrays, deadline=None, seed=42):
+        self.n = arrays.number_of_nodes
+        self.indptr, self.sources, self.edges = in_edges(arrays)
+        self.delay = np.asarray(arrays.edge("delay"), dtype=float)
+        self.reliability = np.asarray(arrays.edge("reliability"), dtype=float)
+        self.deadline = deadline
+        self.seed = np.uint64(seed)
+
+    # RR sets with ids first ... first + count - 1 as (indptr, nodes). A
+    # reverse label-correcting search from every target over the in-edges,
+    # all sets of the batch advancing together one hop per round. Nodes are
+    # keyed set * n + node, kept sorted with their best delay to the target.
+    def sample(self, first, count):
+        n = self.n
+        set_ids = np.arange(first, first + count, dtype=np.uint64)
+        set_keys = _splitmix64(set_ids ^ self.seed)
+        roots = (_splitmix64(set_keys ^ _ROOT_SALT) % np.uint64(n)).astype(np.int64)
+        local = np.arange(count, dtype=np.int64)
+
+        keys = local * n + roots
+        best = np.zeros(count)
+        frontier_sets, frontier_nodes, frontier_time = local, roots, np.zeros(count)
+        while len(frontier_sets):
+            starts = self.indptr[frontier_nodes]
+            degrees = self.indptr[frontier_nodes + 1] - starts
+            total = degrees.sum()
+            if total == 0:
+                break
+            positions = np.repeat(starts - (np.cumsum(degrees) - degrees), degrees)
+            positions += np.arange(total)
+            sets = np.repeat(frontier_sets, degrees)
+            edges = self.edges[positions]
+            # The same coin for an edge whenever a set looks at it again
+            coins = _uniform(
+                _splitmix64(set_keys[sets] + edges.astype(np.uint64) * _ROOT_SALT)
+            )
+            live = coins <= self.reliability[edges]
+            times = np.repeat(frontier_time, degrees) + self.delay[edges]
+            if self.deadline is None:
+                times[:] = 0.0  # Plain reachability, only new nodes count
+            else:
+                live &= times <= self.deadline
+            candidates = sets[live] * n + self.sources[positions[live]]
+            times = times[live]
+
+            # Earliest time per candidate key
+            order = np.lexsort((times, candidates))
+            candidates, times = candidates[order], times[order]
+            first_of_key = np.ones(len(candidates), dtype=bool)
+            first_of_key[1:] = candidates[1:] != candidates[:-1]
+            candidates, times = candidates[first_of_key], times[first_of_key]
+
+            position = np.searchsorted(keys, candidates)
+            clipped = np.minimum(position, len(keys) - 1)
+            present = (position < len(keys)) & (keys[clipped] == candidates)
+            improved = ~present
+            improved[present] = times[present] < best[clipped[present]]
+            best[clipped[present & improved]] = times[present & improved]
+            new = ~present
+            if new.any():
+                keys = np.concatenate([keys, candidates[new]])
+                best = np.concatenate([best, times[new]])
+                order = np.argsort(keys, kind="stable")
+                keys, best = keys[order], best[order]
+
+            frontier_sets = candidates[improved] // n
+            frontier_nodes = candidates[improved] % n
+            frontier_time = times[improved]
+
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n, minlength=count), out=indptr[1:])
+        return indptr, (keys % n).astype(np.int32)
+
+
+def _init_worker(sampler):
+    global _worker_sampler
+    _worker_sampler = sampler
+
+
+def _sample_task(task):
+    return _worker_sampler.sample(*task)
+
+
+class RRSets:
+    def __init__(self, sampler, processes=1, max_entries=MAX_RR_ENTRIES):
+        self.sampler = sampler
+        self.n = sampler.n
+        self.processes = processes or os.cpu_count()
+        self.max_entries = max_entries
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.nodes = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    # True once the sample holds max_entries nodes and stops growing
+    @property
+    def full(self):
+        return len(self.nodes) >= self.max_entries
+
+    def _append(self, batches):
+        ends = [self.indptr[-1:]]
+        for indptr, _ in batches:
+            ends.append(indptr[1:] + ends[-1][-1])
+        self.indptr = np.concatenate([self.indptr[:-1]] + ends)
+        self.nodes = np.concatenate([self.nodes] + [nodes for _, nodes in batches])
+
+    # Sample RR sets until there are n_sets or the sample is full. Batches
+    # are sized from the mean set size so far to hold about BATCH_ENTRIES
+    # nodes, one batch per process at a time.
+    def extend(self, n_sets):
+        pool = None
+        try:
+            while len(self) < n_sets and not self.full:
+                if len(self):
+                    mean_size = len(self.nodes) / len(self)
+                    batch = int(min(max(BATCH_ENTRIES / mean_size, 1), BATCH_SETS))
+                else:
+                    batch = FIRST_BATCH_SETS
+                first = len(self)
+                tasks = [
+                    (start, min(batch, n_sets - start))
+                    for start in range(first, n_sets, batch)
+                ][: self.processes]
+                if len(tasks) == 1:
+                    self._append([self.sampler.sample(*tasks[0])])
+                    continue
+                if pool is None:
+                    pool = make_pool(_init_worker, self.sampler, self.processes)
+                self._append(pool.map(_sample_task, tasks))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return self
+
+    # Greedy max coverage: k seeds on top of the fixed ones, with the
+    # estimated marginal reach of each. Returns (seeds, gains, base_reach).
+    def select(self, k, fixed=()):
+        n, n_sets = self.n, len(self)
+        sizes = np.diff(self.indptr)
+        set_of = np.repeat(np.arange(n_sets), sizes)
+        order = np.argsort(self.nodes, kind="stable")
+        node_sets = set_of[order]
+        node_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.nodes, minlength=n), out=node_ptr[1:])
+        counts = np.bincount(self.nodes, minlength=n).astype(np.int64)
+        covered = np.zeros(n_sets, dtype=bool)
+
+        # Mark the uncovered sets of a node covered and take them off the
+        # counts of all their members
+        def cover(node):
+            sets = node_sets[node_ptr[node] : node_ptr[node + 1]]
+            sets = sets[~covered[sets]]
+            covered[sets] = True
+            starts, lengths = self.indptr[sets], sizes[sets]
+            positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+            positions += np.arange(lengths.sum())
+            counts[:] -= np.bincount(self.nodes[positions], minlength=n)
+            return len(sets)
+
+        scale = n / max(n_sets, 1)
+        for node in fixed:
+            cover(node)
+        base_reach = covered.sum() * scale
+        seeds, gains = [], []
+        chosen = np.zeros(n, dtype=bool)
+        chosen[list(fixed)] = True
+        for _ in range(k):
+            node = int(np.argmax(np.where(chosen, -1, counts)))
+            chosen[node] = True
+            seeds.append(node)
+            gains.append(cover(node) * scale)
+        return seeds, gains, base_reach
+
+
+def _log_binomial(n, k):
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+# IMM (Tang et al. 2015): estimate a lower bound of the optimal reach by
+# doubling the sample, then draw theta RR sets and select greedily.
+# Returns (RRSets, seeds, gains, base_reach).
+def imm(
+    sampler,
+    k,
+    fixed=(),
+    epsilon=EPSILON,
+    ell=ELL,
+    processes=1,
+    max_entries=MAX_RR_ENTRIES,
+):
+    n = sampler.n
+    rr = RRSets(sampler, processes, max_entries)
+    if n < 2:
+        rr.extend(1)
+        return (rr,) + rr.select(k, fixed)
+    k_total = min(n, k + len(fixed))
+    ell = ell * (1 + math.log(2) / math.log(n))
+    log_binomial = _log_binomial(n, k_total)
+    epsilon_prime = math.sqrt(2) * epsilon
+    lambda_prime = (
+        (2 + 2 * epsilon_prime / 3)
+        * (log_binomial + ell * math.log(n) + math.log(math.log2(n)))
+        * n
+        / epsilon_prime**2
+    )
+    lower_bound = 1.0
+    for i in range(1, max(2, math.ceil(math.log2(n)))):
+        x = n / 2**i
+        rr.extend(math.ceil(lambda_prime / x))
+        _, gains, base_reach = rr.select(k, fixed)
+        reach = base_reach + sum(gains)
+        if reach >= (1 + epsilon_prime) * x or rr.full:
+            lower_bound = reach / (1 + epsilon_prime)
+            break
+
+    alpha = math.sqrt(ell * math.log(n) + math.log(2))
+    beta = math.sqrt(
+        (1 - 1 / math.e) * (log_binomial + ell * math.log(n) + math.log(2))
+    )
+    lambda_star = 2 * n * ((1 - 1 / math.e) * alpha + beta) ** 2 / epsilon**2
+    rr.extend(math.ceil(lambda_star / lower_bound))
+    return (rr,) + rr.select(k, fixed)
+
+
+class LiveEdgeSample:
+    def __init__(
+        self, arrays, n_realizations=CELF_REALIZATIONS, deadline=None, rng=None
+    ):
+        if rng is None:
+            rng = np.random.default_rng()
+        self.n = arrays.number_of_nodes
+        self.n_realizations = n_realizations
+        self.limit = np.inf if deadline is None else deadline
+        reliability = arrays.edge("reliability")
+        batch_size = batch_size_for(arrays)
+        self.blocks = []
+        for done in range(0, n_realizations, batch_size):
+            batch = min(batch_size, n_realizations - done)
+            live = rng.random((batch, arrays.number_of_edges)) <= reliability
+            self.blocks.append(live_block_graph(arrays, live))
+
+    # Activation times from seeds in every realization, (realizations, n)
+    def activation_times(self, seeds):
+        if len(seeds) == 0:
+            return np.full((self.n_realizations, self.n), np.inf)
+        return np.concatenate(
+            [
+                block_activation_times(block, self.n, np.asarray(seeds), self.limit)
+                for block in self.blocks
+            ]
+        )
+
+    # Mean number of nodes activated within the deadline
+    def reach(self, times):
+        return np.isfinite(times).sum() / self.n_realizations
+
+
+# CELF / CELF++ greedy over candidate nodes on a LiveEdgeSample. The
+# realizations are fixed, so the estimated reach is submodular and lazy
+# evaluation picks the same seeds as plain greedy. Returns (seeds, gains,
+# base_reach, evaluations).
+def celf(sample, k, candidates, fixed=(), plus=False):
+    current = sample.activation_times(list(fixed))
+    reach = sample.reach(current)
+    base_reach = reach
+    evaluations = 0
+    seeds, gains = [], []
+    last_seed = None
+    # Best node of this round so far: (node, gain, times with it added)
+    best = None
+
+    def evaluate(node):
+        nonlocal evaluations, best
+        evaluations += 1
+        times = sample.activation_times([node])
+        with_node = np.minimum(current, times)
+        gain = sample.reach(with_node) - reach
+        gain_after_best, prev_best = None, None
+        if plus and best is not None:
+            prev_best = best[0]
+            gain_after_best = sample.reach(np.minimum(best[2], times)) - sample.reach(
+                best[2]
+            )
+        if best is None or gain > best[1]:
+            best = (node, gain, with_node)
+        return gain, prev_best, gain_after_best
+
+    # Heap entries: (-gain, node, round evaluated, prev_best, gain after it)
+    heap = []
+    for node in candidates:
+        if node in fixed:
+            continue
+        gain, prev_best, gain_after_best = evaluate(node)
+        heap.append((-gain, node, 0, prev_best, gain_after_best))
+    heapq.heapify(heap)
+
+    while heap and len(seeds) < k:
+        negative_gain, node, evaluated, prev_best, gain_after_best = heapq.heappop(heap)
+        rounds = len(seeds)
+        if evaluated == rounds:
+            seeds.append(node)
+            gains.append(-negative_gain)
+            current = np.minimum(current, sample.activation_times([node]))
+            reach = sample.reach(current)
+            last_seed, best = node, None
+            continue
+        if plus and prev_best == last_seed and evaluated == rounds - 1:
+            # Gain given the seed just picked was computed already
+            gain, prev_best, gain_after_best = gain_after_best, None, None
+        else:
+            gain, prev_best, gain_after_best = evaluate(node)
+        heapq.heappush(heap, (-gain, node, rounds, prev_best, gain_after_best))
+    return seeds, gains, base_reach, evaluations
+
+
+# Candidate nodes for CELF, highest influence_score first and by out-degree
+# within a score, all nodes when max_candidates is None
+def influence_candidates(arrays, max_candidates=None):
+    n = arrays.number_of_nodes
+    out_degree = np.diff(arrays.indptr)
+    if "influence_score" in arrays.node_attrs:
+        score = np.asarray(arrays.node_attrs["influence_score"], dtype=float)
+    else:
+        score = np.zeros(n)
+    order = np.lexsort((-out_degree, -np.nan_to_num(score)))
+    return order[:max_candidates].tolist()
+
+
+# One row per selected seed in selection order, with its marginal gain and
+# the expected reach of the fixed seeds plus every seed up to it
+def seed_table(arrays, seeds, gains, base_reach):
+    seeds = np.asarray(seeds, dtype=np.int64)
+    seeds_df = pd.DataFrame(
+        {
+            "rank": np.arange(1, len(seeds) + 1),
+            "node_id": arrays.node_ids[seeds],
+            "marginal_gain": gains,
+            "expected_reach": base_reach + np.cumsum(gains),
+        }
+    )
+    for name in ("influence_score", "node_type"):
+        if name in arrays.node_attrs:
+            seeds_df.insert(2, name, np.asarray(arrays.node_attrs[name])[seeds])
+    seeds_df.attrs["base_reach"] = base_reach
+    return seeds_df
+
+
+# Select k seeds beyond the fixed ones with one of METHODS, deadline in
+# seconds or None for no deadline. Returns the seed_table.
+def select_seeds(
+    arrays,
+    k,
+    fixed=FIXED_SEEDS,
+    method="ris",
+    deadline=None,
+    epsilon=EPSILON,
+    processes=1,
+    n_realizations=CELF_REALIZATIONS,
+    candidates=None,
+    seed=42,
+):
+    fixed_index = [arrays.index[node] for node in fixed]
+    k = min(k, arrays.number_of_nodes - len(set(fixed_index)))
+    if method == "ris":
+        sampler = RRSampler(arrays, deadline, seed)
+        rr, seeds, gains, base_reach = imm(
+            sampler, k, fixed_index, epsilon, ELL, processes
+        )
+        seeds_df = seed_table(arrays, seeds, gains, base_reach)
+        seeds_df.attrs["rr_sets"] = len(rr)
+        seeds_df.attrs["rr_sample_capped"] = rr.full
+    elif method in ("celf", "celf++"):
+        if candidates is None:
+            max_candidates = (
+                None if arrays.number_of_nodes <= CELF_CANDIDATES else CELF_CANDIDATES
+            )
+            candidates = influence_candidates(arrays, max_candidates)
+        else:
+            candidates = [arrays.index[node] for node in candidates]
+        sample = LiveEdgeSample(
+            arrays, n_realizations, deadline, np.random.default_rng(seed)
+        )
+        seeds, gains, base_reach, evaluations = celf(
+            sample, k, candidates, set(fixed_index), plus=method == "celf++"
+        )
+        seeds_df = seed_table(arrays, seeds, gains, base_reach)
+        seeds_df.attrs["evaluations"] = evaluations
+    else:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    seeds_df.attrs["method"] = method
+    return seeds_df
+
+
+def main(
+    graph_path=GRAPH_FILE,
+    k=5,
+    method="ris",
+    deadline=None,
+    fixed=FIXED_SEEDS,
+    epsilon=EPSILON,
+    processes=1,
+    output_path=SEEDS_FILE,
+    seed=42,
+):
+    # The memory-mapped snapshot skips building a NetworkX graph at all
+    snapshot = open_snapshot(graph_path)
+    if snapshot is not None:
+        arrays = snapshot.arrays
+    else:
+        arrays = from_networkx(
+            load_graph(graph_path), node_attrs=("node_type", "influence_score")
+        )
+
+    with stage("seed_selection", method=method) as timer:
+        seeds_df = select_seeds(
+            arrays, k, fixed, method, deadline, epsilon, processes, seed=seed
+        )
+        counts = ("rr_sets", "evaluations")
+        timer.record(
+            **{name: seeds_df.attrs[name] for name in counts if name in seeds_df.attrs}
+        )
+    within = "" if deadline is None else f" within {deadline:g} s"
+    print(
+        f"Expected reach of {', '.join(fixed)}{within}: "
+        f"{seeds_df.attrs['base_reach']:.1f} of {arrays.number_of_nodes} nodes"
+    )
+    if seeds_df.attrs.get("rr_sample_capped"):
+        print(
+            f"RR sample capped at {MAX_RR_ENTRIES} entries "
+            f"({seeds_df.attrs['rr_sets']} sets), reach estimates are rough"
+        )
+    print(f"\nSeeds selected with {method}:")
+    print(seeds_df.to_string(index=False))
+    seeds_df.to_csv(output_path, index=False)
+    print(f"\nSeed selection exported to {output_path}")
+    return seeds_df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import json
+import numbers
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak memory is then unknown
+    resource = None
+
+# Opt-in runtime metrics for the pipeline stages. Disabled by default: stage()
+# then returns one shared no-op object, so instrumented code pays a global
+# lookup and two method calls per stage and nothing inside the hot loops.
+# Once enable() is called every stage records
+#   wall and CPU time, peak memory (process max RSS, or the tracemalloc peak
+#   of the stage with trace_memory=True) and any values the stage reports,
+#   e.g. events, stale_ratio or queue_high_water of a cascade,
+# and the hit rates of every MetricCache created while enabled. Metrics go to
+# a JSON lines file (one object per finished stage) or a Prometheus text
+# exposition file, and a sampling profiler can capture collapsed stacks for
+# flamegraph.pl or speedscope.
+
+FORMATS = ("jsonl", "prometheus")
+METRIC_PREFIX = "dwn"
+PROFILE_INTERVAL = 0.005  # Seconds between profiler samples
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def record(self, **values):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+_recorder = None
+
+
+class Stage:
+    def __init__(self, recorder, name, labels):
+        self.recorder = recorder
+        self.name = name
+        self.labels = labels
+        self.values = {}
+        self._peak = 0
+
+    # Values reported by the stage, numbers become gauges in Prometheus
+    def record(self, **values):
+        self.values.update(values)
+
+    def __enter__(self):
+        stack = self.recorder.stack
+        if self.recorder.trace_memory:
+            # The parent keeps its peak so far, this stage measures its own
+            if stack:
+                parent = stack[-1]
+                parent._peak = max(parent._peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        self.recorder.stack.pop()
+        if self.recorder.trace_memory:
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        else:
+            peak = _max_rss()
+        entry = {
+            "type": "stage",
+            "stage": self.name,
+            "labels": self.labels,
+            "time": time.time(),
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "peak_memory_bytes": peak,
+            "failed": exc_type is not None,
+        }
+        # Throughput of stages that count their events
+        if "events" in self.values and wall > 0:
+            entry["events_per_second"] = self.values["events"] / wall
+        entry.update(self.values)
+        self.recorder.add(entry)
+        return False
+
+
+# Process peak resident set size in bytes, None where unavailable
+def _max_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class SamplingProfiler:
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Sample the stack of the profiled thread every interval seconds from a
+    # background thread. Time spent in C code releasing the GIL is charged
+    # to the Python function that called it.
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                filename = Path(code.co_filename).name
+                stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self
+
+    # Samples per innermost function, the functions time is spent in
+    def top(self, n=20):
+        own = Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+        return own.most_common(n)
+
+    # One "outer;...;inner count" line per distinct stack
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+class Recorder:
+    def __init__(self, output=None, format="jsonl", trace_memory=False):
+        if format not in FORMATS:
+            raise ValueError(
+                f"Unknown metrics format {format!r}, expected one of {FORMATS}"
+            )
+        self.output = None if output is None else Path(output)
+        self.format = format
+        self.trace_memory = trace_memory
+        self.entries = []
+        self.caches = []
+        self.stack = []
+        self._lock = threading.Lock()
+        if self.output is not None and format == "jsonl":
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+            self.output.write_text("")
+
+    def add(self, entry):
+        with self._lock:
+            self.entries.append(entry)
+            if self.output is not None and self.format == "jsonl":
+                with open(self.output, "a") as f:
+                    f.write(json.dumps(entry, default=_json_value) + "\n")
+
+    def cache_entries(self):
+        return [
+            {
+                "type": "cache",
+                "cache": str(cache.directory),
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_rate": cache.hit_rate,
+            }
+            for cache in self.caches
+        ]
+
+    # Prometheus text exposition: counters summed and gauges taken from the
+    # last run of every stage and label set
+    def prometheus(self):
+        counters, gauges = {}, {}
+        for entry in self.entries:
+            labels = {"stage": entry["stage"], **entry["labels"]}
+            key = tuple(sorted((name, str(value)) for name, value in labels.items()))
+            for name in ("wall_seconds", "cpu_seconds"):
+                counters[(f"stage_{name}_total", key)] = (
+                    counters.get((f"stage_{name}_total", key), 0) + entry[name]
+                )
+            counters[("stage_runs_total", key)] = (
+                counters.get(("stage_runs_total", key), 0) + 1
+            )
+            for name, value in entry.items():
+                if name in ("wall_seconds", "cpu_seconds", "time", "failed"):
+                    continue
+                if isinstance(value, numbers.Real) and not isinstance(value, bool):
+                    gauges[(f"stage_{name}", key)] = value
+        for entry in self.cache_entries():
+            key = (("cache", entry["cache"]),)
+            counters[("cache_hits_total", key)] = entry["hits"]
+            counters[("cache_misses_total", key)] = entry["misses"]
+            gauges[("cache_hit_rate", key)] = entry["hit_rate"]
+
+        lines = []
+        for kind, metrics in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for name, _ in metrics}):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+                for (metric, key), value in metrics.items():
+                    if metric == name:
+                        lines.append(f"{METRIC_PREFIX}_{name}{_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    # Write what is only known at the end: cache hit rates for JSON lines,
+    # the whole exposition for Prometheus
+    def flush(self):
+        if self.output is None:
+            return
+        if self.format == "jsonl":
+            with open(self.output, "a") as f:
+                for entry in self.cache_entries():
+                    f.write(json.dumps(entry) + "\n")
+        else:
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+            self.output.write_text(self.prometheus())
+
+
+# NumPy scalars as Python numbers, anything else as its string
+def _json_value(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+# Label value escaped as the Prometheus text format requires
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key):
+    if not key:
+        return ""
+    labels = ",".join(f'{name}="{_escape_label(value)}"' for name, value in key)
+    return "{" + labels + "}"
+
+
+_profiler = None
+_profile_path = None
+
+
+# Start recording. output is a JSON lines or Prometheus file (metrics only
+# kept in memory when None), profile a path for collapsed profiler stacks.
+def enable(
+    output=None,
+    format="jsonl",
+    trace_memory=False,
+    profile=None,
+    interval=PROFILE_INTERVAL,
+):
+    global _recorder, _profiler, _profile_path
+    disable()
+    _recorder = Recorder(output, format, trace_memory)
+    # Only stop tracemalloc on disable when it was started here
+    _recorder.started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if _recorder.started_tracing:
+        tracemalloc.start()
+    if profile is not None:
+        _profile_path = profile
+        _profiler = SamplingProfiler(interval).start()
+    return _recorder
+
+
+# Stop recording, write the metrics and profile, return the recorder
+def disable():
+    global _recorder, _profiler, _profile_path
+    recorder = _recorder
+    if recorder is None:
+        return None
+    _recorder = None
+    if recorder.started_tracing:
+        tracemalloc.stop()
+    recorder.flush()
+    if _profiler is not None:
+        _profiler.stop().write_collapsed(_profile_path)
+        _profiler = _profile_path = None
+    return recorder
+
+
+def enabled():
+    return _recorder is not None
+
+
+# Context manager timing one stage, e.g.
+#   with stage("cascade", start_node=seed) as s:
+#       ...
+#       s.record(events=n)
+def stage(name, **labels):
+    if _recorder is None:
+        return _NULL_STAGE
+    return Stage(_recorder, name, labels)
+
+
+# Report the hit rate of a MetricCache with the metrics
+def watch_cache(cache):
+    if _recorder is not None:
+        _recorder.caches.append(cache)
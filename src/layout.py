@@ -0,0 +1,195 @@
+import math
+import numpy as np
+import networkx as nx
+from scipy.spatial import cKDTree
+from graph_arrays import from_networkx
+from instrumentation import stage
+from metric_cache import graph_fingerprint
+
+# Shared node positions for the plotting code, computed once per graph and,
+# with a MetricCache, persisted so every script reuses the same layout.
+#   spring      nx.spring_layout, O(iterations * V^2), fine for small graphs
+#   geographic  latitude/longitude of the nodes, no computation at all
+#   force       Fruchterman-Reingold with Barnes-Hut style repulsion, linear
+#               in V and E per iteration. Seeded from the geographic layout.
+#   auto        spring up to SPRING_MAX_NODES nodes, force above
+
+LAYOUTS = ("auto", "spring", "geographic", "force")
+SPRING_MAX_NODES = 2_000
+FORCE_ITERATIONS = 50
+NEIGHBORS = 8  # Nearest nodes repelled exactly by the force layout
+GRID_CELLS = 32  # Cells per axis for the far field repulsion
+SEED = 42
+
+
+# Positions as an (n, 2) array scaled to [-1, 1] like nx.rescale_layout
+def _rescale(pos):
+    pos = pos - pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    return pos / extent if extent > 0 else pos
+
+
+# Equirectangular projection of the node coordinates, None when any node
+# lacks a latitude or longitude
+def geographic_positions(G):
+    lat = np.array([G.nodes[node].get("latitude", np.nan) for node in G], dtype=float)
+    lon = np.array([G.nodes[node].get("longitude", np.nan) for node in G], dtype=float)
+    if len(lat) == 0 or np.isnan(lat).any() or np.isnan(lon).any():
+        return None
+    x = lon * math.cos(math.radians(lat.mean()))
+    return _rescale(np.column_stack([x, lat]))
+
+
+# Repulsion k^2 / d per unit mass along the rows of delta. Squared distances
+# are floored at (0.01 k)^2, and at radius2 (a squared radius) when given,
+# so coinciding points stay finite.
+def _repulsion(delta, k, radius2=None):
+    distance2 = np.maximum((delta**2).sum(axis=-1), (0.01 * k) ** 2)
+    if radius2 is not None:
+        distance2 = np.maximum(distance2, radius2)
+    return delta * (k * k / distance2)[..., None]
+
+
+# Far field repulsion on every node from all nodes except itself and its
+# near field (the rows of nearest), which force_positions repels exactly.
+# Nodes are binned into a grid, each occupied cell is repelled by the
+# (mass, centroid) of every other cell and its nodes inherit that force.
+# The rest of a node's own cell repels it as a uniform disk around the cell
+# centroid, like the charge of a 2D Coulomb field: k^2 * mass * d / R^2
+# inside radius R, k^2 * mass / d outside. Near field nodes in other cells
+# are taken out of those cells' mass. O(V * NEIGHBORS + cells^2) instead of
+# O(V^2).
+def _far_repulsion(pos, k, nearest, cells=GRID_CELLS):
+    low = pos.min(axis=0)
+    size = np.maximum(pos.max(axis=0) - low, 1e-12)
+    cell_xy = np.minimum(((pos - low) / size * cells).astype(np.int64), cells - 1)
+    cell = cell_xy[:, 0] * cells + cell_xy[:, 1]
+    _, cell = np.unique(cell, return_inverse=True)
+    mass = np.bincount(cell).astype(float)
+    centroid = np.column_stack(
+        [np.bincount(cell, pos[:, axis]) for axis in range(2)]
+    ) / mass[:, None]
+    pair = _repulsion(centroid[:, None, :] - centroid[None, :, :], k)
+    force = (pair * mass[None, :, None]).sum(axis=1)[cell]
+
+    # Disk with the mean squared distance of the cell's nodes to the centroid
+    spread = np.bincount(cell, (pos**2).sum(axis=1)) / mass - (centroid**2).sum(axis=1)
+    near_cell = cell[nearest]
+    rest = mass[cell] - 1 - (near_cell == cell[:, None]).sum(axis=1)
+    own = _repulsion(pos - centroid[cell], k, 2 * np.maximum(spread, 0.0)[cell])
+    force += own * rest[:, None]
+    # pair is zero on the diagonal, so same cell neighbors subtract nothing
+    force -= pair[cell[:, None], near_cell].sum(axis=1)
+    return force
+
+
+# Fruchterman-Reingold over the CSR arrays with a two-level Barnes-Hut style
+# approximation of the repulsion: exact from the NEIGHBORS nearest nodes
+# (KD-tree), from grid cell centroids for everything further away. Attraction
+# runs over the edge list, so an iteration is O(V * NEIGHBORS + cells^2 + E).
+# Starts from initial positions (random when None), returns an (n, 2) array.
+def force_positions(arrays, initial=None, iterations=FORCE_ITERATIONS, seed=SEED):
+    n = arrays.number_of_nodes
+    rng = np.random.default_rng(seed)
+    if initial is None:
+        pos = rng.random((n, 2))
+    else:
+        # Jitter so nodes sharing a coordinate get pushed apart
+        pos = (_rescale(initial) + 1) / 2 + rng.normal(0, 1e-4, (n, 2))
+    if n < 2:
+        return _rescale(pos)
+    k = 1 / math.sqrt(n)  # Optimal distance between nodes in the unit square
+    neighbors = min(NEIGHBORS, n - 1)
+    sources, targets = arrays.edge_sources, arrays.indices
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        # Near field repulsion, column 0 of the query is the node itself
+        _, nearest = cKDTree(pos).query(pos, k=neighbors + 1)
+        nearest = nearest[:, 1:]
+        displacement = _repulsion(pos[:, None, :] - pos[nearest], k).sum(axis=1)
+        displacement += _far_repulsion(pos, k, nearest)
+
+        # Attraction d^2 / k along the edges
+        delta = pos[sources] - pos[targets]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        force = delta * (distance / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] -= np.bincount(sources, force[:, axis], n)
+            displacement[:, axis] += np.bincount(targets, force[:, axis], n)
+
+        # Move by at most the current temperature
+        length = np.maximum(np.hypot(displacement[:, 0], displacement[:, 1]), 1e-12)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return _rescale(pos)
+
+
+class LayoutService:
+    def __init__(self, G, cache=None):
+        self.G = G
+        self.cache = cache
+        self._layouts = {}
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = graph_fingerprint(self.G)
+        return self._fingerprint
+
+    # Memoize a layout in memory and, when a MetricCache is set, on disk
+    def _cached(self, name, params, compute):
+        key = (name, tuple(sorted(params.items())))
+        if key not in self._layouts:
+
+            def timed_compute():
+                with stage("layout", layout=name):
+                    return compute()
+
+            if self.cache is None:
+                self._layouts[key] = timed_compute()
+            else:
+                self._layouts[key] = self.cache.get_or_compute(
+                    self.fingerprint, name, params, timed_compute
+                )
+        return self._layouts[key]
+
+    def _as_dict(self, pos):
+        return dict(zip(self.G.nodes(), pos))
+
+    def spring(self, seed=SEED):
+        return self._cached(
+            "spring_layout", {"seed": seed}, lambda: nx.spring_layout(self.G, seed=seed)
+        )
+
+    def geographic(self):
+        def compute():
+            pos = geographic_positions(self.G)
+            if pos is None:
+                raise ValueError("Geographic layout needs coordinates on every node")
+            return self._as_dict(pos)
+
+        return self._cached("geographic_layout", {}, compute)
+
+    def force(self, iterations=FORCE_ITERATIONS, seed=SEED):
+        def compute():
+            arrays = from_networkx(self.G, edge_attrs=())
+            initial = geographic_positions(self.G)
+            return self._as_dict(force_positions(arrays, initial, iterations, seed))
+
+        return self._cached(
+            "force_layout", {"iterations": iterations, "seed": seed}, compute
+        )
+
+    # Positions {node: array([x, y])} for one of LAYOUTS
+    def positions(self, layout="auto"):
+        if layout == "auto":
+            layout = "spring" if len(self.G) <= SPRING_MAX_NODES else "force"
+        if layout == "spring":
+            return self.spring()
+        if layout == "geographic":
+            return self.geographic()
+        if layout == "force":
+            return self.force()
+        raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
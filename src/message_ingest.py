@@ -0,0 +1,183 @@
+import io
+import pickle
+import os
+import sys
+from itertools import islice
+from pathlib import Path
+import networkx as nx
+import pandas as pd
+from graph_builder import EDGE_KEYS, build_graph
+from graph_snapshot import load_graph, snapshot_path, write_snapshot
+from weights import round2
+
+# Streaming ingestion of message logs into per-edge aggregates.
+# Logs are read in chunks of CHUNK_ROWS lines and reduced to running sums
+# and counts per (source, destination) edge, so memory grows with the number
+# of distinct edges, not with the number of messages. A checkpoint stores the
+# aggregates together with the byte offset reached in every log file, and a
+# later run only reads what was appended since.
+
+CHUNK_ROWS = 500_000
+DATA_DIR = Path(__file__).parent / "data"
+NODES_FILE = DATA_DIR / "nodes.csv"
+MESSAGES_FILE = DATA_DIR / "message_records.csv"
+GRAPH_FILE = DATA_DIR / "communication.graphml"
+CHECKPOINT_FILE = DATA_DIR / "message_ingest.checkpoint"
+SUM_COLUMNS = [
+    "delay_sum",
+    "delay_count",
+    "reliability_sum",
+    "reliability_count",
+    "messages",
+]
+
+
+class EdgeAggregator:
+    def __init__(self, sums=None):
+        if sums is None:
+            index = pd.MultiIndex.from_tuples([], names=EDGE_KEYS)
+            sums = pd.DataFrame(columns=SUM_COLUMNS, index=index, dtype=float)
+        self.sums = sums
+        # Edges changed since the aggregator was created or loaded
+        self.touched = set()
+
+    def add(self, messages_df):
+        chunk_sums = messages_df.groupby(EDGE_KEYS, sort=False).agg(
+            delay_sum=("delay_in_seconds", "sum"),
+            delay_count=("delay_in_seconds", "count"),
+            reliability_sum=("reliability_score", "sum"),
+            reliability_count=("reliability_score", "count"),
+            messages=("message_type", "count"),
+        )
+        self.sums = self.sums.add(chunk_sums.astype(float), fill_value=0.0)
+        self.touched.update(chunk_sums.index)
+
+    # Aggregated edges in the format of graph_builder.aggregate_messages,
+    # optionally only the edges touched since loading
+    def edges(self, touched_only=False):
+        sums = self.sums
+        if touched_only:
+            sums = sums.loc[sums.index.isin(list(self.touched))]
+        sums = sums.sort_index()
+        edges_df = pd.DataFrame(
+            {
+                "delay": round2((sums["delay_sum"] / sums["delay_count"]).to_numpy()),
+                "reliability": round2(
+                    (sums["reliability_sum"] / sums["reliability_count"]).to_numpy()
+                ),
+                "messages": sums["messages"].to_numpy().astype("int64"),
+            },
+            index=sums.index,
+        )
+        return edges_df.reset_index()
+
+
+# Yield (chunk DataFrame, byte offset after the chunk) for the complete lines
+# of a CSV log past offset. A trailing line without newline is still being
+# written and is left for the next run.
+def read_message_chunks(path, offset=0, chunk_rows=CHUNK_ROWS):
+    with open(path, "rb") as f:
+        header_line = f.readline()
+        names = header_line.decode().strip().split(",")
+        offset = max(offset, len(header_line))
+        f.seek(offset)
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if lines and not lines[-1].endswith(b"\n"):
+                lines.pop()
+                if not lines:
+                    break
+                partial = True
+            else:
+                partial = False
+            if not lines:
+                break
+            offset += sum(len(line) for line in lines)
+            chunk = pd.read_csv(io.BytesIO(b"".join(lines)), header=None, names=names)
+            yield chunk, offset
+            if partial:
+                break
+
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return EdgeAggregator(), {}
+    return EdgeAggregator(state["sums"]), state["offsets"]
+
+
+def save_checkpoint(aggregator, offsets, path=CHECKPOINT_FILE):
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(
+            {"sums": aggregator.sums, "offsets": offsets},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(tmp_path, path)
+
+
+# Read everything appended to the log files since the last checkpoint.
+# offsets maps a log path to the byte offset already ingested; a file that
+# is shorter than its offset was rotated and is read from the start.
+def ingest(paths, aggregator, offsets, chunk_rows=CHUNK_ROWS):
+    rows = 0
+    for path in paths:
+        key = str(Path(path).resolve())
+        offset = offsets.get(key, 0)
+        if Path(path).stat().st_size < offset:
+            offset = 0
+        for chunk, end in read_message_chunks(path, offset, chunk_rows):
+            aggregator.add(chunk)
+            offsets[key] = end
+            rows += len(chunk)
+    return rows
+
+
+# Set delay, reliability and messages on the given edges of G, adding new ones
+def apply_edges(G, edges_df):
+    G.add_edges_from(
+        zip(
+            edges_df[EDGE_KEYS[0]].tolist(),
+            edges_df[EDGE_KEYS[1]].tolist(),
+            edges_df[["delay", "reliability", "messages"]].to_dict("records"),
+        )
+    )
+    return G
+
+
+# Build the communication graph from the message logs like directed_graph.build,
+# but through the checkpoint: only messages appended since the last run are
+# read, and an existing graph only gets the edges they touched updated.
+# Returns (G, number of new message records).
+def build_incremental(
+    nodes_path=NODES_FILE,
+    message_paths=(MESSAGES_FILE,),
+    graph_path=GRAPH_FILE,
+    checkpoint_path=CHECKPOINT_FILE,
+    chunk_rows=CHUNK_ROWS,
+):
+    graph_path = Path(graph_path)
+    resuming = Path(checkpoint_path).exists() and graph_path.exists()
+    aggregator, offsets = load_checkpoint(checkpoint_path)
+    rows = ingest(message_paths, aggregator, offsets, chunk_rows)
+
+    if resuming:
+        # Update only the edges that received new messages
+        G = apply_edges(load_graph(graph_path), aggregator.edges(touched_only=True))
+    else:
+        G = build_graph(pd.read_csv(nodes_path), aggregator.edges())
+
+    nx.write_graphml(G, graph_path)
+    write_snapshot(G, snapshot_path(graph_path))
+    save_checkpoint(aggregator, offsets, checkpoint_path)
+    return G, rows
+
+
+if __name__ == "__main__":
+    G, rows = build_incremental(message_paths=sys.argv[1:] or [MESSAGES_FILE])
+    print(f"Ingested {rows} new message records")
+    print(f"Graph exported to {GRAPH_FILE}")
@@ -0,0 +1,265 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from diffusion_simulation import delay_stats
+
+# Vectorized replay of message logs (message_records.csv) for comparing the
+# simulator with observed behavior. Timestamps are parsed in bulk into int64
+# microseconds since the epoch and node ids into integer codes, so every
+# analysis below is a sort, a search or a bincount over arrays:
+# - observed activation: first receipt of every node, and the end-to-end
+#   latency per node type measured from the alert (first send in the log),
+#   in the delay_stats format of diffusion_simulation.py,
+# - hop-by-hop propagation trees: the parent of a message is the latest
+#   message its sender received before sending it, which gives the queueing
+#   gap between receive and send and the root message of every chain,
+# - sliding-window throughput of delivered messages.
+
+NODES_FILE = Path(__file__).parent / "data" / "nodes.csv"
+MESSAGES_FILE = Path(__file__).parent / "data" / "message_records.csv"
+TIMESTAMPS_FILE = Path(__file__).parent / "data" / "timestamps_delay.csv"
+MESSAGE_COLUMNS = [
+    "source_node_id",
+    "destination_node_id",
+    "timestamp_sent",
+    "timestamp_received",
+    "delay_in_seconds",
+    "reliability_score",
+]
+US_PER_SECOND = 1_000_000
+THROUGHPUT_WINDOW = 60.0  # Seconds
+THROUGHPUT_STEP = 1.0  # Seconds
+
+
+# ISO 8601 strings to int64 microseconds since the epoch, parsed in C
+def parse_timestamps(values):
+    values = np.asarray(values, dtype=object)
+    return np.array(values, dtype="datetime64[us]").view(np.int64)
+
+
+class MessageLog:
+    def __init__(
+        self, node_ids, source, destination, sent, received, delay, reliability
+    ):
+        self.node_ids = np.asarray(node_ids)
+        self.source = source
+        self.destination = destination
+        self.sent = sent
+        self.received = received
+        self.delay = delay
+        self.reliability = reliability
+
+    def __len__(self):
+        return len(self.source)
+
+    @property
+    def alert_time(self):
+        return self.sent.min()
+
+    @classmethod
+    def from_frame(cls, messages_df):
+        codes, node_ids = pd.factorize(
+            pd.concat(
+                [messages_df["source_node_id"], messages_df["destination_node_id"]],
+                ignore_index=True,
+            )
+        )
+        n = len(messages_df)
+        return cls(
+            node_ids.to_numpy(),
+            codes[:n].astype(np.int32),
+            codes[n:].astype(np.int32),
+            parse_timestamps(messages_df["timestamp_sent"]),
+            parse_timestamps(messages_df["timestamp_received"]),
+            messages_df["delay_in_seconds"].to_numpy(dtype=float),
+            messages_df["reliability_score"].to_numpy(dtype=float),
+        )
+
+
+# Read a CSV log, or Parquet (needs pyarrow) by file suffix. Node ids are read
+# as plain strings and factorized afterwards, the category dtype of read_csv
+# is several times slower.
+def read_message_log(path=MESSAGES_FILE):
+    if Path(path).suffix == ".parquet":
+        messages_df = pd.read_parquet(path, columns=MESSAGE_COLUMNS)
+    else:
+        messages_df = pd.read_csv(path, usecols=MESSAGE_COLUMNS)
+    return MessageLog.from_frame(messages_df)
+
+
+# First receipt of every node that received a message: node codes and times
+def first_receipts(log):
+    first = np.full(len(log.node_ids), np.iinfo(np.int64).max)
+    np.minimum.at(first, log.destination, log.received)
+    nodes = np.flatnonzero(np.bincount(log.destination, minlength=len(first)))
+    return nodes, first[nodes]
+
+
+# Observed activation per node, the format of diffusion_simulation's
+# activation_table with delay in seconds from the alert
+def activation_table(log, node_types):
+    nodes, times = first_receipts(log)
+    # The sender of the first message is the alert origin, active at 0
+    origin = log.source[log.sent.argmin()]
+    timestamps_df = pd.DataFrame(
+        {
+            "node_id": log.node_ids[np.concatenate([[origin], nodes])],
+            "activation_time": np.concatenate([[log.alert_time], times]),
+        }
+    ).drop_duplicates("node_id")
+    timestamps_df["node_type"] = (
+        timestamps_df["node_id"].map(node_types).fillna("Unknown")
+    )
+    timestamps_df["delay"] = (
+        timestamps_df["activation_time"] - log.alert_time
+    ) / US_PER_SECOND
+    return timestamps_df
+
+
+# Parent message of every message: the latest message received by its sender
+# at or before the send time, -1 when the sender received nothing before.
+# Node and time are packed into one int64 key, (node, time) order, so the
+# search is one argsort and one searchsorted.
+def parent_messages(log):
+    start = min(log.sent.min(), log.received.min())
+    span = max(log.sent.max(), log.received.max()) - start + 1
+    if len(log.node_ids) * span >= 2**62:
+        return _parent_messages_asof(log)
+    receipt_keys = log.destination.astype(np.int64) * span + (log.received - start)
+    receipts = np.argsort(receipt_keys)
+    receipt_keys = receipt_keys[receipts]
+    send_keys = log.source.astype(np.int64) * span + (log.sent - start)
+    # Searching sorted keys is several times faster than random ones
+    sends = np.argsort(send_keys)
+    position = np.empty(len(log), dtype=np.int64)
+    position[sends] = np.searchsorted(receipt_keys, send_keys[sends], side="right") - 1
+    # The match must be a receipt of the same node
+    found = (position >= 0) & (
+        receipt_keys[np.maximum(position, 0)] // span == log.source
+    )
+    return np.where(found, receipts[np.maximum(position, 0)], -1)
+
+
+# Same search with merge_asof, for logs too long to pack into int64 keys
+def _parent_messages_asof(log):
+    sends = pd.DataFrame(
+        {"time": log.sent, "node": log.source, "message": np.arange(len(log))}
+    ).sort_values("time", kind="stable")
+    receipts = pd.DataFrame(
+        {"time": log.received, "node": log.destination, "parent": np.arange(len(log))}
+    ).sort_values("time", kind="stable")
+    merged = pd.merge_asof(
+        sends, receipts, on="time", by="node", direction="backward"
+    )
+    parents = np.full(len(log), -1, dtype=np.int64)
+    parents[merged["message"].to_numpy()] = merged["parent"].fillna(-1).to_numpy()
+    return parents
+
+
+# Root message and number of earlier hops of every message by pointer
+# doubling over the parents, O(n log depth)
+def chain_roots(parents):
+    root = np.where(parents >= 0, parents, np.arange(len(parents)))
+    depth = (parents >= 0).astype(np.int64)
+    # Receipt times never decrease along a chain, so chains end at a root
+    # after at most log2(n) doublings unless zero delays form a cycle
+    for _ in range(64):
+        up = root[root]
+        if np.array_equal(up, root):
+            break
+        depth = depth + depth[root]
+        root = up
+    return root, depth
+
+
+# One row per message with its parent, the queueing gap at the sender
+# between receiving the parent and sending, the hop depth and the end-to-end
+# latency since its root message was sent
+def propagation_tree(log):
+    parents = parent_messages(log)
+    root, depth = chain_roots(parents)
+    has_parent = parents >= 0
+    gap = (log.sent - log.received[np.maximum(parents, 0)]) / US_PER_SECOND
+    return pd.DataFrame(
+        {
+            "source_node_id": log.node_ids[log.source],
+            "destination_node_id": log.node_ids[log.destination],
+            "parent": parents,
+            "root": root,
+            "hops": depth + 1,
+            "queueing_gap": np.where(has_parent, gap, np.nan),
+            "latency": (log.received - log.sent[root]) / US_PER_SECOND,
+        }
+    )
+
+
+# Queueing gap statistics per sender node type
+def queueing_gaps(tree_df, node_types):
+    gaps_df = tree_df.dropna(subset=["queueing_gap"])
+    sender_types = gaps_df["source_node_id"].map(node_types).fillna("Unknown")
+    return (
+        gaps_df.groupby(sender_types)["queueing_gap"]
+        .describe(percentiles=[0.5, 0.95])
+        .rename_axis("node_type")
+    )
+
+
+# Delivered messages in a sliding window ending every step seconds, from the
+# first to the last receipt
+def throughput(log, window=THROUGHPUT_WINDOW, step=THROUGHPUT_STEP):
+    start = log.received.min()
+    step_us = int(step * US_PER_SECOND)
+    bins = (log.received - start) // step_us
+    counts = np.bincount(bins)
+    width = max(1, int(round(window / step)))
+    cumulative = np.concatenate([[0], np.cumsum(counts)])
+    ends = np.arange(1, len(counts) + 1)
+    in_window = cumulative[ends] - cumulative[np.maximum(ends - width, 0)]
+    return pd.DataFrame(
+        {
+            "time": pd.to_datetime(start + ends * step_us, unit="us"),
+            "messages": in_window,
+            "rate": in_window / (width * step),
+        }
+    )
+
+
+def main(
+    messages_path=MESSAGES_FILE, nodes_path=NODES_FILE, timestamps_path=TIMESTAMPS_FILE
+):
+    log = read_message_log(messages_path)
+    nodes_df = pd.read_csv(nodes_path, usecols=["node_id", "node_type"])
+    node_types = pd.Series(nodes_df["node_type"].to_numpy(), index=nodes_df["node_id"])
+    print(f"Replayed {len(log)} messages between {len(log.node_ids)} nodes")
+
+    # Observed end-to-end latency next to the simulated one
+    observed_df = delay_stats(activation_table(log, node_types)).set_index("node_type")
+    print("\nObserved propagation delay for each group:")
+    print(observed_df)
+    if Path(timestamps_path).exists():
+        simulated_df = delay_stats(pd.read_csv(timestamps_path)).set_index("node_type")
+        comparison_df = pd.DataFrame(
+            {
+                "observed (s)": observed_df["Average delay (s)"],
+                "simulated (s)": simulated_df["Average delay (s)"],
+            }
+        )
+        print("\nAverage delay, observed vs simulated:")
+        print(comparison_df)
+
+    tree_df = propagation_tree(log)
+    print("\nQueueing gap between receive and send (s):")
+    print(queueing_gaps(tree_df, node_types))
+    print(f"\nLongest reconstructed chain: {tree_df['hops'].max()} hops")
+
+    throughput_df = throughput(log)
+    peak = throughput_df["messages"].idxmax()
+    print(
+        f"Peak throughput: {throughput_df.at[peak, 'messages']} messages in "
+        f"{THROUGHPUT_WINDOW:.0f}s ending {throughput_df.at[peak, 'time']}"
+    )
+    return observed_df, tree_df, throughput_df
+
+
+if __name__ == "__main__":
+    main()
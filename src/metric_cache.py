@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from instrumentation import watch_cache
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, eviction then runs unlocked
+    fcntl = None
+
+# On-disk cache for derived graph metrics (centralities, layouts).
+# Entries are keyed by a hash of the graph contents plus the algorithm name
+# and parameters, so any script that loads the same graph reuses the results.
+# Writes go through a temporary file and an atomic rename, and eviction of
+# the least recently used entries runs under an exclusive file lock, so
+# parallel jobs can share one cache directory.
+
+CACHE_DIR = Path(__file__).parent / "data" / "metric_cache"
+MAX_BYTES = 512 * 1024**2  # Evict least recently used entries above this size
+
+_MISSING = object()
+
+
+# SHA-256 of the graph structure and every node and edge attribute
+def graph_fingerprint(G):
+    digest = hashlib.sha256()
+    digest.update(repr((type(G).__name__, G.is_directed())).encode())
+    for node, data in sorted(G.nodes(data=True), key=lambda item: str(item[0])):
+        digest.update(repr((node, sorted(data.items()))).encode())
+    for u, v, data in sorted(
+        G.edges(data=True), key=lambda item: (str(item[0]), str(item[1]))
+    ):
+        digest.update(repr((u, v, sorted(data.items()))).encode())
+    return digest.hexdigest()
+
+
+class MetricCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        watch_cache(self)  # Hit rate reported with the metrics when enabled
+
+    # Cache key for a metric of a graph, fingerprint comes from graph_fingerprint
+    def key(self, fingerprint, name, params=None):
+        payload = json.dumps(
+            [fingerprint, name, params or {}], sort_keys=True, default=repr
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return self.directory / f"{key}.pkl"
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            # Missing, evicted by another job or truncated entries are misses
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    # Return the cached value, or compute, store and return it
+    def get_or_compute(self, fingerprint, name, params, compute):
+        key = self.key(fingerprint, name, params)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    # Delete least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        with open(self.directory / ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = []
+            for path in self.directory.glob("*.pkl"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def clear(self):
+        for path in self.directory.glob("*.pkl"):
+            path.unlink(missing_ok=True)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,185 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Seeded, vectorized generator for the network nodes.
+# Coordinates and attributes of every tier are created as arrays, for any
+# number of nodes per tier, and yielded in chunks so that country-scale node
+# tables can be written without holding them in memory. Coordinates are
+# sampled inside the Europe bounding box either uniformly, weighted by the
+# country populations in Countries-Europe.csv, or around random clusters.
+
+# Define the bounding box for Europe (approximate lat/lon ranges)
+LAT_MIN, LAT_MAX = 35.0, 70.0
+LON_MIN, LON_MAX = -10.0, 40.0
+
+# Node types and their properties, in PROPAGATION_PATH order
+NODE_TYPES = [
+    {"type": "alert_origin", "role_priority": 5, "capacity": 1000, "influence_score": 1.0},
+    {"type": "control_center", "role_priority": 4, "capacity": 500, "influence_score": 0.8},
+    {"type": "media_outlet", "role_priority": 3, "capacity": 200, "influence_score": 0.6},
+    {"type": "community_leader", "role_priority": 2, "capacity": 100, "influence_score": 0.4},
+    {"type": "citizen", "role_priority": 1, "capacity": 10, "influence_score": 0.2},
+]
+TIER_COUNTS = (1, 10, 20, 50, 100)
+
+SAMPLING_MODES = ("uniform", "population", "clustered")
+COUNTRIES_FILE = Path(__file__).parent / "data" / "Countries-Europe.csv"
+KM_PER_DEGREE = 111.32
+N_CLUSTERS = 25
+CLUSTER_STD_KM = 50.0
+CHUNK_NODES = 1_000_000
+# Out-of-box points are redrawn this many times before being clipped
+MAX_REDRAWS = 10
+
+
+def _in_box(lat, lon):
+    return (lat >= LAT_MIN) & (lat <= LAT_MAX) & (lon >= LON_MIN) & (lon <= LON_MAX)
+
+
+# Normal scatter around centers given in degrees, with a spread in km
+def _scatter(rng, center_lat, center_lon, spread_km):
+    lat = center_lat + rng.normal(0.0, 1.0, len(center_lat)) * spread_km / KM_PER_DEGREE
+    lon_scale = KM_PER_DEGREE * np.maximum(np.cos(np.radians(center_lat)), 0.1)
+    lon = center_lon + rng.normal(0.0, 1.0, len(center_lon)) * spread_km / lon_scale
+    return lat, lon
+
+
+# Draw n points with draw(rng, n), redrawing points outside the bounding box
+def _sample_in_box(rng, n, draw):
+    lat, lon = draw(rng, n)
+    for _ in range(MAX_REDRAWS):
+        outside = np.flatnonzero(~_in_box(lat, lon))
+        if len(outside) == 0:
+            break
+        lat[outside], lon[outside] = draw(rng, len(outside))
+    return np.clip(lat, LAT_MIN, LAT_MAX), np.clip(lon, LON_MIN, LON_MAX)
+
+
+def uniform_sampler():
+    def draw(rng, n):
+        return rng.uniform(LAT_MIN, LAT_MAX, n), rng.uniform(LON_MIN, LON_MAX, n)
+
+    return draw
+
+
+# Pick a country with probability proportional to its population and scatter
+# around its centroid with a spread of half the side of its land area
+def population_sampler(countries_df=None):
+    if countries_df is None:
+        countries_df = pd.read_csv(COUNTRIES_FILE)
+    countries_df = countries_df[
+        _in_box(countries_df["latitude"], countries_df["longitude"])
+    ]
+    center_lat = countries_df["latitude"].to_numpy(dtype=float)
+    center_lon = countries_df["longitude"].to_numpy(dtype=float)
+    spread_km = np.sqrt(countries_df["land area km"].to_numpy(dtype=float)) / 2
+    population = countries_df["population"].to_numpy(dtype=float)
+    p = population / population.sum()
+
+    def draw(rng, n):
+        country = rng.choice(len(p), size=n, p=p)
+        return _scatter(rng, center_lat[country], center_lon[country], spread_km[country])
+
+    return draw
+
+
+# Scatter around n_clusters uniformly placed cluster centers
+def clustered_sampler(rng, n_clusters=N_CLUSTERS, cluster_std_km=CLUSTER_STD_KM):
+    center_lat = rng.uniform(LAT_MIN, LAT_MAX, n_clusters)
+    center_lon = rng.uniform(LON_MIN, LON_MAX, n_clusters)
+
+    def draw(rng, n):
+        cluster = rng.integers(0, n_clusters, n)
+        return _scatter(
+            rng, center_lat[cluster], center_lon[cluster], np.full(n, cluster_std_km)
+        )
+
+    return draw
+
+
+def _sampler(rng, sampling, countries_df, n_clusters, cluster_std_km):
+    if sampling == "uniform":
+        return uniform_sampler()
+    if sampling == "population":
+        return population_sampler(countries_df)
+    if sampling == "clustered":
+        return clustered_sampler(rng, n_clusters, cluster_std_km)
+    raise ValueError(f"Unknown sampling mode {sampling!r}, expected one of {SAMPLING_MODES}")
+
+
+# count node ids numbered from first, Node_001, Node_002, ...
+def node_ids(first, count):
+    numbers = np.arange(first, first + count)
+    return np.char.add("Node_", np.char.zfill(numbers.astype(str), 3))
+
+
+# Yield node table chunks of at most chunk_nodes rows for the given number
+# of nodes per NODE_TYPES tier
+def generate_nodes(
+    tier_counts=TIER_COUNTS,
+    seed=42,
+    sampling="uniform",
+    chunk_nodes=CHUNK_NODES,
+    countries_df=None,
+    n_clusters=N_CLUSTERS,
+    cluster_std_km=CLUSTER_STD_KM,
+):
+    if len(tier_counts) != len(NODE_TYPES):
+        raise ValueError(f"Expected {len(NODE_TYPES)} tier counts, got {len(tier_counts)}")
+    rng = np.random.default_rng(seed)
+    draw = _sampler(rng, sampling, countries_df, n_clusters, cluster_std_km)
+
+    first = 1
+    for node_type, count in zip(NODE_TYPES, tier_counts):
+        for start in range(0, count, chunk_nodes):
+            n = min(chunk_nodes, count - start)
+            lat, lon = _sample_in_box(rng, n, draw)
+            yield pd.DataFrame(
+                {
+                    "node_id": node_ids(first + start, n),
+                    "node_type": np.full(n, node_type["type"]),
+                    "latitude": np.round(lat, 6),
+                    "longitude": np.round(lon, 6),
+                    "role_priority": np.full(n, node_type["role_priority"]),
+                    "capacity": np.full(n, node_type["capacity"]),
+                    "influence_score": np.full(n, node_type["influence_score"]),
+                }
+            )
+        first += count
+
+
+def _write_parquet(chunks, output_path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Writing Parquet node tables requires pyarrow") from None
+
+    written = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+# Stream node chunks into a CSV file, or a Parquet file when output_path ends
+# in .parquet. Returns the number of nodes written.
+def write_nodes(chunks, output_path):
+    if Path(output_path).suffix == ".parquet":
+        return _write_parquet(chunks, output_path)
+    written = 0
+    for chunk in chunks:
+        first = written == 0
+        chunk.to_csv(output_path, mode="w" if first else "a", header=first, index=False)
+        written += len(chunk)
+    return written
+
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from graph_arrays import from_networkx
+from graph_snapshot import load_graph, open_snapshot
+from weights import array_weight_columns, log_reliability
+
+# Deterministic path solver, a fast alternative to Monte Carlo cascades when
+# only path latencies are needed. One Dijkstra run over the CSR arrays gives
+# the cost of the best path to every node and the predecessor tree, in one of
+# the modes:
+#   delay        fastest path, the first arrival when every message gets through
+#   weight       lowest weight from assign_weights.py (delay over reliability)
+#   reliability  most reliable path, maximizing the product of reliabilities
+#                by minimizing the sum of -log(reliability)
+# Latency (sum of delays) and reliability along the chosen paths are then
+# accumulated over the predecessor tree for every mode.
+
+PATH_MODES = ("delay", "weight", "reliability")
+GRAPH_FILE = Path(__file__).parent / "data" / "communication_updated.graphml"
+PATHS_FILE = Path(__file__).parent / "data" / "path_latency.csv"
+
+
+# Edge costs of a mode in CSR edge order
+def edge_costs(arrays, mode="delay"):
+    if mode == "delay":
+        return np.asarray(arrays.edge("delay"), dtype=float)
+    if mode == "weight":
+        if "weight" in arrays.edge_attrs:
+            return np.asarray(arrays.edge("weight"), dtype=float)
+        return array_weight_columns(arrays)["weight"]
+    if mode == "reliability":
+        # Clipped since reliability 1 plus EPSILON gives a tiny negative cost
+        costs = log_reliability(
+            {"reliability": np.asarray(arrays.edge("reliability"), dtype=float)}
+        )
+        return np.maximum(costs, 0.0)
+    raise ValueError(f"Unknown path mode {mode!r}, expected one of {PATH_MODES}")
+
+
+def _cost_matrix(arrays, costs):
+    n = arrays.number_of_nodes
+    return csr_matrix((costs, arrays.indices, arrays.indptr), shape=(n, n))
+
+
+# CSR position of the edge predecessor -> node for every node with a
+# predecessor, -1 elsewhere
+def tree_edges(arrays, predecessors):
+    n = arrays.number_of_nodes
+    positions = csr_matrix(
+        (np.arange(1, arrays.number_of_edges + 1), arrays.indices, arrays.indptr),
+        shape=(n, n),
+    )
+    edges = np.full(n, -1, dtype=np.int64)
+    nodes = np.flatnonzero(predecessors >= 0)
+    if len(nodes):
+        edges[nodes] = np.asarray(positions[predecessors[nodes], nodes]).ravel() - 1
+    return edges
+
+
+# Sum values along the predecessor tree from the root to every node by
+# pointer doubling, in O(n log depth). values[v] belongs to the edge into v.
+def accumulate(predecessors, values):
+    total = values.copy()
+    parent = predecessors.copy()
+    while True:
+        has_parent = parent >= 0
+        if not has_parent.any():
+            return total
+        up = np.where(has_parent, parent, 0)
+        total = np.where(has_parent, total + total[up], total)
+        parent = np.where(has_parent, parent[up], -1)
+
+
+# Per-node path table for one predecessor tree
+def _path_table(arrays, cost, predecessors, sources=None):
+    edges = tree_edges(arrays, predecessors)
+    in_tree = edges >= 0
+    tree_edge = np.maximum(edges, 0)
+    delay = np.where(in_tree, arrays.edge("delay")[tree_edge], 0.0)
+    reached = np.isfinite(cost)
+    # Reliability is multiplied up as a sum of logs, a zero one gives -inf
+    with np.errstate(divide="ignore"):
+        log_rel = np.where(in_tree, np.log(arrays.edge("reliability")[tree_edge]), 0.0)
+        paths_df = pd.DataFrame(
+            {
+                "cost": cost,
+                "latency": np.where(reached, accumulate(predecessors, delay), np.inf),
+                "reliability": np.where(
+                    reached, np.exp(accumulate(predecessors, log_rel)), 0.0
+                ),
+                "hops": np.where(
+                    reached, accumulate(predecessors, in_tree.astype(np.int64)), -1
+                ),
+                "predecessor": np.where(
+                    in_tree, arrays.node_ids[np.maximum(predecessors, 0)], None
+                ),
+            },
+            index=pd.Index(arrays.node_ids, name="node_id"),
+        )
+    if sources is not None:
+        served_by = arrays.node_ids[np.maximum(sources, 0)]
+        paths_df.insert(0, "source", np.where(sources >= 0, served_by, None))
+    return paths_df
+
+
+def _source_rows(arrays, sources):
+    sources = [sources] if isinstance(sources, str) else list(sources)
+    return np.array([arrays.index[s] for s in sources], dtype=np.int64)
+
+
+# Best path from the nearest of the sources to every node, in one Dijkstra
+# run. Returns a table indexed by node_id with the serving source, cost,
+# latency, reliability and hops of the path and the predecessor.
+def solve_paths(arrays, sources, mode="delay"):
+    graph = _cost_matrix(arrays, edge_costs(arrays, mode))
+    cost, predecessors, nearest = dijkstra(
+        graph,
+        indices=_source_rows(arrays, sources),
+        min_only=True,
+        return_predecessors=True,
+    )
+    return _path_table(arrays, cost, predecessors, nearest)
+
+
+# Best paths from every source separately, batched into one Dijkstra call.
+# Returns one path table per source, concatenated with a source column.
+def solve_paths_per_source(arrays, sources, mode="delay"):
+    rows = _source_rows(arrays, sources)
+    graph = _cost_matrix(arrays, edge_costs(arrays, mode))
+    cost, predecessors = dijkstra(graph, indices=rows, return_predecessors=True)
+    tables = []
+    for i, row in enumerate(rows):
+        paths_df = _path_table(arrays, cost[i], predecessors[i])
+        paths_df.insert(0, "source", arrays.node_ids[row])
+        tables.append(paths_df)
+    return pd.concat(tables)
+
+
+# Node ids on the path to target in a path table, source first
+def path_to(paths_df, target):
+    predecessor = paths_df["predecessor"]
+    if not np.isfinite(paths_df.at[target, "cost"]):
+        return []
+    path = [target]
+    while not pd.isna(predecessor[path[-1]]):
+        path.append(predecessor[path[-1]])
+    return path[::-1]
+
+
+def main(graph_path=GRAPH_FILE, mode="delay", output_path=PATHS_FILE):
+    # The memory-mapped snapshot skips building a NetworkX graph at all
+    snapshot = open_snapshot(graph_path)
+    if snapshot is not None:
+        arrays = snapshot.arrays
+    else:
+        arrays = from_networkx(
+            load_graph(graph_path),
+            edge_attrs=("delay", "reliability", "weight"),
+            node_attrs=("node_type",),
+        )
+    node_types = np.asarray(arrays.node_attrs["node_type"])
+    control_centers = arrays.node_ids[node_types == "control_center"]
+    paths_df = solve_paths(arrays, control_centers, mode)
+    paths_df["node_type"] = node_types
+    print(f"Paths from the nearest of {len(control_centers)} control centers ({mode}):")
+    print(
+        paths_df.replace(np.inf, np.nan)
+        .groupby("node_type")[["latency", "reliability", "hops"]]
+        .mean()
+    )
+    paths_df.to_csv(output_path)
+    print(f"Path latencies exported to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+# Process pools whose workers share one read-only object (a graph, CSR
+# arrays, a sampler). initializer(shared) stores it in a module global the
+# task functions read. With fork it runs once in the parent and the workers
+# inherit the object through copy-on-write memory, with spawn it runs in
+# every worker and the object is pickled once per worker, never per task.
+
+
+def _context_and_initargs(initializer, shared):
+    if "fork" in mp.get_all_start_methods():
+        initializer(shared)
+        return mp.get_context("fork"), None, ()
+    return mp.get_context("spawn"), initializer, (shared,)
+
+
+# multiprocessing.Pool of processes workers sharing shared
+def make_pool(initializer, shared, processes=None):
+    context, initializer, initargs = _context_and_initargs(initializer, shared)
+    return context.Pool(processes, initializer, initargs)
+
+
+# ProcessPoolExecutor of processes workers sharing shared
+def make_executor(initializer, shared, processes=None):
+    context, initializer, initargs = _context_and_initargs(initializer, shared)
+    return ProcessPoolExecutor(processes, context, initializer, initargs)
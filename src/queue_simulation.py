@@ -0,0 +1,554 @@
+import math
+from collections import deque
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from graph_arrays import from_networkx
+from graph_snapshot import load_graph, open_snapshot
+from instrumentation import stage
+
+# Discrete-event simulation of alert cascades with congested relays.
+# The IC model treats every relay as infinitely fast. Here every node is a
+# single server with a bounded queue:
+# - capacity is messages per CAPACITY_PERIOD seconds, so sending one message
+#   takes CAPACITY_PERIOD / capacity seconds,
+# - a node activated by an alert queues one message to every successor,
+#   served in order of the recipient's role_priority and FIFO within it,
+# - at most capacity * QUEUE_PERIODS messages wait in a queue, arrivals past
+#   that are dropped, lowest recipient priority first,
+# - a sent message arrives after the edge delay with probability reliability,
+#   and the first arrival of an alert activates the recipient.
+# Several alerts share the queues, which is where mass-alert congestion comes
+# from.
+#
+# Messages are handled in bulk rather than one heap event each. A message
+# finished at time c can activate a node no earlier than c + min(delay), so
+# with windows of that length every activation inside a window is final once
+# the previous windows are simulated (conservative lookahead).
+# Within a window a queue holding the fan-out of a single alert is a range of
+# the node's fan-out in service order, so these queues are kept as arrays
+# (alert, head, tail, free_at) and served, expanded and delivered for all
+# nodes at once. Only a node whose queue holds several alerts, where a newer
+# alert's high priority messages overtake older ones, runs as a _Server in
+# Python until its queue drains. Activations are kept sparse as
+# (alert, node, time) and deduplicated through packed alert * n + node keys.
+
+CAPACITY_PERIOD = 60.0  # Seconds, node capacity is messages per minute
+QUEUE_PERIODS = 10  # Queue bound in capacity periods of work
+
+GRAPH_FILE = Path(__file__).parent / "data" / "communication_updated.graphml"
+TIMELINE_FILE = Path(__file__).parent / "data" / "queue_timeline.csv"
+START_NODE = "Node_001"
+
+
+class _Server:
+    def __init__(self, service_time, limit, fanout, free_at):
+        self.service_time = service_time
+        self.limit = limit
+        self.fanout = fanout  # [(priority, edge positions)], highest priority first
+        self.queues = {priority: deque() for priority, _ in fanout}
+        self.queued = 0
+        self.free_at = free_at
+        self.max_queue = 0
+
+    # Take over the rest of a single alert's fan-out from the array state,
+    # positions in service order with their priorities
+    def resume(self, alert, positions, priorities):
+        for priority, _ in self.fanout:
+            level = positions[priorities == priority]
+            if len(level):
+                self.queues[priority].append([alert, level, 0])
+        self.queued += len(positions)
+        self.max_queue = max(self.max_queue, self.queued)
+
+    # Queue the fan-out of a newly activated alert, dropping what does not fit
+    def admit(self, alert):
+        dropped = 0
+        for priority, positions in self.fanout:
+            space = self.limit - self.queued
+            if space < len(positions):
+                dropped += len(positions) - max(space, 0)
+                positions = positions[: max(space, 0)]
+            if len(positions):
+                # Segment: alert, edge positions, number already sent
+                self.queues[priority].append([alert, positions, 0])
+                self.queued += len(positions)
+        self.max_queue = max(self.max_queue, self.queued)
+        return dropped
+
+    def _head(self):
+        for priority, _ in self.fanout:
+            if self.queues[priority]:
+                return self.queues[priority]
+        return None
+
+    # Serve messages starting in [start, end) given the alerts activating
+    # this node in the window as sorted (time, alert). Returns the served
+    # chunks as (alert, edge positions, completion times), the busy time
+    # and the number of dropped messages in the window.
+    def run(self, arrivals, start, end):
+        served = []
+        dropped = 0
+        # Still busy with a message started in an earlier window
+        busy = min(max(self.free_at - start, 0.0), end - start)
+        t = max(self.free_at, start)
+        i = 0
+        while True:
+            while i < len(arrivals) and arrivals[i][0] <= t:
+                dropped += self.admit(arrivals[i][1])
+                i += 1
+            queue = self._head()
+            if queue is None:
+                if i < len(arrivals):
+                    t = arrivals[i][0]
+                    continue
+                break
+            if t >= end:
+                break
+            # Serve the head segment until the window ends or a new alert
+            # arrives, which may bring higher priority messages
+            horizon = arrivals[i][0] if i < len(arrivals) else end
+            segment = queue[0]
+            alert, positions, offset = segment
+            count = min(
+                len(positions) - offset, math.ceil((horizon - t) / self.service_time)
+            )
+            completions = t + self.service_time * np.arange(1, count + 1)
+            served.append((alert, positions[offset : offset + count], completions))
+            segment[2] += count
+            if segment[2] == len(positions):
+                queue.popleft()
+            self.queued -= count
+            busy += min(completions[-1], end) - t
+            t = completions[-1]
+        self.free_at = t
+        return served, busy, dropped
+
+
+# Set of int64 keys as sorted arrays, each more than twice the size of the
+# next. Adding merges the smaller levels like a binary counter, so a key is
+# re-sorted O(log N) times and a lookup is one binary search per level.
+class _KeySet:
+    def __init__(self):
+        self.levels = []
+
+    def contains(self, keys):
+        found = np.zeros(len(keys), dtype=bool)
+        for level in self.levels:
+            i = np.minimum(np.searchsorted(level, keys), len(level) - 1)
+            found |= level[i] == keys
+        return found
+
+    def add(self, keys):
+        if len(keys) == 0:
+            return
+        level = np.sort(keys)
+        while self.levels and len(self.levels[-1]) <= 2 * len(level):
+            level = np.sort(np.concatenate([self.levels.pop(), level]))
+        self.levels.append(level)
+
+
+def _node_column(arrays, name):
+    if name not in arrays.node_attrs:
+        raise ValueError(f"Queue simulation needs the node attribute {name!r}")
+    return np.asarray(arrays.node_attrs[name])
+
+
+# Fan-out of a node as [(priority, edge positions)] from its positions in
+# service order, highest recipient role_priority first
+def _fanout(positions, priorities):
+    bounds = np.flatnonzero(np.diff(priorities)) + 1
+    return [
+        (level[0], part)
+        for part, level in zip(np.split(positions, bounds), np.split(priorities, bounds))
+    ]
+
+
+# Entries starts[i] ... starts[i] + counts[i] - 1 of all ranges, concatenated,
+# with the range of every entry and its offset inside the range
+def _ranges(starts, counts):
+    owner = np.repeat(np.arange(len(counts)), counts)
+    offset = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return starts[owner] + offset, owner, offset
+
+
+# Run alerts through the queueing network. alerts is a list of seed node ids
+# or (seed node id, start time) pairs. Returns
+# - activations, one (alert, node_id, activation_time) row per reached node
+#   and alert, alert being the position in alerts,
+# - a timeline with queue length, utilization, sent and dropped messages per
+#   node type and window,
+# - per node totals.
+def simulate_queues(
+    arrays,
+    alerts,
+    capacity_period=CAPACITY_PERIOD,
+    queue_periods=QUEUE_PERIODS,
+    rng=None,
+):
+    if rng is None:
+        rng = np.random.default_rng()
+    n = arrays.number_of_nodes
+    capacity = _node_column(arrays, "capacity").astype(float)
+    role_priority = _node_column(arrays, "role_priority").astype(np.int64)
+    node_types = _node_column(arrays, "node_type")
+    if np.any(capacity <= 0):
+        raise ValueError("Every node needs a positive capacity")
+    delay = np.asarray(arrays.edge("delay"), dtype=float)
+    reliability = np.asarray(arrays.edge("reliability"), dtype=float)
+    window = delay.min() if len(delay) else 1.0
+    if window <= 0:
+        raise ValueError("Queue simulation needs positive edge delays")
+
+    service_time = capacity_period / capacity
+    limit = np.floor(capacity * queue_periods).astype(np.int64)
+    indptr = np.asarray(arrays.indptr, dtype=np.int64)
+    targets = np.asarray(arrays.indices, dtype=np.int64)
+    degree = np.diff(indptr)
+    # Edge positions of every node's fan-out in service order: recipient
+    # role_priority high to low, CSR order within a priority
+    edge_priority = role_priority[targets]
+    service_order = np.lexsort((-edge_priority, arrays.edge_sources))
+    service_priority = edge_priority[service_order]
+    type_names, type_codes = np.unique(node_types.astype(str), return_inverse=True)
+    n_types = len(type_names)
+    type_counts = np.bincount(type_codes, minlength=n_types)
+
+    alerts = [(alert, 0.0) if isinstance(alert, str) else alert for alert in alerts]
+    origin = min(start for _, start in alerts)
+
+    # Array queue state: node v sends the fan-out of queue_alert[v] from
+    # service_order[indptr[v] + head[v]] up to indptr[v] + tail[v]
+    queue_alert = np.full(n, -1, dtype=np.int64)
+    head = np.zeros(n, dtype=np.int64)
+    tail = np.zeros(n, dtype=np.int64)
+    free_at = np.full(n, -np.inf)
+    sent = np.zeros(n, dtype=np.int64)
+    dropped = np.zeros(n, dtype=np.int64)
+    busy_time = np.zeros(n)
+    max_queue = np.zeros(n, dtype=np.int64)
+    relayed = np.zeros(n, dtype=bool)
+    # Nodes with several alerts queued run as a _Server instead
+    servers = {}
+    in_server = np.zeros(n, dtype=bool)
+    pending = np.zeros(0, dtype=np.int64)  # Array nodes still busy
+
+    activated = _KeySet()
+    activations = []
+    timeline = []
+    # Calendar of candidate arrivals per window: index -> [(alert, node, time)]
+    calendar = {}
+
+    def schedule(alert_index, nodes, times):
+        slots = ((times - origin) // window).astype(np.int64)
+        order = np.argsort(slots, kind="stable")
+        slots = slots[order]
+        bounds = np.flatnonzero(np.diff(slots)) + 1
+        for part, chunk in zip(np.split(slots, bounds), np.split(order, bounds)):
+            if len(chunk):
+                calendar.setdefault(part[0], []).append(
+                    (alert_index[chunk], nodes[chunk], times[chunk])
+                )
+
+    schedule(
+        np.arange(len(alerts), dtype=np.int64),
+        np.array([arrays.index[seed] for seed, _ in alerts], dtype=np.int64),
+        np.array([start for _, start in alerts], dtype=float),
+    )
+
+    current = None
+    while calendar or len(pending) or servers:
+        slot = min(calendar) if calendar else None
+        if len(pending) or servers:
+            slot = current + 1 if slot is None else min(slot, current + 1)
+        current = slot
+        start = origin + slot * window
+        end = start + window
+
+        # Final activations of the window, earliest arrival per alert and node
+        empty = np.zeros(0, dtype=np.int64)
+        arrival_alert, arrival_node, arrival_time = empty, empty, np.zeros(0)
+        chunks = calendar.pop(slot, [])
+        if chunks:
+            keys = np.concatenate([a * n + v for a, v, _ in chunks])
+            times = np.concatenate([t for _, _, t in chunks])
+            order = np.lexsort((times, keys))
+            keys, times = keys[order], times[order]
+            first = np.ones(len(keys), dtype=bool)
+            first[1:] = keys[1:] != keys[:-1]
+            keys, times = keys[first], times[first]
+            new = ~activated.contains(keys)
+            keys, times = keys[new], times[new]
+            activated.add(keys)
+            alert_index, nodes = keys // n, keys % n
+            activations.append((alert_index, nodes, times))
+            relays = degree[nodes] > 0
+            # Sorted by node, then time
+            order = np.lexsort((times[relays], nodes[relays]))
+            arrival_alert = alert_index[relays][order]
+            arrival_node = nodes[relays][order]
+            arrival_time = times[relays][order]
+
+        arrival_nodes, arrival_first, arrival_count = np.unique(
+            arrival_node, return_index=True, return_counts=True
+        )
+        relayed[arrival_nodes] = True
+        # Several alerts at once, or a new alert behind a queued one
+        to_server = (
+            (arrival_count > 1)
+            | (tail[arrival_nodes] > head[arrival_nodes])
+            | in_server[arrival_nodes]
+        )
+
+        # Python path
+        server_nodes, server_busy, server_sent, server_dropped = [], [], [], []
+        served = []
+        arrivals = {
+            node: list(
+                zip(
+                    arrival_time[first : first + count].tolist(),
+                    arrival_alert[first : first + count].tolist(),
+                )
+            )
+            for node, first, count in zip(
+                arrival_nodes[to_server].tolist(),
+                arrival_first[to_server].tolist(),
+                arrival_count[to_server].tolist(),
+            )
+        }
+        for node in arrivals:
+            if node in servers:
+                continue
+            positions = service_order[indptr[node] : indptr[node + 1]]
+            priorities = service_priority[indptr[node] : indptr[node + 1]]
+            server = _Server(
+                service_time[node],
+                limit[node],
+                _fanout(positions, priorities),
+                free_at[node],
+            )
+            if tail[node] > head[node]:
+                server.resume(
+                    queue_alert[node],
+                    positions[head[node] : tail[node]],
+                    priorities[head[node] : tail[node]],
+                )
+                head[node] = tail[node]
+            queue_alert[node] = -1
+            servers[node] = server
+            in_server[node] = True
+        for node in list(servers):
+            server = servers[node]
+            chunks, node_busy, node_dropped = server.run(
+                arrivals.get(node, []), start, end
+            )
+            served.extend(chunks)
+            server_nodes.append(node)
+            server_busy.append(node_busy)
+            server_sent.append(sum(len(positions) for _, positions, _ in chunks))
+            server_dropped.append(node_dropped)
+            max_queue[node] = max(max_queue[node], server.max_queue)
+            free_at[node] = server.free_at
+            if server.queued == 0:
+                del servers[node]
+                in_server[node] = False
+        server_nodes = np.array(server_nodes, dtype=np.int64)
+        server_busy = np.array(server_busy, dtype=float)
+        server_sent = np.array(server_sent, dtype=np.int64)
+        server_dropped = np.array(server_dropped, dtype=np.int64)
+        server_queued = np.array(
+            [servers[node].queued if node in servers else 0 for node in server_nodes],
+            dtype=np.int64,
+        )
+        sent[server_nodes] += server_sent
+        dropped[server_nodes] += server_dropped
+        busy_time[server_nodes] += server_busy
+
+        # Array path: admit single alerts at idle queues, then serve every
+        # queue for the window at once
+        admitted_nodes = arrival_nodes[~to_server]
+        admitted_alert = arrival_alert[arrival_first[~to_server]]
+        admitted_time = arrival_time[arrival_first[~to_server]]
+        admitted = np.minimum(degree[admitted_nodes], limit[admitted_nodes])
+        queue_alert[admitted_nodes] = admitted_alert
+        head[admitted_nodes] = 0
+        tail[admitted_nodes] = admitted
+        max_queue[admitted_nodes] = np.maximum(max_queue[admitted_nodes], admitted)
+        nodes = np.union1d(np.setdiff1d(pending, server_nodes), admitted_nodes)
+        ready = np.full(len(nodes), start)
+        ready[np.searchsorted(nodes, admitted_nodes)] = admitted_time
+        node_dropped = np.zeros(len(nodes), dtype=np.int64)
+        node_dropped[np.searchsorted(nodes, admitted_nodes)] = (
+            degree[admitted_nodes] - admitted
+        )
+
+        carry = np.clip(free_at[nodes] - start, 0.0, window)
+        begin = np.maximum(free_at[nodes], ready)
+        queued = tail[nodes] - head[nodes]
+        node_service = service_time[nodes]
+        count = np.where(
+            (queued > 0) & (begin < end),
+            np.minimum(queued, np.ceil((end - begin) / node_service)),
+            0,
+        ).astype(np.int64)
+        last = begin + count * node_service
+        node_busy = carry + np.where(count > 0, np.minimum(last, end) - begin, 0.0)
+        serving = count > 0
+        positions, owner, offset = _ranges(
+            indptr[nodes[serving]] + head[nodes[serving]], count[serving]
+        )
+        array_alert = queue_alert[nodes[serving]][owner]
+        array_positions = service_order[positions]
+        array_completions = (
+            begin[serving][owner] + node_service[serving][owner] * (offset + 1)
+        )
+        head[nodes] += count
+        free_at[nodes] = np.where(serving, last, free_at[nodes])
+        sent[nodes] += count
+        dropped[nodes] += node_dropped
+        busy_time[nodes] += node_busy
+        queued = tail[nodes] - head[nodes]
+        queue_alert[nodes[queued == 0]] = -1
+        # Drained servers still sending their last message carry over too
+        pending = np.concatenate(
+            [
+                nodes[(queued > 0) | (free_at[nodes] > end)],
+                server_nodes[~in_server[server_nodes] & (free_at[server_nodes] > end)],
+            ]
+        )
+
+        # Timeline per node type over every node that was busy in the window
+        codes = type_codes[np.concatenate([nodes, server_nodes])]
+        active = np.bincount(codes, minlength=n_types)
+        window_busy = np.bincount(
+            codes, np.concatenate([node_busy, server_busy]), n_types
+        )
+        window_sent = np.bincount(
+            codes, np.concatenate([count, server_sent]), n_types
+        ).astype(np.int64)
+        window_dropped = np.bincount(
+            codes, np.concatenate([node_dropped, server_dropped]), n_types
+        ).astype(np.int64)
+        window_queued = np.bincount(
+            codes, np.concatenate([queued, server_queued]), n_types
+        ).astype(np.int64)
+        for code in np.flatnonzero(active):
+            timeline.append(
+                (
+                    start,
+                    type_names[code],
+                    window_queued[code],
+                    window_busy[code] / (window * type_counts[code]),
+                    window_sent[code],
+                    window_dropped[code],
+                )
+            )
+
+        # Deliver the sent messages: arrival after the edge delay, with
+        # probability reliability
+        alert_index = np.concatenate(
+            [
+                np.repeat(
+                    np.array([a for a, _, _ in served], dtype=np.int64),
+                    [len(p) for _, p, _ in served],
+                ),
+                array_alert,
+            ]
+        )
+        positions = np.concatenate(
+            [p for _, p, _ in served] + [array_positions]
+        ).astype(np.int64)
+        completions = np.concatenate([t for _, _, t in served] + [array_completions])
+        if len(positions):
+            ok = rng.random(len(positions)) <= reliability[positions]
+            positions = positions[ok]
+            schedule(
+                alert_index[ok], targets[positions], completions[ok] + delay[positions]
+            )
+
+    alert_index, nodes, times = (
+        np.concatenate(column) for column in zip(*activations)
+    )
+    activations_df = pd.DataFrame(
+        {
+            "alert": alert_index,
+            "node_id": arrays.node_ids[nodes],
+            "activation_time": times,
+        }
+    ).sort_values(["alert", "activation_time"], kind="stable", ignore_index=True)
+    timeline_df = pd.DataFrame(
+        timeline,
+        columns=["time", "node_type", "queue_length", "utilization", "sent", "dropped"],
+    )
+    span = max(times.max() - origin, window)
+    relays = np.flatnonzero(relayed)
+    node_df = pd.DataFrame(
+        {
+            "node_id": arrays.node_ids[relays],
+            "node_type": node_types[relays],
+            "sent": sent[relays],
+            "dropped": dropped[relays],
+            "max_queue": max_queue[relays],
+            "utilization": busy_time[relays] / span,
+        }
+    ).set_index("node_id")
+    return activations_df, timeline_df, node_df
+
+
+def main(
+    graph_path=GRAPH_FILE,
+    start_node=START_NODE,
+    n_alerts=1,
+    interval=60.0,
+    capacity_period=CAPACITY_PERIOD,
+    queue_periods=QUEUE_PERIODS,
+    output_path=TIMELINE_FILE,
+    seed=42,
+):
+    # The memory-mapped snapshot skips building a NetworkX graph at all
+    snapshot = open_snapshot(graph_path)
+    if snapshot is not None:
+        arrays = snapshot.arrays
+    else:
+        arrays = from_networkx(
+            load_graph(graph_path),
+            node_attrs=("node_type", "capacity", "role_priority"),
+        )
+
+    # Mass alert: n_alerts alerts from the start node, interval seconds apart
+    alerts = [(start_node, i * interval) for i in range(n_alerts)]
+    with stage("queues", alerts=n_alerts) as timer:
+        activations_df, timeline_df, node_df = simulate_queues(
+            arrays, alerts, capacity_period, queue_periods, np.random.default_rng(seed)
+        )
+        timer.record(
+            events=int(node_df["sent"].sum()),
+            dropped=int(node_df["dropped"].sum()),
+            queue_high_water=int(node_df["max_queue"].max()) if len(node_df) else 0,
+        )
+
+    print(
+        f"{n_alerts} alerts: {node_df['sent'].sum()} messages sent, "
+        f"{node_df['dropped'].sum()} dropped"
+    )
+    reach = len(activations_df) / (n_alerts * arrays.number_of_nodes)
+    print(f"Mean reach per alert: {reach:.2%}")
+    start_times = np.array([start for _, start in alerts])
+    latency = activations_df["activation_time"] - start_times[activations_df["alert"]]
+    print(f"Median activation delay: {latency.median():.2f} seconds")
+    print("\nQueues per node type:")
+    print(
+        timeline_df.groupby("node_type").agg(
+            max_queue=("queue_length", "max"),
+            peak_utilization=("utilization", "max"),
+            sent=("sent", "sum"),
+            dropped=("dropped", "sum"),
+        )
+    )
+    timeline_df.to_csv(output_path, index=False)
+    print(f"Queue timeline exported to {output_path}")
+    return activations_df, timeline_df, node_df
+
+
+if __name__ == "__main__":
+    main()
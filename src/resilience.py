@@ -0,0 +1,327 @@
+import os
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from ensemble import batch_activation_times, batch_size_for
+from process_pool import make_pool
+
+# What-if failure analysis for bottleneck resilience.
+# A fixed set of IC realizations (live-edge masks) is drawn and solved once as
+# the baseline, together with its shortest-path DAG: the live edges that some
+# node is activated through. A failure scenario removes nodes or edges in the
+# same realizations, so scenarios differ from the baseline only by the
+# failure and not by sampling noise. Only nodes below a failed element in the
+# DAG can change, so each scenario repairs just that part of each realization
+# with a small Dijkstra seeded from the unaffected rest, and the graph is never
+# copied. Scenario chunks run in worker processes that share the arrays,
+# masks and baseline through fork.
+
+N_REALIZATIONS = 100
+CHUNK_SCENARIOS = 32  # Scenarios per task
+REACH_PERCENTILES = (5, 50, 95)
+DELAY_PERCENTILES = (50, 95)
+
+_worker_model = None
+
+
+class FailureModel:
+    def __init__(self, arrays, seed, n_realizations=N_REALIZATIONS, rng=None):
+        if rng is None:
+            rng = np.random.default_rng()
+        self.arrays = arrays
+        seeds = [seed] if isinstance(seed, str) else list(seed)
+        self.seed_index = np.array([arrays.index[s] for s in seeds])
+        self.delay = np.asarray(arrays.edge("delay"), dtype=float)
+        self.sources = arrays.edge_sources
+        self.targets = arrays.indices
+        # Same success test as the scalar engine: random() <= reliability
+        self.live = (
+            rng.random((n_realizations, arrays.number_of_edges))
+            <= arrays.edge("reliability")
+        )
+        batch_size = batch_size_for(arrays)
+        self.times = np.concatenate(
+            [
+                batch_activation_times(
+                    arrays, self.seed_index, self.live[i : i + batch_size]
+                )
+                for i in range(0, n_realizations, batch_size)
+            ]
+        )
+        reached = np.isfinite(self.times)
+        self.row_reach = reached.sum(axis=1)
+        self.row_time_sum = np.where(reached, self.times, 0.0).sum(axis=1)
+
+        # Shortest-path DAG: live edges whose target is activated through them
+        arrival = self.times[:, self.sources] + self.delay
+        self.tight = (
+            self.live & np.isfinite(arrival) & (arrival <= self.times[:, self.targets])
+        )
+
+        # In-edges of every node, the CSC counterpart of indptr
+        self.in_order = np.argsort(arrays.indices, kind="stable")
+        counts = np.bincount(arrays.indices, minlength=arrays.number_of_nodes)
+        self.in_indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    @property
+    def n_realizations(self):
+        return self.live.shape[0]
+
+    def out_edges(self, node):
+        return np.arange(self.arrays.indptr[node], self.arrays.indptr[node + 1])
+
+    def in_edges(self, node):
+        return self.in_order[self.in_indptr[node] : self.in_indptr[node + 1]]
+
+    # Dead edge positions of a scenario
+    def dead_edges(self, nodes=(), edges=()):
+        dead = [np.asarray(edges, dtype=np.int64)]
+        for node in nodes:
+            dead += [self.out_edges(node), self.in_edges(node)]
+        return np.unique(np.concatenate(dead))
+
+    # Realizations in which a dead edge is on the shortest-path DAG, all
+    # others only lose the failed nodes themselves
+    def affected_rows(self, dead):
+        return np.flatnonzero(self.tight[:, dead].any(axis=1))
+
+    # Activation times after the failure in realization row, for the nodes
+    # below the dead edges in the DAG. Returns (nodes, new times). The work
+    # grows with the edges around those nodes, not with the graph size.
+    def repair(self, row, dead, dead_mask, excluded):
+        tight = self.tight[row]
+        live = self.live[row]
+
+        # Nodes below the failure in the DAG, found level by level
+        below = np.zeros(len(excluded), dtype=bool)
+        frontier = np.unique(self.targets[dead[tight[dead]]])
+        frontier = frontier[~excluded[frontier]]
+        affected = []
+        while len(frontier):
+            below[frontier] = True
+            affected.append(frontier)
+            edges = _expand(self.arrays.indptr, frontier)
+            edges = edges[tight[edges] & ~dead_mask[edges]]
+            frontier = np.unique(self.targets[edges])
+            frontier = frontier[~below[frontier] & ~excluded[frontier]]
+        if not affected:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        affected = np.concatenate(affected)
+        k = len(affected)
+        local = np.empty(len(excluded), dtype=np.int64)
+        local[affected] = np.arange(k)
+
+        # Dijkstra over the affected nodes from a virtual source, whose edge
+        # to each affected node is its earliest arrival from the unaffected
+        # part of the realization
+        in_edges = self.in_order[_expand(self.in_indptr, affected)]
+        in_edges = in_edges[live[in_edges] & ~dead_mask[in_edges]]
+        sources = self.sources[in_edges]
+        targets = local[self.targets[in_edges]]
+        inner = below[sources]
+        entry = np.full(k, np.inf)
+        np.minimum.at(
+            entry,
+            targets[~inner],
+            self.times[row, sources[~inner]] + self.delay[in_edges[~inner]],
+        )
+        entered = np.flatnonzero(np.isfinite(entry))
+        # Inner edges keep their delay, a DiGraph has no duplicate pairs
+        graph = csr_matrix(
+            (
+                np.concatenate([self.delay[in_edges[inner]], entry[entered]]),
+                (
+                    np.concatenate([local[sources[inner]], np.full(len(entered), k)]),
+                    np.concatenate([targets[inner], entered]),
+                ),
+            ),
+            shape=(k + 1, k + 1),
+        )
+        return affected, dijkstra(graph, indices=k)[:k]
+
+    # Reach and time sums per realization after removing the given nodes
+    # and dead edges
+    def row_stats(self, nodes, dead):
+        row_reach = self.row_reach.copy()
+        row_time_sum = self.row_time_sum.copy()
+        for node in nodes:
+            node_times = self.times[:, node]
+            lost = np.isfinite(node_times)
+            row_reach -= lost
+            row_time_sum -= np.where(lost, node_times, 0.0)
+
+        dead_mask = np.zeros(len(self.targets), dtype=bool)
+        dead_mask[dead] = True
+        # Seeds keep time 0 and failed nodes are already counted as lost
+        excluded = np.zeros(self.arrays.number_of_nodes, dtype=bool)
+        excluded[self.seed_index] = True
+        excluded[list(nodes)] = True
+        for row in self.affected_rows(dead):
+            affected, new_times = self.repair(row, dead, dead_mask, excluded)
+            old_times = self.times[row, affected]
+            old_reached = np.isfinite(old_times)
+            new_reached = np.isfinite(new_times)
+            row_reach[row] += new_reached.sum() - old_reached.sum()
+            row_time_sum[row] += (
+                new_times[new_reached].sum() - old_times[old_reached].sum()
+            )
+        return row_reach, row_time_sum
+
+
+# Positions indptr[v]:indptr[v + 1] of all the given nodes, concatenated
+def _expand(indptr, nodes):
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    ends = np.cumsum(lengths)
+    total = ends[-1] if len(ends) else 0
+    return np.repeat(starts - ends + lengths, lengths) + np.arange(total)
+
+
+# Reach percentiles over the realizations, the mean activation time over all
+# activations and percentiles of the per-realization mean activation time
+def summarize(row_reach, row_time_sum):
+    row_mean_time = row_time_sum / np.maximum(row_reach, 1)
+    summary = {"mean_reach": row_reach.mean()}
+    for q in REACH_PERCENTILES:
+        summary[f"reach_p{q:02d}"] = np.percentile(row_reach, q)
+    summary["mean_delay"] = row_time_sum.sum() / max(row_reach.sum(), 1)
+    for q in DELAY_PERCENTILES:
+        summary[f"delay_p{q:02d}"] = np.percentile(row_mean_time, q)
+    return summary
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+# Summaries of a chunk of scenarios, each (failed node rows, failed edge positions)
+def _run_chunk(scenarios):
+    model = _worker_model
+    results = []
+    for nodes, edges in scenarios:
+        dead = model.dead_edges(nodes, edges)
+        summary = summarize(*model.row_stats(nodes, dead))
+        summary["affected_realizations"] = len(model.affected_rows(dead))
+        results.append(summary)
+    return results
+
+
+# Failure scenarios of every k-set of the candidates. Candidates are node ids
+# or (source, target) edge pairs.
+def failure_sets(candidates, k=1):
+    return [tuple(c) for c in combinations(candidates, k)]
+
+
+# Top candidate nodes by a centrality score, seeds excluded
+def top_nodes(centrality, n, exclude=()):
+    scores = pd.Series(centrality, dtype=float).drop(list(exclude), errors="ignore")
+    return scores.sort_values(ascending=False, kind="stable").index[:n].tolist()
+
+
+def _edge_positions(arrays, edge_pairs):
+    positions = []
+    for source, target in edge_pairs:
+        u, v = arrays.index[source], arrays.index[target]
+        start = arrays.indptr[u]
+        match = np.flatnonzero(arrays.indices[start : arrays.indptr[u + 1]] == v)
+        if len(match) == 0:
+            raise KeyError(f"No edge {source} -> {target}")
+        positions.append(start + match[0])
+    return positions
+
+
+# Run every failure scenario against the same realizations and rank them by
+# impact, the fraction of the baseline mean reach that is lost. node_sets and
+# edge_sets are lists of failure sets, e.g. from failure_sets.
+def run_failures(
+    arrays,
+    seed,
+    node_sets=(),
+    edge_sets=(),
+    n_realizations=N_REALIZATIONS,
+    rng=None,
+    processes=None,
+    chunk_scenarios=CHUNK_SCENARIOS,
+):
+    model = FailureModel(arrays, seed, n_realizations, rng)
+    seeds = set(model.seed_index.tolist())
+
+    labels = []
+    scenarios = []
+    for node_set in node_sets:
+        rows = [arrays.index[node] for node in node_set]
+        if seeds.intersection(rows):
+            raise ValueError(f"Failure set {node_set} contains an alert seed")
+        labels.append(("node", " + ".join(node_set)))
+        scenarios.append((rows, []))
+    for edge_set in edge_sets:
+        labels.append(("edge", " + ".join(f"{s}->{t}" for s, t in edge_set)))
+        scenarios.append(([], _edge_positions(arrays, edge_set)))
+
+    chunks = [
+        scenarios[i : i + chunk_scenarios]
+        for i in range(0, len(scenarios), chunk_scenarios)
+    ]
+    if processes is None:
+        processes = os.cpu_count()
+    if processes > 1 and len(chunks) > 1:
+        with make_pool(_init_worker, model, processes) as pool:
+            results = [r for chunk in pool.map(_run_chunk, chunks) for r in chunk]
+    else:
+        _init_worker(model)
+        results = [r for chunk in chunks for r in _run_chunk(chunk)]
+
+    baseline = summarize(model.row_reach, model.row_time_sum)
+    criticality_df = pd.DataFrame(results)
+    criticality_df.insert(0, "kind", [kind for kind, _ in labels])
+    criticality_df.insert(1, "failed", [label for _, label in labels])
+    criticality_df["impact"] = 1 - criticality_df["mean_reach"] / baseline["mean_reach"]
+    criticality_df["delay_change"] = (
+        criticality_df["mean_delay"] - baseline["mean_delay"]
+    )
+    criticality_df = criticality_df.sort_values(
+        ["impact", "delay_change"], ascending=False, kind="stable"
+    ).reset_index(drop=True)
+    criticality_df.insert(0, "rank", np.arange(1, len(criticality_df) + 1))
+    criticality_df.attrs["baseline"] = baseline
+    return criticality_df
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+    from centrality import CentralityService
+    from graph_arrays import from_networkx
+    from graph_snapshot import load_graph
+    from metric_cache import MetricCache
+
+    GRAPH_FILE = Path(__file__).parent / "data" / "communication_updated.graphml"
+    OUTPUT_FILE = Path(__file__).parent / "data" / "failure_criticality.csv"
+    START_NODE = "Node_001"
+    N_CANDIDATES = 30
+
+    G = load_graph(GRAPH_FILE)
+    arrays = from_networkx(G)
+    betweenness = CentralityService(G, cache=MetricCache()).betweenness(weight="delay")
+    candidates = top_nodes(betweenness, N_CANDIDATES, exclude=[START_NODE])
+    edge_candidates = sorted(
+        G.edges(), key=lambda e: betweenness[e[0]] + betweenness[e[1]], reverse=True
+    )[:N_CANDIDATES]
+
+    criticality_df = run_failures(
+        arrays,
+        START_NODE,
+        node_sets=failure_sets(candidates, 1) + failure_sets(candidates[:10], 2),
+        edge_sets=failure_sets(edge_candidates, 1),
+        rng=np.random.default_rng(42),
+    )
+    baseline = criticality_df.attrs["baseline"]
+    print(
+        f"Baseline: mean reach {baseline['mean_reach']:.1f} nodes, "
+        f"mean delay {baseline['mean_delay']:.1f} s"
+    )
+    print(criticality_df.head(20).to_string(index=False))
+    criticality_df.to_csv(OUTPUT_FILE, index=False)
+    print(f"Criticality table exported to {OUTPUT_FILE}")
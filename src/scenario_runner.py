@@ -0,0 +1,189 @@
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from ensemble import sample_activation_times
+from process_pool import make_pool
+
+# Parallel runner for IC ensembles over many alert origins.
+# The CSR arrays are handed to the worker processes once, inherited through
+# fork where available and sent once per worker otherwise. Tasks only carry
+# (origin, seed sequence, realization count), never the graph itself.
+
+SCENARIO_NODE_TYPES = ("alert_origin", "control_center")
+CHUNK_REALIZATIONS = 100  # Realizations per task
+
+_worker_arrays = None
+
+
+def _init_worker(arrays):
+    global _worker_arrays
+    _worker_arrays = arrays
+
+
+# Run one task and return its per-node counts plus timestamps_delay-style records
+def _run_task(task):
+    origin, first_realization, n_realizations, seed_sequence, keep_records = task
+    arrays = _worker_arrays
+    rng = np.random.default_rng(seed_sequence)
+    seed_index = np.array([arrays.index[origin]])
+
+    n = arrays.number_of_nodes
+    reached_count = np.zeros(n, dtype=np.int64)
+    time_sum = np.zeros(n)
+    reach = []
+    records = []
+    realization = first_realization
+    for times in sample_activation_times(arrays, seed_index, n_realizations, rng):
+        reached = np.isfinite(times)
+        reached_count += reached.sum(axis=0)
+        time_sum += np.where(reached, times, 0.0).sum(axis=0)
+        reach.append(reached.sum(axis=1))
+        if keep_records:
+            rows, nodes = np.nonzero(reached)
+            records.append(
+                pd.DataFrame(
+                    {
+                        "seed_node": origin,
+                        "realization": realization + rows,
+                        "node_id": arrays.node_ids[nodes],
+                        "activation_time": times[rows, nodes],
+                    }
+                )
+            )
+        realization += len(times)
+
+    records_df = pd.concat(records, ignore_index=True) if records else None
+    return origin, reached_count, time_sum, np.concatenate(reach), records_df
+
+
+# Alert origins and control centers, the nodes an alert can start from
+def scenario_origins(arrays, node_types=SCENARIO_NODE_TYPES):
+    types = arrays.node_attrs["node_type"]
+    return arrays.node_ids[np.isin(types, node_types)].tolist()
+
+
+# Split every origin's realizations into tasks with independent RNG streams.
+# Streams are spawned from one SeedSequence in a fixed order, so results do
+# not depend on how many processes run or in which order tasks finish.
+def make_tasks(origins, n_realizations, base_seed, chunk_realizations, keep_records):
+    tasks = []
+    for origin in origins:
+        for first in range(0, n_realizations, chunk_realizations):
+            tasks.append(
+                [origin, first, min(chunk_realizations, n_realizations - first)]
+            )
+    streams = np.random.SeedSequence(base_seed).spawn(len(tasks))
+    return [(*task, stream, keep_records) for task, stream in zip(tasks, streams)]
+
+
+# Run n_realizations cascades from every origin on all cores.
+# Activation records are appended to output_path as tasks finish, with the
+# timestamps_delay.csv columns plus seed_node and realization. Returns the
+# merged per-origin, per-node summary and the reach of every realization.
+def run_scenarios(
+    arrays,
+    origins=None,
+    n_realizations=1000,
+    base_seed=42,
+    processes=None,
+    chunk_realizations=CHUNK_REALIZATIONS,
+    output_path=None,
+):
+    if origins is None:
+        origins = scenario_origins(arrays)
+    if processes is None:
+        processes = os.cpu_count()
+    tasks = make_tasks(
+        origins, n_realizations, base_seed, chunk_realizations, output_path is not None
+    )
+
+    n = arrays.number_of_nodes
+    reached_count = {origin: np.zeros(n, dtype=np.int64) for origin in origins}
+    time_sum = {origin: np.zeros(n) for origin in origins}
+    reach = {origin: [] for origin in origins}
+    node_types = arrays.node_attrs.get("node_type")
+    if output_path is not None:
+        Path(output_path).unlink(missing_ok=True)
+
+    with make_pool(_init_worker, arrays, processes) as pool:
+        for origin, counts, times, task_reach, records_df in pool.imap_unordered(
+            _run_task, tasks
+        ):
+            reached_count[origin] += counts
+            time_sum[origin] += times
+            reach[origin].append(task_reach)
+            if records_df is not None:
+                if node_types is not None:
+                    records_df["node_type"] = node_types[
+                        records_df["node_id"].map(arrays.index).to_numpy()
+                    ]
+                records_df["delay"] = records_df["activation_time"]
+                records_df.to_csv(
+                    output_path,
+                    mode="a",
+                    header=not Path(output_path).exists(),
+                    index=False,
+                )
+
+    summaries = []
+    for origin in origins:
+        summaries.append(
+            pd.DataFrame(
+                {
+                    "seed_node": origin,
+                    "node_id": arrays.node_ids,
+                    "activation_probability": reached_count[origin] / n_realizations,
+                    "mean_activation_time": np.divide(
+                        time_sum[origin],
+                        reached_count[origin],
+                        out=np.full(n, np.nan),
+                        where=reached_count[origin] > 0,
+                    ),
+                }
+            )
+        )
+    summary_df = pd.concat(summaries, ignore_index=True)
+    reach = {origin: np.concatenate(r) for origin, r in reach.items()}
+    return summary_df, reach
+
+
+# One row per origin comparing reach and delay across scenarios
+def compare_origins(summary_df, reach, n_nodes):
+    rows = []
+    for origin, origin_reach in reach.items():
+        origin_df = summary_df[summary_df["seed_node"] == origin]
+        rows.append(
+            {
+                "seed_node": origin,
+                "mean_reach": origin_reach.mean() / n_nodes,
+                "p05_reach": np.percentile(origin_reach, 5) / n_nodes,
+                "p95_reach": np.percentile(origin_reach, 95) / n_nodes,
+                "mean_activation_time": np.average(
+                    origin_df["mean_activation_time"].fillna(0.0),
+                    weights=origin_df["activation_probability"],
+                ),
+            }
+        )
+    return pd.DataFrame(rows).sort_values("mean_reach", ascending=False)
+
+
+if __name__ == "__main__":
+    from graph_arrays import from_networkx
+    from graph_snapshot import load_graph, open_snapshot
+
+    GRAPH_FILE = Path(__file__).parent / "data" / "communication_updated.graphml"
+    OUTPUT_FILE = Path(__file__).parent / "data" / "scenario_delays.csv"
+
+    # The memory-mapped snapshot skips building a NetworkX graph at all
+    snapshot = open_snapshot(GRAPH_FILE)
+    if snapshot is not None:
+        arrays = snapshot.arrays
+    else:
+        arrays = from_networkx(load_graph(GRAPH_FILE), node_attrs=("node_type",))
+    origins = scenario_origins(arrays)
+    print(f"Simulating {len(origins)} alert origins on {os.cpu_count()} cores")
+
+    summary_df, reach = run_scenarios(arrays, origins, output_path=OUTPUT_FILE)
+    print(compare_origins(summary_df, reach, arrays.number_of_nodes))
+    print(f"Activation records exported to {OUTPUT_FILE}")
@@ -0,0 +1,139 @@
+import ast
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# Spatial index over node coordinates for targeting alerts at flood events.
+# Coordinates are mapped onto the unit sphere, where the straight-line
+# (chord) distance grows monotonically with the great-circle distance, so a
+# KD-tree answers "all nodes within R km" and "nearest k nodes" exactly.
+# Per node type trees are built on first use for queries like the nearest
+# control centers.
+
+EARTH_RADIUS_KM = 6371.0088
+EVENTS_FILE = Path(__file__).parent / "data" / "flood_events.csv"
+
+
+def unit_vectors(latitude, longitude):
+    lat = np.radians(np.asarray(latitude, dtype=float))
+    lon = np.radians(np.asarray(longitude, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _chord(distance_km):
+    return 2 * np.sin(np.asarray(distance_km) / (2 * EARTH_RADIUS_KM))
+
+
+def _great_circle(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+# Great-circle distance in km with the haversine formula
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class NodeIndex:
+    def __init__(self, node_ids, latitude, longitude, node_types=None):
+        self.node_ids = np.asarray(node_ids)
+        self.node_types = None if node_types is None else np.asarray(node_types)
+        self.tree = cKDTree(unit_vectors(latitude, longitude))
+        self._type_trees = {}
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    # Tree over the nodes of one type and the rows of those nodes
+    def _type_tree(self, node_type):
+        if node_type not in self._type_trees:
+            if self.node_types is None:
+                raise ValueError("NodeIndex was built without node types")
+            rows = np.flatnonzero(self.node_types == node_type)
+            self._type_trees[node_type] = (cKDTree(self.tree.data[rows]), rows)
+        return self._type_trees[node_type]
+
+    # Node ids within radius_km of a point and their distances in km,
+    # nearest first
+    def within_radius(self, latitude, longitude, radius_km):
+        point = unit_vectors(latitude, longitude)
+        rows = np.asarray(self.tree.query_ball_point(point, _chord(radius_km)), dtype=np.intp)
+        distances = _great_circle(np.linalg.norm(self.tree.data[rows] - point, axis=1))
+        order = np.argsort(distances, kind="stable")
+        return self.node_ids[rows[order]], distances[order]
+
+    # The k nearest node ids to a point and their distances in km, nearest
+    # first, optionally only among nodes of node_type
+    def nearest(self, latitude, longitude, k=1, node_type=None):
+        if node_type is None:
+            tree, rows = self.tree, None
+        else:
+            tree, rows = self._type_tree(node_type)
+        k = min(k, tree.n)
+        if k == 0:
+            return self.node_ids[:0], np.empty(0)
+        chords, found = tree.query(unit_vectors(latitude, longitude), k=[*range(1, k + 1)])
+        found = np.asarray(found, dtype=np.intp)
+        if rows is not None:
+            found = rows[found]
+        return self.node_ids[found], _great_circle(chords)
+
+
+def from_nodes_df(nodes_df):
+    node_types = nodes_df["node_type"] if "node_type" in nodes_df.columns else None
+    return NodeIndex(
+        nodes_df["node_id"].to_numpy(),
+        nodes_df["latitude"].to_numpy(dtype=float),
+        nodes_df["longitude"].to_numpy(dtype=float),
+        None if node_types is None else node_types.to_numpy(),
+    )
+
+
+# Index over GraphArrays built with node_attrs latitude, longitude and
+# optionally node_type
+def from_arrays(arrays):
+    return NodeIndex(
+        arrays.node_ids,
+        arrays.node_attrs["latitude"],
+        arrays.node_attrs["longitude"],
+        arrays.node_attrs.get("node_type"),
+    )
+
+
+# Centroid of a GeoJSON geometry as (latitude, longitude)
+def geometry_centroid(geometry):
+    coordinates = np.asarray(geometry["coordinates"], dtype=float).reshape(-1, 2)
+    longitude, latitude = coordinates.mean(axis=0)
+    return float(latitude), float(longitude)
+
+
+# Flood events of download_data.py or gdacs_poller.py with their location,
+# the geometry and properties columns hold Python dict literals. The poller
+# appends changed events, so only the last row per event is kept.
+def load_events(path=EVENTS_FILE):
+    events_df = pd.read_csv(path)
+    rows = []
+    for geometry, properties in zip(events_df["geometry"], events_df["properties"]):
+        properties = ast.literal_eval(properties)
+        latitude, longitude = geometry_centroid(ast.literal_eval(geometry))
+        rows.append(
+            {
+                "eventid": properties.get("eventid"),
+                "episodeid": properties.get("episodeid"),
+                "name": properties.get("name"),
+                "country": properties.get("country"),
+                "alertlevel": properties.get("alertlevel"),
+                "latitude": latitude,
+                "longitude": longitude,
+            }
+        )
+    events_df = pd.DataFrame(rows)
+    return events_df.drop_duplicates(["eventid", "episodeid"], keep="last").reset_index(
+        drop=True
+    )
@@ -0,0 +1,155 @@
+import numpy as np
+import networkx as nx
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.linalg import ArpackNoConvergence, eigs
+
+# Spectral centralities on a sparse adjacency matrix built once from the CSR
+# graph arrays. Every solver is a vectorized iteration over scipy.sparse
+# matrix-vector products with the same update rule and stopping test as its
+# NetworkX counterpart (L1 change below n * tol), so scores match:
+#   eigenvector  power iteration on (A^T + I), ARPACK as a fallback
+#   katz         x = alpha * A^T x + beta
+#   pagerank     weighted PageRank with uniform teleport and dangling nodes
+# Every solver accepts a start vector, so when the weights or a few edges
+# change the previous scores are a warm start and few iterations are needed.
+
+TOL = 1e-6
+MAX_ITER = 1000
+SOLVERS = ("auto", "power", "arpack")
+
+
+# Transposed adjacency matrix (row v holds the in-edges of v), the form all
+# the solvers multiply with. weight=None gives every edge weight 1.
+def in_adjacency(arrays, weight="weight"):
+    n = arrays.number_of_nodes
+    if weight is None or weight not in arrays.edge_attrs:
+        data = np.ones(arrays.number_of_edges)
+    else:
+        data = np.asarray(arrays.edge(weight), dtype=float)
+    return csr_matrix((data, arrays.indices, arrays.indptr), shape=(n, n)).T.tocsr()
+
+
+def _start(n, x0):
+    if x0 is None:
+        return np.full(n, 1.0 / n)
+    x = np.asarray(x0, dtype=float).copy()
+    total = np.abs(x).sum()
+    return x / total if total > 0 else np.full(n, 1.0 / n)
+
+
+# Eigenvector centrality by power iteration on (A^T + I) like
+# nx.eigenvector_centrality. Returns (scores, iterations).
+def eigenvector_power(AT, x0=None, tol=TOL, max_iter=MAX_ITER):
+    n = AT.shape[0]
+    x = _start(n, x0)
+    for iteration in range(1, max_iter + 1):
+        last = x
+        x = last + AT @ last
+        norm = np.linalg.norm(x) or 1.0
+        x = x / norm
+        if np.abs(x - last).sum() < n * tol:
+            return x, iteration
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+# Eigenvector centrality from the leading eigenvector with ARPACK (implicitly
+# restarted Arnoldi), like nx.eigenvector_centrality_numpy
+def eigenvector_arpack(AT, x0=None, tol=0, max_iter=None):
+    n = AT.shape[0]
+    _, vectors = eigs(
+        AT.astype(float), k=1, which="LR", v0=_start(n, x0), tol=tol, maxiter=max_iter
+    )
+    x = np.abs(vectors[:, 0].real)
+    return x / (np.linalg.norm(x) or 1.0)
+
+
+# Katz centrality x = alpha * A^T x + beta like nx.katz_centrality, scaled
+# to unit length when normalized. Warm starts take unnormalized scores.
+# Returns (scores, iterations).
+def katz(AT, alpha=0.1, beta=1.0, x0=None, tol=TOL, max_iter=MAX_ITER, normalized=True):
+    n = AT.shape[0]
+    x = np.zeros(n) if x0 is None else np.asarray(x0, dtype=float).copy()
+    for iteration in range(1, max_iter + 1):
+        last = x
+        x = alpha * (AT @ last) + beta
+        if np.abs(x - last).sum() < n * tol:
+            if normalized:
+                x = x / (np.linalg.norm(x) or 1.0)
+            return x, iteration
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+# Weighted PageRank like nx.pagerank: the walk follows out-edges in
+# proportion to their weight, teleports with probability 1 - alpha, and
+# dangling nodes jump uniformly. Returns (scores, iterations).
+def pagerank(AT, alpha=0.85, x0=None, tol=TOL, max_iter=MAX_ITER):
+    n = AT.shape[0]
+    out_weight = np.asarray(AT.sum(axis=0)).ravel()
+    dangling = out_weight == 0
+    # Column-stochastic transition matrix
+    P = AT @ diags(np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling))
+    x = _start(n, x0)
+    for iteration in range(1, max_iter + 1):
+        last = x
+        x = alpha * (P @ last + last[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(x - last).sum() < n * tol:
+            return x, iteration
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+class SpectralEngine:
+    def __init__(self, arrays, weight="weight"):
+        self.node_ids = arrays.node_ids
+        self.weight = weight
+        self.AT = in_adjacency(arrays, weight)
+        # Last scores per centrality, the warm starts. Katz is kept
+        # unnormalized, at its fixed point's scale.
+        self.scores = {}
+        self.iterations = {}
+
+    # Swap in new arrays with the same nodes (changed weights or a few
+    # edges), the previous scores stay as warm starts
+    def update(self, arrays):
+        if len(arrays.node_ids) != len(self.node_ids):
+            self.scores = {}
+        self.node_ids = arrays.node_ids
+        self.AT = in_adjacency(arrays, self.weight)
+
+    def _store(self, name, x, iterations):
+        self.scores[name] = x
+        self.iterations[name] = iterations
+        return x
+
+    # Power iteration with "auto" falls back to ARPACK when it fails to
+    # converge within max_iter
+    def eigenvector(self, solver="auto", tol=TOL, max_iter=MAX_ITER):
+        x0 = self.scores.get("eigenvector")
+        if solver in ("auto", "power"):
+            try:
+                return self._store(
+                    "eigenvector", *eigenvector_power(self.AT, x0, tol, max_iter)
+                )
+            except nx.PowerIterationFailedConvergence:
+                if solver == "power":
+                    raise
+        if solver in ("auto", "arpack"):
+            try:
+                return self._store("eigenvector", eigenvector_arpack(self.AT, x0), 0)
+            except ArpackNoConvergence as error:
+                raise nx.PowerIterationFailedConvergence(max_iter) from error
+        raise ValueError(f"Unknown solver {solver!r}, expected one of {SOLVERS}")
+
+    def katz(self, alpha=0.1, beta=1.0, tol=TOL, max_iter=MAX_ITER):
+        x0 = self.scores.get("katz")
+        x = self._store(
+            "katz", *katz(self.AT, alpha, beta, x0, tol, max_iter, normalized=False)
+        )
+        return x / (np.linalg.norm(x) or 1.0)
+
+    def pagerank(self, alpha=0.85, tol=TOL, max_iter=MAX_ITER):
+        x0 = self.scores.get("pagerank")
+        return self._store("pagerank", *pagerank(self.AT, alpha, x0, tol, max_iter))
+
+    # {node: score} dict in the NetworkX result format
+    def as_dict(self, x):
+        return dict(zip(self.node_ids.tolist(), x.tolist()))
@@ -0,0 +1,37 @@
+import networkx as nx
+import numpy as np
+
+# Synthetic communication graphs for benchmarks at sizes beyond the shipped datasets
+
+DELAY_MIN, DELAY_MAX = 10, 180  # Seconds, same range as diffusion_dataset.py
+RELIABILITY_MIN, RELIABILITY_MAX = 0, 1
+
+
+# Random edge list with avg_degree out-edges per node on average, without self loops
+def random_edges(n_nodes, avg_degree=3, seed=42):
+    rng = np.random.default_rng(seed)
+    n_edges = int(n_nodes * avg_degree)
+    src = rng.integers(0, n_nodes, n_edges)
+    # Offset in [1, n_nodes) so that tgt never equals src
+    tgt = (src + rng.integers(1, n_nodes, n_edges)) % n_nodes
+    # Drop duplicate (src, tgt) pairs, a DiGraph keeps one edge per pair
+    keys = np.unique(src.astype(np.int64) * n_nodes + tgt)
+    src, tgt = keys // n_nodes, keys % n_nodes
+    delay = np.round(rng.uniform(DELAY_MIN, DELAY_MAX, len(src)), 2)
+    reliability = np.round(rng.uniform(RELIABILITY_MIN, RELIABILITY_MAX, len(src)), 2)
+    return src, tgt, delay, reliability
+
+
+# Random DiGraph with Node_XXX ids and delay/reliability edge attributes
+def random_communication_graph(n_nodes, avg_degree=3, seed=42):
+    src, tgt, delay, reliability = random_edges(n_nodes, avg_degree, seed)
+    node_ids = [f"Node_{i + 1:03d}" for i in range(n_nodes)]
+    G = nx.DiGraph()
+    G.add_nodes_from(node_ids)
+    G.add_edges_from(
+        (node_ids[s], node_ids[t], {"delay": d, "reliability": r})
+        for s, t, d, r in zip(
+            src.tolist(), tgt.tolist(), delay.tolist(), reliability.tolist()
+        )
+    )
+    return G
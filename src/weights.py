@@ -0,0 +1,129 @@
+import numpy as np
+
+# Columnar edge-weight computation for assign_weights.py.
+# Edge attributes are pulled into NumPy arrays once, weight and the
+# normalized columns are computed in bulk and written back in one pass.
+
+EPSILON = 1e-6  # Avoid division by zero
+
+
+# Weight formulas take a dict of edge columns and return the weight array.
+# Columns always include delay, reliability and messages, plus
+# source_capacity and target_capacity when the nodes carry a capacity.
+def delay_over_reliability(columns):
+    return columns["delay"] / (columns["reliability"] + EPSILON)
+
+
+# Additive form of reliability: sum of weights along a path is
+# -log(product of reliabilities), so shortest paths are the most reliable ones
+def log_reliability(columns):
+    return -np.log(columns["reliability"] + EPSILON)
+
+
+# Delay per reliability, inflated by how much of the sender's capacity the
+# messages on the edge use
+def capacity_aware(columns):
+    load = columns["messages"] / np.maximum(columns["source_capacity"], 1)
+    return delay_over_reliability(columns) * (1 + load)
+
+
+WEIGHT_FORMULAS = {
+    "delay_over_reliability": delay_over_reliability,
+    "log_reliability": log_reliability,
+    "capacity_aware": capacity_aware,
+}
+
+
+# Min-max normalization, constant columns map to 0
+def normalize(values):
+    value_min, value_max = values.min(), values.max()
+    if value_max == value_min:
+        return np.zeros_like(values)
+    return (values - value_min) / (value_max - value_min)
+
+
+# Round to 2 decimals exactly like Python's round(). np.round scales by 100
+# first and can land on the other side of a tie, so values within a hair of
+# a tie are rounded one by one with round().
+def round2(values):
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(v, 2) for v in values[near_tie].tolist()]
+    return rounded
+
+
+# Compute weight, delay_normalized and reliability_normalized columns
+def weight_columns(columns, formula="delay_over_reliability"):
+    if isinstance(formula, str):
+        formula = WEIGHT_FORMULAS[formula]
+    return {
+        "weight": round2(formula(columns)),
+        "delay_normalized": round2(normalize(columns["delay"])),
+        "reliability_normalized": round2(normalize(columns["reliability"])),
+    }
+
+
+# Read the edge columns of G in edge iteration order, edge_data is the list
+# of edge attribute dicts from a single pass over G.edges(data=True)
+def edge_columns(G, edge_data=None):
+    if edge_data is None:
+        edge_data = [d for _, _, d in G.edges(data=True)]
+    n_edges = len(edge_data)
+    columns = {
+        "delay": np.fromiter((d["delay"] for d in edge_data), float, n_edges),
+        "reliability": np.fromiter(
+            (d["reliability"] for d in edge_data), float, n_edges
+        ),
+        "messages": np.fromiter(
+            (d.get("messages", 1) for d in edge_data), float, n_edges
+        ),
+    }
+    capacity = dict(G.nodes.data("capacity"))
+    if all(c is not None for c in capacity.values()):
+        sources, targets = zip(*G.edges()) if n_edges else ((), ())
+        columns["source_capacity"] = np.fromiter(
+            map(capacity.__getitem__, sources), float, n_edges
+        )
+        columns["target_capacity"] = np.fromiter(
+            map(capacity.__getitem__, targets), float, n_edges
+        )
+    return columns
+
+
+# Assign weight, delay_normalized and reliability_normalized to every edge of G
+def assign_edge_weights(G, formula="delay_over_reliability"):
+    if G.number_of_edges() == 0:
+        return G
+    edge_data = [d for _, _, d in G.edges(data=True)]
+    results = weight_columns(edge_columns(G, edge_data), formula)
+    for d, weight, delay_normalized, reliability_normalized in zip(
+        edge_data,
+        results["weight"].tolist(),
+        results["delay_normalized"].tolist(),
+        results["reliability_normalized"].tolist(),
+    ):
+        d["weight"] = weight
+        d["delay_normalized"] = delay_normalized
+        d["reliability_normalized"] = reliability_normalized
+    return G
+
+
+# Same columns computed straight from GraphArrays, e.g. a loaded snapshot,
+# without going through NetworkX at all
+def array_weight_columns(arrays, formula="delay_over_reliability"):
+    columns = {
+        "delay": np.asarray(arrays.edge("delay"), dtype=float),
+        "reliability": np.asarray(arrays.edge("reliability"), dtype=float),
+    }
+    if "messages" in arrays.edge_attrs:
+        columns["messages"] = np.asarray(arrays.edge("messages"), dtype=float)
+    else:
+        columns["messages"] = np.ones(arrays.number_of_edges)
+    if "capacity" in arrays.node_attrs:
+        capacity = np.asarray(arrays.node_attrs["capacity"], dtype=float)
+        columns["source_capacity"] = capacity[arrays.edge_sources]
+        columns["target_capacity"] = capacity[arrays.indices]
+    return weight_columns(columns, formula)
+